@@ -36,16 +36,19 @@ st.markdown("""
 st.markdown('<p class="main-title">🎭 Puls-Events Chatbot</p>', unsafe_allow_html=True)
 st.markdown('<p class="subtitle">Découvrez les événements culturels de Lille !</p>', unsafe_allow_html=True)
 
-# Initialiser le chatbot une seule fois
-@st.cache_resource
-def load_chatbot():
-    from src.rag_chain import load_vector_store_langchain, create_rag_chain
-    vector_store = load_vector_store_langchain()
-    rag_chain, memory = create_rag_chain(vector_store)
-    return rag_chain, memory
+# Préchauffage en arrière-plan dès le démarrage du processus (une seule fois)
+from src import warmup
+from src.chatbot import chat, reset_memory
 
-with st.spinner("🚀 Chargement du chatbot..."):
-    rag_chain, memory = load_chatbot()
+warmup.start_warmup()
+
+if not warmup.is_ready():
+    with st.spinner("🚀 Chargement du chatbot..."):
+        warmup.wait_until_ready()
+
+if not warmup.is_ready():
+    st.error(f"❌ Chatbot indisponible : {warmup.get_status()['error']}")
+    st.stop()
 
 st.success("✅ Chatbot prêt !")
 
@@ -70,11 +73,16 @@ if user_input := st.chat_input("Posez votre question sur les événements de Lil
     with st.chat_message("user"):
         st.markdown(user_input)
 
-    # Générer la réponse directement avec rag_chain
+    # Générer la réponse (attend la fin du préchauffage si nécessaire)
     with st.chat_message("assistant"):
         with st.spinner("🔍 Recherche en cours..."):
-            response = rag_chain.invoke({"question": user_input})
-            answer = response["answer"]
+            # ?profile=1 dans l'URL : profil cProfile de la requête (src/profiling.py),
+            # seulement si l'opérateur l'autorise (PROFILE_ALLOW_REQUEST_FLAG)
+            from config import PROFILE_ALLOW_REQUEST_FLAG
+            force_profile = PROFILE_ALLOW_REQUEST_FLAG and st.query_params.get("profile") == "1"
+            answer = chat(user_input, profile=True if force_profile else None,
+                          user_location=st.session_state.get("user_location"),
+                          cities=st.session_state.get("cities"))
         st.markdown(answer)
 
     st.session_state.messages.append({"role": "assistant", "content": answer})
@@ -97,9 +105,26 @@ with st.sidebar:
 
     st.divider()
 
+    # Position de la session (questions "près de moi"), transmise à chaque requête
+    with st.expander("📍 Ma position"):
+        use_location = st.checkbox("Utiliser ma position pour « près de moi »")
+        latitude = st.number_input("Latitude", value=50.6365, format="%.4f")
+        longitude = st.number_input("Longitude", value=3.0707, format="%.4f")
+    st.session_state.user_location = (latitude, longitude) if use_location else None
+
+    # Villes de la session (index multi-agendas), transmises à chaque requête
+    from src.shards import load_manifest
+    manifest = load_manifest()
+    if manifest:
+        with st.expander("🏙️ Mes villes"):
+            known = sorted({city for entry in manifest.values() for city in entry["cities"]})
+            st.session_state.cities = st.multiselect("Villes interrogées par défaut", known) or None
+
+    st.divider()
+
     if st.button("🔄 Nouvelle conversation"):
         st.session_state.messages = []
-        memory.clear()
+        reset_memory()
         st.rerun()
 
     st.divider()
@@ -31,11 +31,106 @@ CHUNK_SIZE = 500
 CHUNK_OVERLAP = 50
 TOP_K_RESULTS = 5
 
+# Stockage de l'index : "flat" (float32), "fp16" ou "sq8" (quantification scalaire)
+INDEX_TYPE = os.getenv("INDEX_TYPE", "flat")
+# Candidats re-classés en pleine précision = RERANK_FACTOR x k (index quantifiés)
+RERANK_FACTOR = 4
+# Réduction de dimension apprise sur le corpus à la construction de l'index :
+# "none" ou "pca" (projection sauvegardée dans l'index, appliquée aux requêtes)
+INDEX_TRANSFORM = os.getenv("INDEX_TRANSFORM", "none")
+INDEX_TRANSFORM_DIM = int(os.getenv("INDEX_TRANSFORM_DIM", "256"))
+
+# Recherche en batch : "auto" (Faiss si installé), "faiss" ou "numpy"
+SEARCH_ENGINE = os.getenv("SEARCH_ENGINE", "auto")
+# Threads de recherche (OpenMP pour Faiss, pool de threads pour NumPy), vide = défaut
+SEARCH_THREADS = int(os.getenv("SEARCH_THREADS", "0")) or None
+# Taille des blocs (requêtes x documents) du produit matriciel NumPy
+SEARCH_BLOCK_SIZE = 1024
+
+# Assemblage du contexte du prompt (src/context_assembler.py)
+CONTEXT_TOKEN_BUDGET = 1500       # tokens max pour les événements du contexte
+CONTEXT_MIN_SCORE = float(os.getenv("CONTEXT_MIN_SCORE", "0.55"))  # similarité cosinus minimale
+DESCRIPTION_MAX_TOKENS = 150      # tokens max par description (phrases les plus pertinentes)
+
+# ========================================
+# GEOSPATIAL CONFIGURATION
+# ========================================
+# Rayon des recherches "près de ..." (km)
+GEO_RADIUS_KM = 1.5
+# Taille des cellules de la grille spatiale (km)
+GEO_CELL_KM = 0.5
+
+# ========================================
+# EXPIRY / COMPACTION
+# ========================================
+# Masquage des événements dont la date de fin est passée (sans ré-ingestion)
+EXPIRY_ENABLED = os.getenv("EXPIRY_ENABLED", "true").lower() == "true"
+# Fréquence de recalcul des tombstones (secondes)
+EXPIRY_REFRESH_SECONDS = 60
+# Part de documents expirés au-delà de laquelle l'index est compacté en arrière-plan
+COMPACTION_DEAD_FRACTION = 0.2
+# Attente avant de retenter la compaction d'un même index après un échec ou un abandon (secondes)
+COMPACTION_RETRY_SECONDS = 600
+
+# ========================================
+# INDEX VERSIONS / HOT RELOAD
+# ========================================
+# Intervalle de surveillance de la version courante (secondes, 0 = désactivé)
+# Index unique seulement : les shards (src/shards.py) ne sont pas versionnés ni rechargés à chaud
+INDEX_WATCH_INTERVAL = int(os.getenv("INDEX_WATCH_INTERVAL", "30"))
+# Versions gardées sur le disque (rollback), version courante comprise
+INDEX_VERSIONS_KEEP = 3
+# Attente max de la fin des requêtes sur l'ancienne version (secondes)
+INDEX_RELEASE_TIMEOUT = 60
+
+# ========================================
+# INTENT ROUTER (réponses en liste sans LLM)
+# ========================================
+# Questions "concerts ce week-end", "expositions gratuites"... servies par l'index des métadonnées
+INTENT_ROUTER_ENABLED = os.getenv("INTENT_ROUTER_ENABLED", "true").lower() == "true"
+# Nombre max d'événements listés dans une réponse
+LIST_MAX_RESULTS = 8
+# Période couverte sans précision de date (jours)
+LIST_DEFAULT_DAYS = 30
+# Au-delà de ce nombre de mots, la question est considérée comme ouverte (LLM)
+LIST_MAX_WORDS = 12
+# Événements plus longs (jours) hors des cases par jour (expositions de plusieurs mois)
+LIST_BUCKET_MAX_DAYS = 62
+
 # ========================================
 # MEMORY CONFIGURATION
 # ========================================
 USE_MEMORY = True
+# "summary" : résumé glissant plafonné en tokens (src/memory.py), "window" : fenêtre de k échanges
+MEMORY_MODE = os.getenv("MEMORY_MODE", "summary")
 MEMORY_WINDOW_SIZE = 5
+# Tokens max des derniers échanges gardés tels quels (au-delà : résumé en arrière-plan)
+MEMORY_TOKEN_LIMIT = 800
+# Taille max du résumé des anciens échanges
+MEMORY_SUMMARY_MAX_TOKENS = 250
+# Événements déjà présentés mémorisés (uid et titre seulement)
+MEMORY_MAX_SHOWN_EVENTS = 30
+
+# ========================================
+# RETRIEVER CONFIGURATION
+# ========================================
+QUERY_EMBEDDING_CACHE_SIZE = 256
+# Recherche en deux temps : événements les plus proches (centroïdes de leurs chunks),
+# puis chunks de ces seuls événements (src/event_index.py)
+EVENT_INDEX_ENABLED = os.getenv("EVENT_INDEX_ENABLED", "true").lower() == "true"
+# Événements retenus à la première étape = EVENT_CANDIDATES_FACTOR x k
+EVENT_CANDIDATES_FACTOR = 3
+
+# ========================================
+# LOCAL EMBEDDINGS (mode dégradé)
+# ========================================
+# Embeddings locaux (hachage + TF-IDF) quand l'API d'embeddings est indisponible
+# (disjoncteur ouvert, délai dépassé, 429/5xx), index construit à l'ingestion (src/local_embeddings.py)
+LOCAL_FALLBACK_ENABLED = os.getenv("LOCAL_FALLBACK_ENABLED", "true").lower() == "true"
+# Dimension des vecteurs hachés
+LOCAL_EMBED_DIM = 512
+# Similarité minimale du contexte en mode dégradé (les cosinus TF-IDF sont plus bas)
+LOCAL_MIN_SCORE = 0.1
 
 # ========================================
 # OPENAGENDA CONFIGURATION
@@ -43,12 +138,109 @@ MEMORY_WINDOW_SIZE = 5
 OPENAGENDA_REGION = "Lille"
 OPENAGENDA_MAX_EVENTS = 1000
 
+# Agendas ingérés : un shard d'index par agenda (src/shards.py)
+# Liste complétée par le fichier JSON AGENDAS_FILE (même format)
+OPENAGENDA_AGENDAS = [
+    {"uid": 57621068, "slug": "ville-de-lille", "city": "Lille"},
+]
+AGENDAS_FILE = os.getenv("AGENDAS_FILE", "")
+# Shards gardés en mémoire (les moins récemment utilisés sont déchargés)
+MAX_LOADED_SHARDS = int(os.getenv("MAX_LOADED_SHARDS", "4"))
+# Villes interrogées quand la question n'en cite aucune et sans choix de session
+DEFAULT_CITIES = ["Lille"]
+
 # ========================================
 # PATHS
 # ========================================
 DATA_RAW_PATH = "data/raw/"
 DATA_PROCESSED_PATH = "data/processed/"
 VECTOR_STORE_PATH = "vector_store/faiss_index/"
+SHARDS_PATH = "vector_store/shards/"
+
+# ========================================
+# HTTP CACHE (Open Agenda)
+# ========================================
+# Réponses gardées sur disque et revalidées (ETag / Last-Modified, réponses 304)
+HTTP_CACHE_ENABLED = os.getenv("HTTP_CACHE_ENABLED", "true").lower() == "true"
+HTTP_CACHE_PATH = "data/http_cache/"
+# Taille max du cache (octets) : les entrées les moins récemment utilisées sont supprimées
+HTTP_CACHE_MAX_BYTES = 50 * 1024 * 1024
+# Délai max d'une requête Open Agenda (secondes)
+OPENAGENDA_TIMEOUT = 30
+
+# ========================================
+# PIPELINE (src/pipeline.py)
+# ========================================
+# Empreintes des entrées et paramètres de chaque étape (étapes inchangées sautées)
+PIPELINE_STATE_FILE = os.path.join(DATA_PROCESSED_PATH, "pipeline_state.json")
+# Embeddings des chunks, réutilisés pour les textes inchangés
+EMBEDDINGS_FILE = os.path.join(DATA_PROCESSED_PATH, "embeddings.npy")
+
+# ========================================
+# API CLIENT (Mistral)
+# ========================================
+MISTRAL_ENDPOINT = os.getenv("MISTRAL_BASE_URL", "https://api.mistral.ai/v1")
+# Pool de connexions keep-alive partagé par tous les clients Mistral
+API_MAX_CONNECTIONS = 20
+API_MAX_KEEPALIVE = 10
+API_KEEPALIVE_EXPIRY = 60
+# Délai max d'une tentative (secondes) et délai total, nouvelles tentatives comprises
+API_CONNECT_TIMEOUT = 5
+API_TIMEOUT = 30
+API_DEADLINES = {"/embeddings": 10, "/chat/completions": 60}
+API_DEFAULT_DEADLINE = 60
+# Nouvelles tentatives (429, 5xx, erreurs réseau) avec attente exponentielle aléatoire
+API_MAX_RETRIES = 3
+API_BACKOFF_BASE = 0.5
+API_BACKOFF_MAX = 8
+# Disjoncteur : ouvert après N échecs consécutifs (erreurs réseau, 5xx ; pas les 429), nouvel essai après le délai (secondes)
+API_BREAKER_FAILURES = 5
+API_BREAKER_RESET = 30
+# Requêtes doublées pour les embeddings : 2e requête si la 1re dépasse le p95 observé
+API_HEDGE_EMBEDDINGS = os.getenv("API_HEDGE_EMBEDDINGS", "false").lower() == "true"
+API_HEDGE_MIN_SAMPLES = 20
+# Nombre de latences gardées par endpoint pour les percentiles
+API_LATENCY_WINDOW = 500
+
+# ========================================
+# OBSERVABILITY (OpenTelemetry)
+# ========================================
+# "none" (désactivé), "console" (stdout) ou "otlp" (collecteur local, HTTP)
+OTEL_EXPORTER = os.getenv("OTEL_EXPORTER", "none")
+OTEL_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318")
+OTEL_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "puls-events-rag")
+
+# ========================================
+# PROFILING (src/profiling.py)
+# ========================================
+# Profilage cProfile d'une fraction des requêtes (ou à la demande : chat(..., profile=True))
+PROFILE_ENABLED = os.getenv("PROFILE_ENABLED", "false").lower() == "true"
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0.1"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles/")
+# Nombre de fonctions dans le résumé texte de chaque profil
+PROFILE_TOP_N = 30
+# ?profile=1 dans l'URL Streamlit accepté (à réserver aux environnements de diagnostic)
+PROFILE_ALLOW_REQUEST_FLAG = os.getenv("PROFILE_ALLOW_REQUEST_FLAG", "false").lower() == "true"
+# Profils gardés dans PROFILE_DIR (les plus anciens sont supprimés)
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "50"))
+
+# ========================================
+# STARTUP
+# ========================================
+# Budget de temps d'import des modules src/ (mesuré par tests/benchmark_startup.py)
+IMPORT_TIME_BUDGET_MS = 150
+
+# ========================================
+# WARM-UP / READINESS
+# ========================================
+# Appels API de préchauffage (embedding + LLM) pour ouvrir les connexions
+WARMUP_API_CALLS = os.getenv("WARMUP_API_CALLS", "false").lower() == "true"
+# Délai max d'attente d'une requête pendant le préchauffage (secondes)
+WARMUP_TIMEOUT = 120
+# Fichier créé quand le chatbot est prêt (sonde "exec" des orchestrateurs), vide = désactivé
+READINESS_FILE = os.getenv("READINESS_FILE", "")
+# Port du serveur HTTP /health et /ready, vide = désactivé
+HEALTH_PORT = int(os.getenv("HEALTH_PORT", "0")) or None
 
 # ========================================
 # VALIDATION
@@ -0,0 +1,369 @@
+"""
+Couche client HTTP partagée pour les appels à l'API Mistral
+
+Tous les clients (SDK mistralai, ChatMistralAI, MistralAIEmbeddings) passent par
+le même transport httpx :
+- pool de connexions keep-alive commun (plus de poignée de main TLS par client)
+- délai total par appel (API_DEADLINES), nouvelles tentatives comprises
+- nouvelles tentatives sur 429 / 5xx / erreurs réseau, attente exponentielle aléatoire
+  (ou Retry-After) ; un 429 (limitation de débit) ne compte pas comme un échec
+- disjoncteur par endpoint : après API_BREAKER_FAILURES échecs, les appels échouent
+  immédiatement (CircuitOpenError) jusqu'à un essai réussi après API_BREAKER_RESET
+- requêtes doublées (optionnel) pour les embeddings : une 2e requête part si la
+  1re dépasse le p95 observé, la première réponse l'emporte
+- latences par endpoint : histogramme OpenTelemetry et percentiles en mémoire
+"""
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    MISTRAL_API_KEY,
+    MISTRAL_ENDPOINT,
+    API_MAX_CONNECTIONS,
+    API_MAX_KEEPALIVE,
+    API_KEEPALIVE_EXPIRY,
+    API_CONNECT_TIMEOUT,
+    API_TIMEOUT,
+    API_DEADLINES,
+    API_DEFAULT_DEADLINE,
+    API_MAX_RETRIES,
+    API_BACKOFF_BASE,
+    API_BACKOFF_MAX,
+    API_BREAKER_FAILURES,
+    API_BREAKER_RESET,
+    API_HEDGE_EMBEDDINGS,
+    API_HEDGE_MIN_SAMPLES,
+    API_LATENCY_WINDOW
+)
+from src.telemetry import record_api_latency, set_attributes
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+HEDGED_ENDPOINTS = {"/embeddings"}
+
+class CircuitOpenError(httpx.TransportError):
+    """Appel refusé sans être envoyé : le disjoncteur de l'endpoint est ouvert"""
+
+class DeadlineExceededError(httpx.TimeoutException):
+    """Délai total de l'appel dépassé (nouvelles tentatives comprises)"""
+
+def is_unavailable_error(error):
+    """
+    Vrai si l'erreur signale une API indisponible : disjoncteur ouvert, délai dépassé,
+    erreur réseau ou 429 / 5xx, y compris enveloppée (cause, RetryError de tenacity)
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, httpx.TransportError):
+            return True
+        if isinstance(error, httpx.HTTPStatusError) and error.response.status_code in RETRYABLE_STATUS:
+            return True
+        last_attempt = getattr(error, "last_attempt", None)
+        error = last_attempt.exception() if last_attempt is not None else (error.__cause__ or error.__context__)
+    return False
+
+def endpoint_name(path):
+    """Nom court d'un endpoint : /v1/chat/completions → /chat/completions"""
+    return re.sub(r"^/v\d+", "", path) or "/"
+
+def backoff_delay(attempt, base=API_BACKOFF_BASE, cap=API_BACKOFF_MAX):
+    """Attente avant la tentative suivante (exponentielle, aléatoire entre 0 et le plafond)"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+# ========================================
+# DISJONCTEUR ET LATENCES
+# ========================================
+
+class CircuitBreaker:
+    """
+    États : "closed" (normal) → "open" (appels refusés) → "half_open" (un seul essai)
+    Un essai réussi referme le disjoncteur, un échec le rouvre
+    """
+
+    def __init__(self, failure_threshold=API_BREAKER_FAILURES, reset_timeout=API_BREAKER_RESET):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def _state(self, now):
+        if self.opened_at is None:
+            return "closed"
+        if now - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self, now=None):
+        """Vrai si un appel peut partir (un seul essai à la fois en half_open)"""
+        with self._lock:
+            state = self._state(time.monotonic() if now is None else now)
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_throttled(self):
+        """429 : l'API répond mais limite le débit, ni succès ni échec (libère l'essai en cours)"""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self, now=None):
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic() if now is None else now
+            self._probing = False
+
+class LatencyWindow:
+    """Dernières latences d'un endpoint (ms), pour les percentiles"""
+
+    def __init__(self, size=API_LATENCY_WINDOW):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, duration_ms):
+        with self._lock:
+            self._samples.append(duration_ms)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def percentile(self, q):
+        """Percentile q (0-100) des latences observées, None sans mesure"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(int(len(samples) * q / 100), len(samples) - 1)]
+
+# ========================================
+# TRANSPORT
+# ========================================
+
+class ResilientTransport(httpx.BaseTransport):
+    """Transport httpx partagé : pool, délais, nouvelles tentatives, disjoncteur, doublage"""
+
+    def __init__(self, transport=None, deadlines=API_DEADLINES, default_deadline=API_DEFAULT_DEADLINE,
+                 max_retries=API_MAX_RETRIES, hedge_endpoints=None, sleep=time.sleep):
+        self._transport = transport or httpx.HTTPTransport(
+            limits=httpx.Limits(
+                max_connections=API_MAX_CONNECTIONS,
+                max_keepalive_connections=API_MAX_KEEPALIVE,
+                keepalive_expiry=API_KEEPALIVE_EXPIRY
+            ),
+            retries=0
+        )
+        self.deadlines = deadlines
+        self.default_deadline = default_deadline
+        self.max_retries = max_retries
+        self.hedge_endpoints = HEDGED_ENDPOINTS if hedge_endpoints is None else set(hedge_endpoints)
+        self.sleep = sleep
+        self.breakers = {}
+        self.latencies = {}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def breaker(self, endpoint):
+        with self._lock:
+            return self.breakers.setdefault(endpoint, CircuitBreaker())
+
+    def latency(self, endpoint):
+        with self._lock:
+            return self.latencies.setdefault(endpoint, LatencyWindow())
+
+    def handle_request(self, request):
+        endpoint = endpoint_name(request.url.path)
+        breaker = self.breaker(endpoint)
+        deadline = time.monotonic() + self.deadlines.get(endpoint, self.default_deadline)
+        # Le corps doit pouvoir être renvoyé (nouvelle tentative, requête doublée)
+        request.read()
+
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                record_api_latency(endpoint, 0, "circuit_open")
+                raise CircuitOpenError(f"Disjoncteur ouvert pour {endpoint}", request=request)
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceededError(f"Délai dépassé pour {endpoint}", request=request)
+            _cap_timeouts(request, remaining)
+
+            try:
+                response = self._send(request, endpoint)
+            except httpx.TransportError as e:
+                breaker.record_failure()
+                if attempt >= self.max_retries or breaker.state == "open":
+                    raise
+                error = e
+            else:
+                if response.status_code not in RETRYABLE_STATUS:
+                    # Les 4xx (hors 429) sont des erreurs du client, pas de l'API
+                    breaker.record_success()
+                    return response
+                if response.status_code == 429:
+                    breaker.record_throttled()
+                else:
+                    breaker.record_failure()
+                # Disjoncteur ouvert par cet appel : inutile d'insister
+                if attempt >= self.max_retries or breaker.state == "open":
+                    return response
+                error = response
+                response.close()
+
+            delay = _retry_after(error) or backoff_delay(attempt)
+            if time.monotonic() + delay >= deadline:
+                if isinstance(error, Exception):
+                    raise error
+                return error
+            attempt += 1
+            set_attributes(api__retries=attempt)
+            self.sleep(delay)
+
+    def _send(self, request, endpoint):
+        """Une tentative, doublée si l'endpoint est lent par rapport à son p95"""
+        window = self.latency(endpoint)
+        if endpoint in self.hedge_endpoints and len(window) >= API_HEDGE_MIN_SAMPLES:
+            return self._send_hedged(request, endpoint, window.percentile(95) / 1000)
+        return self._send_once(request, endpoint)
+
+    def _send_once(self, request, endpoint, outcome_prefix=""):
+        start = time.perf_counter()
+        try:
+            response = self._transport.handle_request(request)
+            response.read()
+        except httpx.TransportError:
+            record_api_latency(endpoint, (time.perf_counter() - start) * 1000, f"{outcome_prefix}error")
+            raise
+        duration_ms = (time.perf_counter() - start) * 1000
+        record_api_latency(endpoint, duration_ms, f"{outcome_prefix}{response.status_code}")
+        if response.status_code < 400:
+            self.latency(endpoint).add(duration_ms)
+        return response
+
+    def _send_hedged(self, request, endpoint, hedge_after):
+        executor = self._hedge_executor()
+        futures = [executor.submit(self._send_once, request, endpoint)]
+        done, _ = wait(futures, timeout=hedge_after)
+        if not done:
+            futures.append(executor.submit(self._send_once, request, endpoint, "hedged_"))
+            set_attributes(api__hedged=True)
+
+        pending = set(futures)
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    # La réponse perdante est fermée dès qu'elle arrive
+                    for other in pending:
+                        other.add_done_callback(_close_response)
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _hedge_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=API_MAX_CONNECTIONS,
+                                                    thread_name_prefix="api-hedge")
+            return self._executor
+
+    def close(self):
+        self._transport.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+def _cap_timeouts(request, remaining):
+    """Aucune phase (connexion, lecture...) ne peut dépasser le temps restant"""
+    timeouts = request.extensions.get("timeout") or {}
+    request.extensions["timeout"] = {
+        phase: min(value, remaining) if value is not None else remaining
+        for phase, value in {**dict.fromkeys(("connect", "read", "write", "pool")), **timeouts}.items()
+    }
+
+def _retry_after(error):
+    """Délai demandé par l'API (en-tête Retry-After en secondes), plafonné"""
+    if isinstance(error, httpx.Response):
+        try:
+            return min(float(error.headers.get("retry-after", "")), API_BACKOFF_MAX)
+        except ValueError:
+            return None
+    return None
+
+def _close_response(future):
+    if future.exception() is None:
+        future.result().close()
+
+# ========================================
+# CLIENTS PARTAGÉS
+# ========================================
+
+_transport = None
+_transport_lock = threading.Lock()
+
+def get_transport():
+    """Transport partagé par tous les clients du processus (créé au premier appel)"""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = ResilientTransport(
+                hedge_endpoints=HEDGED_ENDPOINTS if API_HEDGE_EMBEDDINGS else ()
+            )
+        return _transport
+
+def create_http_client(base_url=None, headers=None):
+    """Client httpx sur le transport partagé (les clients ne font que porter l'URL et les en-têtes)"""
+    return httpx.Client(
+        base_url=base_url or "",
+        headers=headers,
+        timeout=httpx.Timeout(API_TIMEOUT, connect=API_CONNECT_TIMEOUT),
+        transport=get_transport()
+    )
+
+def create_mistral_http_client():
+    """Client pour ChatMistralAI / MistralAIEmbeddings (URL de base et authentification)"""
+    return create_http_client(MISTRAL_ENDPOINT, {
+        "Content-Type": "application/json",
+        "Accept": "application/json",
+        "Authorization": f"Bearer {MISTRAL_API_KEY}",
+    })
+
+def latency_summary():
+    """{endpoint: {"count", "p50", "p95", "p99", "circuit"}} en ms, pour les sondes"""
+    if _transport is None:
+        return {}
+    return {
+        endpoint: {
+            "count": len(window),
+            "p50": window.percentile(50),
+            "p95": window.percentile(95),
+            "p99": window.percentile(99),
+            "circuit": _transport.breaker(endpoint).state,
+        }
+        for endpoint, window in list(_transport.latencies.items())
+    }
@@ -0,0 +1,60 @@
+"""
+Callbacks LangChain : spans OpenTelemetry autour des appels LLM
+(reformulation de la question et génération de la réponse)
+"""
+import os
+import sys
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.telemetry import start_span, end_span, record_tokens
+
+# Tag posé sur le LLM qui reformule la question à partir de l'historique
+CONDENSE_QUESTION_TAG = "condense_question"
+# Tag posé sur le LLM qui résume les anciens échanges (src/memory.py)
+MEMORY_SUMMARY_TAG = "memory_summary"
+
+# Nom du span selon le tag du LLM (par défaut : génération de la réponse)
+STAGE_BY_TAG = {
+    CONDENSE_QUESTION_TAG: "llm.condense_question",
+    MEMORY_SUMMARY_TAG: "llm.summarize_memory",
+}
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """Ouvre un span par appel LLM et y attache la consommation de tokens"""
+
+    def __init__(self):
+        self._spans = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, tags=None, **kwargs):
+        stage = next((STAGE_BY_TAG[tag] for tag in tags or [] if tag in STAGE_BY_TAG), "llm.generate")
+        model = (kwargs.get("invocation_params") or {}).get("model")
+        current, start = start_span(stage, llm__model=model)
+        self._spans[run_id] = (stage, current, start)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        if run_id not in self._spans:
+            return
+        stage, current, start = self._spans.pop(run_id)
+
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt_tokens = usage.get("prompt_tokens")
+        completion_tokens = usage.get("completion_tokens")
+        if prompt_tokens is not None:
+            current.set_attribute("llm.prompt_tokens", prompt_tokens)
+        if completion_tokens is not None:
+            current.set_attribute("llm.completion_tokens", completion_tokens)
+        record_tokens(stage, prompt_tokens, completion_tokens)
+        print(f"🧮 {stage} : {prompt_tokens} tokens de prompt, {completion_tokens} tokens générés")
+
+        end_span(stage, current, start)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        if run_id not in self._spans:
+            return
+        from opentelemetry.trace import Status, StatusCode
+        stage, current, start = self._spans.pop(run_id)
+        current.record_exception(error)
+        current.set_status(Status(StatusCode.ERROR, str(error)))
+        end_span(stage, current, start)
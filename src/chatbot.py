@@ -5,39 +5,100 @@ import os
 import sys
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.profiling import profiled
+from src.telemetry import span
 
 # Variables globales
 _rag_chain = None
 _memory = None
+_intent_router = None
 
 def initialize_chatbot():
     """
     Initialise le chatbot (à appeler une seule fois au démarrage)
     """
-    global _rag_chain, _memory
+    global _rag_chain, _memory, _intent_router
 
     print("🚀 Initialisation du chatbot...")
 
     from src.rag_chain import load_vector_store_langchain, create_rag_chain
-
-    vector_store = load_vector_store_langchain()
-    _rag_chain, _memory = create_rag_chain(vector_store)
+    from src.shards import has_shards, create_sharded_retriever
+
+    if has_shards():
+        # Index multi-agendas : shards chargés à la demande
+        # Pas de rechargement à chaud : les shards reconstruits sont servis après redémarrage
+        _rag_chain, _memory = create_rag_chain(retriever=create_sharded_retriever())
+        print("ℹ️ Mode partitionné : pas de rechargement à chaud des shards (redémarrer après reconstruction)")
+    else:
+        from src.index_versions import start_watcher
+
+        vector_store = load_vector_store_langchain()
+        _rag_chain, _memory = create_rag_chain(vector_store)
+        # Nouvelles versions de l'index rechargées à chaud (src/index_versions.py)
+        start_watcher(_rag_chain.retriever)
+
+    from config import INTENT_ROUTER_ENABLED
+    if INTENT_ROUTER_ENABLED:
+        # Questions en liste servies sans LLM (src/intent_router.py)
+        from src.intent_router import create_intent_router
+        _intent_router = create_intent_router(_rag_chain.retriever)
 
     print("✅ Chatbot prêt !")
     return _rag_chain, _memory
 
-def chat(user_message):
+def chat(user_message, profile=None, user_location=None, cities=None):
     """
     Envoie un message au chatbot et retourne la réponse
+    Si le chatbot n'est pas encore chargé, attend la fin du préchauffage (src/warmup.py)
+    profile : True pour profiler cette requête, None pour suivre PROFILE_ENABLED (src/profiling.py)
+    user_location : (latitude, longitude) de l'utilisateur pour les questions "près de moi",
+    propre à cette requête (jamais enregistrée dans le retriever partagé)
+    cities : villes de la session (index multi-agendas), interrogées quand la question
+    n'en cite aucune ; None pour DEFAULT_CITIES. Comme user_location, propres à la requête
     """
     global _rag_chain
 
-    if _rag_chain is None:
-        initialize_chatbot()
-
-    response = _rag_chain.invoke({"question": user_message})
+    with profiled("chatbot.chat", force=profile), \
+            span("chatbot.chat", question__length=len(user_message)) as current:
+        if _rag_chain is None:
+            from src import warmup
+            if not warmup.wait_until_ready():
+                status = warmup.get_status()
+                raise RuntimeError(
+                    f"Chatbot indisponible ({status['status']}) : {status['error'] or 'préchauffage en cours'}"
+                )
+
+        with profiled("intent_router.answer"):
+            routed = _intent_router.answer(user_message) if _intent_router else None
+        if routed is not None:
+            answer, events = routed
+            _save_exchange(user_message, answer, events)
+            current.set_attribute("chat.route", "intent_list")
+            current.set_attribute("chat.sources", len(events))
+            current.set_attribute("answer.length", len(answer))
+            return answer
+
+        with profiled("rag_chain.invoke"):
+            metadata = {}
+            if user_location:
+                metadata["user_location"] = tuple(user_location)
+            if cities:
+                metadata["cities"] = list(cities)
+            response = _rag_chain.invoke({"question": user_message}, config={"metadata": metadata})
+        current.set_attribute("chat.route", "rag")
+        current.set_attribute("chat.sources", len(response.get("source_documents", [])))
+        current.set_attribute("answer.length", len(response["answer"]))
     return response["answer"]
 
+def _save_exchange(user_message, answer, events):
+    """Ajoute à la mémoire un échange servi sans la chaîne RAG (questions de suivi)"""
+    from langchain_core.documents import Document
+
+    _memory.save_context(
+        {"question": user_message},
+        {"answer": answer, "source_documents": [Document(page_content="", metadata=event) for event in events]}
+    )
+
 def reset_memory():
     """
     Réinitialise la mémoire conversationnelle
@@ -51,7 +112,9 @@ if __name__ == "__main__":
     print("🎭 Chatbot Puls-Events - Lille")
     print("Tapez 'quit' pour quitter\n")
 
-    initialize_chatbot()
+    # Chargement en arrière-plan pendant la saisie de la première question
+    from src.warmup import start_warmup
+    start_warmup()
 
     while True:
         user_input = input("Vous : ").strip()
@@ -0,0 +1,137 @@
+"""
+Assemblage du contexte du prompt de génération avec un budget de tokens
+
+Étapes appliquées aux documents retrouvés (déjà triés par score) :
+1. suppression des résultats sous le score minimal
+2. déduplication des lignes répétées : "Ville : ..." et URLs dans tout le contexte,
+   autres lignes d'en-tête entre chunks d'un même événement
+3. réduction des descriptions aux phrases les plus proches de la question
+4. arrêt dès que le budget de tokens du contexte est atteint
+"""
+import os
+import re
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import CONTEXT_TOKEN_BUDGET, CONTEXT_MIN_SCORE, DESCRIPTION_MAX_TOKENS
+
+# Approximation du tokenizer Mistral pour du texte français
+CHARS_PER_TOKEN = 3.5
+
+# Lignes structurées produites par data_processor.create_event_text
+HEADER_PATTERN = re.compile(
+    r"^(Événement|Date de début|Date de fin|Lieu|Adresse|Ville|Tarifs|Catégories|Plus d'infos|Distance) : "
+)
+# Lignes communes à de nombreux événements, dédupliquées dans tout le contexte
+GLOBAL_HEADER_PREFIXES = ("Ville : ",)
+DESCRIPTION_PREFIX = "Description : "
+URL_PATTERN = re.compile(r"https?://\S+")
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+WORD_PATTERN = re.compile(r"\w+")
+
+# Mots trop fréquents pour départager les phrases
+STOPWORDS = {
+    "le", "la", "les", "un", "une", "des", "de", "du", "et", "ou", "à", "au", "aux",
+    "en", "dans", "pour", "sur", "par", "avec", "ce", "cet", "cette", "ces", "qui",
+    "que", "quoi", "quel", "quels", "quelle", "quelles", "est", "sont", "il", "elle",
+    "y", "a", "t", "je", "tu", "on", "nous", "vous", "ils", "mon", "ma", "mes", "l", "d",
+}
+
+def count_tokens(text):
+    """Estimation du nombre de tokens d'un texte"""
+    return int(len(text) / CHARS_PER_TOKEN) + 1 if text else 0
+
+def _terms(text):
+    return {word for word in WORD_PATTERN.findall(text.lower()) if word not in STOPWORDS}
+
+def trim_description(text, query, max_tokens=DESCRIPTION_MAX_TOKENS):
+    """
+    Garde les phrases de la description les plus proches de la question
+    (recouvrement de mots), dans leur ordre d'origine, jusqu'à max_tokens
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    sentences = SENTENCE_SPLIT.split(text)
+    query_terms = _terms(query)
+    ranked = sorted(
+        range(len(sentences)),
+        key=lambda i: (-len(_terms(sentences[i]) & query_terms), i)
+    )
+
+    kept, used = set(), 0
+    for i in ranked:
+        tokens = count_tokens(sentences[i])
+        if used + tokens > max_tokens:
+            continue
+        kept.add(i)
+        used += tokens
+
+    if not kept:
+        # Première phrase trop longue : coupe franche
+        return sentences[ranked[0]][:int(max_tokens * CHARS_PER_TOKEN)].rstrip() + "…"
+    return " ".join(sentences[i] for i in sorted(kept))
+
+def compact_chunk(text, query, seen_lines, seen_urls, uid=None,
+                  max_description_tokens=DESCRIPTION_MAX_TOKENS):
+    """
+    Retire d'un chunk les lignes d'en-tête et URLs déjà présentes dans le contexte
+    et réduit sa description
+    """
+    lines = []
+    for line in text.split("\n"):
+        line = line.strip()
+        if not line:
+            continue
+
+        if HEADER_PATTERN.match(line):
+            urls = URL_PATTERN.findall(line)
+            key = line if line.startswith(GLOBAL_HEADER_PREFIXES) else (uid, line)
+            if key in seen_lines or (urls and all(url in seen_urls for url in urls)):
+                continue
+            seen_lines.add(key)
+            seen_urls.update(urls)
+            lines.append(line)
+        elif line.startswith(DESCRIPTION_PREFIX):
+            body = trim_description(line[len(DESCRIPTION_PREFIX):], query, max_description_tokens)
+            lines.append(DESCRIPTION_PREFIX + body)
+        else:
+            # Suite d'une description découpée en plusieurs chunks
+            lines.append(trim_description(line, query, max_description_tokens))
+
+    return "\n".join(lines)
+
+def assemble_context(documents, query, token_budget=CONTEXT_TOKEN_BUDGET,
+                     min_score=CONTEXT_MIN_SCORE):
+    """
+    Sélectionne et compacte les documents (LangChain) pour tenir dans le budget
+    Retourne (documents, tokens estimés du contexte)
+    """
+    from langchain_core.documents import Document
+
+    seen_lines, seen_urls = set(), set()
+    assembled, used = [], 0
+
+    for doc in documents:
+        score = doc.metadata.get("score")
+        if score is not None and score < min_score:
+            continue
+
+        snapshot = (set(seen_lines), set(seen_urls))
+        uid = doc.metadata.get("uid")
+        text = compact_chunk(doc.page_content, query, seen_lines, seen_urls, uid)
+        tokens = count_tokens(text)
+        remaining = token_budget - used
+
+        if tokens > remaining:
+            # Dernier document : on tente une description plus courte
+            seen_lines, seen_urls = snapshot
+            text = compact_chunk(doc.page_content, query, seen_lines, seen_urls, uid, max(remaining // 2, 0))
+            tokens = count_tokens(text)
+            if tokens > remaining:
+                break
+
+        assembled.append(Document(page_content=text, metadata=doc.metadata))
+        used += tokens
+
+    return assembled, used
@@ -1,11 +1,9 @@
 """
 Chargement des données depuis l'API Open Agenda
 """
-import requests
 import json
 import os
 from datetime import datetime, timedelta
-from tqdm import tqdm
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import (
@@ -13,9 +11,12 @@ from config import (
     OPENAGENDA_MAX_EVENTS,
     DATA_RAW_PATH
 )
+from src.telemetry import span, set_attributes
 
-# Configuration Lille
+# Configuration Lille (agenda par défaut, voir OPENAGENDA_AGENDAS pour les autres)
 AGENDA_UID = 57621068  # Ville de Lille
+AGENDA_SLUG = "ville-de-lille"
+AGENDA_CITY = "Lille"
 BASE_URL = "https://api.openagenda.com/v2"
 
 def get_date_range():
@@ -28,10 +29,13 @@ def get_date_range():
     )
     
 
-def fetch_events(size=100, after=None):
+@span("data_loader.fetch_events")
+def fetch_events(size=100, after=None, agenda_uid=AGENDA_UID):
     """
     Récupère une page d'événements depuis l'API Open Agenda
     """
+    from src.http_cache import cached_get
+
     date_min, date_max = get_date_range()
     
     headers = {"key": OPENAGENDA_API_KEY}
@@ -47,15 +51,18 @@ def fetch_events(size=100, after=None):
     if after:
         params["after"] = after
     
-    url = f"{BASE_URL}/agendas/{AGENDA_UID}/events"
-    response = requests.get(url, headers=headers, params=params)
+    url = f"{BASE_URL}/agendas/{agenda_uid}/events"
+    # Cache disque revalidé par ETag / Last-Modified (src/http_cache.py)
+    response = cached_get(url, params=params, headers=headers)
     
     if response.status_code != 200:
         raise Exception(f"Erreur API: {response.status_code} - {response.text}")
     
-    return response.json()
+    data = response.json()
+    set_attributes(http__status_code=response.status_code, events__count=len(data.get("events", [])))
+    return data
 
-def extract_event_data(event):
+def extract_event_data(event, agenda_slug=AGENDA_SLUG, default_city=AGENDA_CITY):
     """
     Extrait les informations utiles d'un événement
     """
@@ -88,32 +95,33 @@ def extract_event_data(event):
         "date_fin": last_timing.get("end", ""),
         "lieu": location.get("name", ""),
         "adresse": location.get("address", ""),
-        "ville": location.get("city", "Lille"),
+        "ville": location.get("city", default_city),
         "latitude": location.get("latitude"),
         "longitude": location.get("longitude"),
         "tarifs": event.get("tarifs", ""),
         "keywords": keywords_fr,
         "slug": event.get("slug", ""),
-        "url": f"https://openagenda.com/ville-de-lille/events/{event.get('slug', '')}"
+        "url": f"https://openagenda.com/{agenda_slug}/events/{event.get('slug', '')}"
     }
 
-def load_all_events():
+@span("data_loader.load_all_events")
+def load_all_events(agenda_uid=AGENDA_UID, agenda_slug=AGENDA_SLUG, city=AGENDA_CITY):
     """
-    Charge tous les événements avec pagination
+    Charge tous les événements d'un agenda avec pagination
     """
     all_events = []
     after = None
     page = 1
     today = datetime.now()
 
-    print(f"🔄 Chargement des événements de Lille...")
+    print(f"🔄 Chargement des événements de {city} ({agenda_slug})...")
     date_min, date_max = get_date_range()
     print(f"📅 Période : {date_min} → {date_max}")
 
     while len(all_events) < OPENAGENDA_MAX_EVENTS:
         print(f"📄 Page {page}...")
 
-        data = fetch_events(size=100, after=after)
+        data = fetch_events(size=100, after=after, agenda_uid=agenda_uid)
         events = data.get("events", [])
 
         if not events:
@@ -121,7 +129,7 @@ def load_all_events():
             break
 
         for event in events:
-            extracted = extract_event_data(event)
+            extracted = extract_event_data(event, agenda_slug, city)
             if extracted["title"] and extracted["description"]:
                 # ✅ Filtrer les événements dont la date_debut est dans le passé
                 date_debut_str = extracted.get("date_debut", "")
@@ -146,14 +154,16 @@ def load_all_events():
 
         page += 1
 
+    set_attributes(events__count=len(all_events), pages=page, agenda__slug=agenda_slug)
     return all_events
 
-def save_events(events):
+@span("data_loader.save_events")
+def save_events(events, filename="events_lille.json"):
     """
     Sauvegarde les événements en JSON
     """
     os.makedirs(DATA_RAW_PATH, exist_ok=True)
-    filepath = os.path.join(DATA_RAW_PATH, "events_lille.json")
+    filepath = os.path.join(DATA_RAW_PATH, filename)
     
     with open(filepath, "w", encoding="utf-8") as f:
         json.dump(events, f, ensure_ascii=False, indent=2)
@@ -162,11 +172,15 @@ def save_events(events):
     return filepath
 
 if __name__ == "__main__":
-    # Charger et sauvegarder les événements
-    events = load_all_events()
-    filepath = save_events(events)
+    from src.profiling import profiled
+
+    # Profil cProfile si PROFILE_ENABLED (src/profiling.py)
+    with profiled("data_loader.main"):
+        # Charger et sauvegarder les événements
+        events = load_all_events()
+        filepath = save_events(events)
     
-    # Afficher un exemple
-    if events:
-        print("\n📋 Exemple d'événement récupéré :")
-        print(json.dumps(events[0], ensure_ascii=False, indent=2))
\ No newline at end of file
+        # Afficher un exemple
+        if events:
+            print("\n📋 Exemple d'événement récupéré :")
+            print(json.dumps(events[0], ensure_ascii=False, indent=2))
\ No newline at end of file
@@ -5,7 +5,6 @@ import json
 import os
 import re
 import sys
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import (
@@ -14,6 +13,10 @@ from config import (
     CHUNK_SIZE,
     CHUNK_OVERLAP
 )
+from src.telemetry import span, set_attributes
+
+# À incrémenter quand le format des documents change : le pipeline les régénère (src/pipeline.py)
+PROCESSING_VERSION = 2
 
 def load_raw_events():
     """Charge les événements bruts"""
@@ -96,6 +99,64 @@ def create_event_text(event):
 
     return "\n".join(parts)
 
+# Catégories des réponses en liste (src/intent_router.py), sur du texte normalisé
+# (minuscules, sans accents, voir geo.normalize_place_text)
+CATEGORY_PATTERNS = {
+    "concert": r"\b(concerts?|musiques?|jazz|rock|rap|electro|orchestres?|recitals?|chansons?|chorales?)\b",
+    "exposition": r"\b(expositions?|expos?|vernissages?|galeries?)\b",
+    "théâtre": r"\b(theatres?|comedies?|pieces? de theatre)\b",
+    "spectacle": r"\b(spectacles?|cirques?|humour|one man show|magie|marionnettes?)\b",
+    "danse": r"\b(danses?|ballets?|choregraphi\w*)\b",
+    "cinéma": r"\b(cinemas?|films?|projections?|courts? metrages?)\b",
+    "atelier": r"\b(ateliers?|stages?|initiations?)\b",
+    "conférence": r"\b(conferences?|debats?|tables? rondes?)\b",
+    "visite": r"\b(visites?|balades?|parcours)\b",
+    "festival": r"\b(festivals?)\b",
+}
+FREE_PATTERN = re.compile(r"\b(gratuit\w*|entree libre|acces libre|libre participation)\b")
+PRICE_PATTERN = re.compile(r"\d+(?:[.,]\d+)?\s*(?:€|eur\b|euros?\b)")
+KIDS_PATTERN = re.compile(
+    r"\b(enfants?|jeune public|jeunesse|famille|familial\w*|des \d+ ans|a partir de \d+ ans|bebes?)\b"
+)
+
+def categorize_event(event):
+    """
+    Attributs des réponses en liste, calculés une fois à l'ingestion
+    categories : catégories reconnues dans le titre et les mots-clés (sinon la description)
+    gratuit    : True / False selon les tarifs, None si inconnu
+    jeune_public : événement pour enfants ou familles
+    """
+    from src.geo import normalize_place_text
+
+    headline = normalize_place_text(" ".join([event.get("title") or ""] + list(event.get("keywords") or [])))
+    description = normalize_place_text(event.get("description") or "")
+    categories = [name for name, pattern in CATEGORY_PATTERNS.items() if re.search(pattern, headline)]
+    if not categories:
+        categories = [name for name, pattern in CATEGORY_PATTERNS.items() if re.search(pattern, description)]
+
+    tarifs = normalize_place_text(event.get("tarifs") or "")
+    raw_tarifs = (event.get("tarifs") or "").lower()
+    if PRICE_PATTERN.search(raw_tarifs) and not re.search(r"\b0\s*€", raw_tarifs):
+        gratuit = False
+    elif FREE_PATTERN.search(tarifs) or (not tarifs and FREE_PATTERN.search(description)):
+        gratuit = True
+    else:
+        gratuit = None
+
+    return {
+        "categories": categories,
+        "gratuit": gratuit,
+        "jeune_public": bool(KIDS_PATTERN.search(f"{headline} {description}"))
+    }
+
+def parse_coordinate(value):
+    """Convertit une latitude/longitude Open Agenda en float (None si absente ou invalide)"""
+    try:
+        return float(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+@span("data_processor.filter_events")
 def filter_events(events):
     """
     Filtre les événements invalides
@@ -119,12 +180,15 @@ def filter_events(events):
 
     print(f"🧹 {removed} événements supprimés (données insuffisantes)")
     print(f"✅ {len(filtered)} événements conservés")
+    set_attributes(events__kept=len(filtered), events__removed=removed)
     return filtered
 
 def chunk_text(text, metadata, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
     """
     Découpe un texte long en chunks avec chevauchement
     """
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap,
@@ -148,9 +212,11 @@ def chunk_text(text, metadata, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLA
     
     return chunked_documents
 
-def process_events(events):
+@span("data_processor.process_events")
+def process_events(events, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
     """
     Traite tous les événements et crée les documents avec chunking
+    (les paramètres de découpage sont surchargeables pour les balayages d'évaluation)
     """
     all_documents = []
 
@@ -167,14 +233,18 @@ def process_events(events):
                 "lieu": event.get("lieu", ""),
                 "adresse": event.get("adresse", ""),
                 "ville": event.get("ville", "Lille"),
+                "latitude": parse_coordinate(event.get("latitude")),
+                "longitude": parse_coordinate(event.get("longitude")),
                 "tarifs": event.get("tarifs", ""),
                 "url": event.get("url", ""),
-                "keywords": event.get("keywords", [])
+                "keywords": event.get("keywords", []),
+                # Index des réponses en liste (catégorie, date, prix) : src/intent_router.py
+                **categorize_event(event)
             }
 
             # Chunking : découper si le texte est trop long
-            if len(text) > CHUNK_SIZE:
-                chunks = chunk_text(text, metadata)
+            if len(text) > chunk_size:
+                chunks = chunk_text(text, metadata, chunk_size, chunk_overlap)
                 all_documents.extend(chunks)
                 print(f"📄 Événement '{metadata['title'][:50]}...' découpé en {len(chunks)} chunks")
             else:
@@ -188,8 +258,10 @@ def process_events(events):
                     }
                 })
 
+    set_attributes(events__count=len(events), documents__count=len(all_documents), chunk__size=chunk_size)
     return all_documents
 
+@span("data_processor.save_processed_events")
 def save_processed_events(documents):
     """Sauvegarde les documents traités"""
     os.makedirs(DATA_PROCESSED_PATH, exist_ok=True)
@@ -202,21 +274,25 @@ def save_processed_events(documents):
     return filepath
 
 if __name__ == "__main__":
-    # 1. Charger les données brutes
-    events = load_raw_events()
+    from src.profiling import profiled
+
+    # Profil cProfile si PROFILE_ENABLED (src/profiling.py)
+    with profiled("data_processor.main"):
+        # 1. Charger les données brutes
+        events = load_raw_events()
 
-    # 2. Filtrer les événements invalides
-    events = filter_events(events)
+        # 2. Filtrer les événements invalides
+        events = filter_events(events)
 
-    # 3. Traiter et structurer les données avec chunking
-    print("\n🔪 Application du chunking...")
-    documents = process_events(events)
+        # 3. Traiter et structurer les données avec chunking
+        print("\n🔪 Application du chunking...")
+        documents = process_events(events)
 
-    # 4. Sauvegarder
-    filepath = save_processed_events(documents)
+        # 4. Sauvegarder
+        filepath = save_processed_events(documents)
 
-    # 5. Afficher un exemple
-    if documents:
-        print("\n📋 Exemple de document traité :")
-        print(documents[0]["text"])
-        print(f"\n📊 Métadonnées : chunk {documents[0]['metadata']['chunk_index']+1}/{documents[0]['metadata']['total_chunks']}")
\ No newline at end of file
+        # 5. Afficher un exemple
+        if documents:
+            print("\n📋 Exemple de document traité :")
+            print(documents[0]["text"])
+            print(f"\n📊 Métadonnées : chunk {documents[0]['metadata']['chunk_index']+1}/{documents[0]['metadata']['total_chunks']}")
\ No newline at end of file
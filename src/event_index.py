@@ -0,0 +1,139 @@
+"""
+Index des événements : centroïde (moyenne normée) des embeddings des chunks de chaque uid
+
+Recherche en deux temps :
+1. les événements les plus proches de la question, par similarité avec leur centroïde
+2. les chunks de ces seuls événements, scorés exactement avec les vecteurs pleine précision
+
+Le coût de la recherche dépend du nombre d'événements, plus du nombre de chunks.
+Les centroïdes sont calculés à l'ingestion et sauvegardés avec l'index (EVENT_CENTROIDS_FILENAME).
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import TOP_K_RESULTS, EVENT_CANDIDATES_FACTOR
+
+EVENT_CENTROIDS_FILENAME = "event_centroids.npy"
+
+def group_chunks(metadatas):
+    """
+    Regroupe les chunks par uid (ordre de première apparition)
+    Retourne (uids, événement de chaque chunk) ; un chunk sans uid est son propre événement
+    """
+    import numpy as np
+
+    positions, uids = {}, []
+    event_of_chunk = np.empty(len(metadatas), dtype=np.int64)
+    for row, metadata in enumerate(metadatas):
+        uid = metadata.get("uid")
+        key = uid if uid is not None else ("chunk", row)
+        if key not in positions:
+            positions[key] = len(uids)
+            uids.append(uid)
+        event_of_chunk[row] = positions[key]
+    return uids, event_of_chunk
+
+def compute_centroids(vectors, event_of_chunk, n_events):
+    """Moyenne des vecteurs des chunks de chaque événement, normée (similarité cosinus)"""
+    import numpy as np
+
+    centroids = np.zeros((n_events, vectors.shape[1]), dtype=np.float32)
+    np.add.at(centroids, event_of_chunk, np.asarray(vectors, dtype=np.float32))
+    centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+    return centroids
+
+def save_event_centroids(path, vectors, metadatas):
+    """Écrit les centroïdes des événements dans le dossier de l'index (écriture atomique)"""
+    import numpy as np
+
+    uids, event_of_chunk = group_chunks(metadatas)
+    centroids_path = os.path.join(path, EVENT_CENTROIDS_FILENAME)
+    with open(centroids_path + ".tmp", "wb") as f:
+        np.save(f, compute_centroids(vectors, event_of_chunk, len(uids)))
+    os.replace(centroids_path + ".tmp", centroids_path)
+    print(f"💾 Centroïdes de {len(uids)} événements sauvegardés : {centroids_path}")
+
+class EventIndex:
+    """
+    Centroïdes des événements et chunks de chacun
+    vectors : vecteurs pleine précision des chunks (éventuellement en mémoire mappée),
+    seules les lignes des chunks candidats sont lues
+    """
+
+    def __init__(self, centroids, uids, event_of_chunk, vectors):
+        import numpy as np
+
+        self.centroids = centroids
+        self.uids = uids
+        self.event_of_chunk = event_of_chunk
+        self.vectors = vectors
+        # Chunks de chaque événement, triés par position (lecture séquentielle du fichier mappé)
+        order = np.argsort(event_of_chunk, kind="stable")
+        bounds = np.searchsorted(event_of_chunk[order], np.arange(len(uids) + 1))
+        self.chunks = [order[bounds[e]:bounds[e + 1]] for e in range(len(uids))]
+
+    @classmethod
+    def from_vectors(cls, vectors, metadatas):
+        """Calcule les centroïdes à partir des vecteurs des chunks"""
+        uids, event_of_chunk = group_chunks(metadatas)
+        return cls(compute_centroids(vectors, event_of_chunk, len(uids)), uids, event_of_chunk, vectors)
+
+    @classmethod
+    def load(cls, path, metadatas, vectors):
+        """
+        Centroïdes sauvegardés avec l'index (recalculés s'ils manquent ou ne correspondent plus)
+        None sans vecteurs pleine précision
+        """
+        import numpy as np
+
+        if vectors is None or len(vectors) != len(metadatas):
+            return None
+        centroids_path = os.path.join(path, EVENT_CENTROIDS_FILENAME) if path else None
+        uids, event_of_chunk = group_chunks(metadatas)
+        if centroids_path and os.path.exists(centroids_path):
+            centroids = np.load(centroids_path)
+            if len(centroids) == len(uids):
+                return cls(centroids, uids, event_of_chunk, vectors)
+        return cls.from_vectors(vectors, metadatas)
+
+    def __len__(self):
+        return len(self.uids)
+
+    def top_events(self, query_vector, n_events, dead=None):
+        """
+        Les n_events événements les plus proches (hors événements dont tous les chunks sont expirés)
+        Retourne (positions des événements, similarités avec leur centroïde)
+        """
+        import numpy as np
+
+        scores = self.centroids @ query_vector
+        if dead is not None and dead.any():
+            alive = np.bincount(self.event_of_chunk[~dead], minlength=len(self.uids)) > 0
+            scores = np.where(alive, scores, -np.inf)
+
+        n_events = min(n_events, len(scores))
+        top = np.argpartition(-scores, n_events - 1)[:n_events]
+        top = top[np.argsort(-scores[top])]
+        top = top[np.isfinite(scores[top])]
+        return top, scores[top]
+
+    def search(self, query_vector, top_k=TOP_K_RESULTS, n_events=None, dead=None):
+        """
+        Recherche en deux temps pour une requête (vecteur normé)
+        Retourne (scores, ids, event_scores) : scores et ids de forme (1, top_k) comme
+        search_by_vector, event_scores {id du chunk: similarité de son événement}
+        """
+        import numpy as np
+        from src.vector_store import rerank
+
+        events, event_scores = self.top_events(query_vector, n_events or top_k * EVENT_CANDIDATES_FACTOR, dead)
+        candidates = np.concatenate([self.chunks[e] for e in events]) if len(events) else np.empty(0, np.int64)
+        if dead is not None and len(candidates):
+            candidates = candidates[~dead[candidates]]
+
+        scores, ids = rerank(query_vector.reshape(1, -1), candidates.reshape(1, -1), self.vectors, top_k)
+        by_event = dict(zip(events.tolist(), event_scores.tolist()))
+        return scores, ids, {
+            int(idx): by_event[int(self.event_of_chunk[idx])] for idx in ids[0] if idx != -1
+        }
@@ -0,0 +1,237 @@
+"""
+Expiration des événements passés entre deux ingestions
+
+- chaque chunk expire à la date de fin de son événement ("date_fin")
+- les chunks expirés sont masqués à la recherche par une bitmap (tombstones)
+- au-delà de COMPACTION_DEAD_FRACTION de chunks expirés, l'index est compacté
+  en arrière-plan (suppression des vecteurs, sauvegarde, remplacement à chaud) ;
+  une tentative sans effet n'est retentée sur le même index qu'après COMPACTION_RETRY_SECONDS
+"""
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import EXPIRY_REFRESH_SECONDS, COMPACTION_DEAD_FRACTION, COMPACTION_RETRY_SECONDS
+from src.telemetry import span, set_attributes
+
+def parse_end_date(date_str):
+    """Date de fin ISO (Open Agenda) -> timestamp, None si absente ou invalide"""
+    if not date_str:
+        return None
+    try:
+        return datetime.fromisoformat(date_str.replace("Z", "+00:00")).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+def end_timestamps(metadatas):
+    """Timestamps de fin des documents (infini si pas de date : jamais expirés)"""
+    import numpy as np
+
+    ends = [parse_end_date(metadata.get("date_fin")) for metadata in metadatas]
+    return np.array([end if end is not None else np.inf for end in ends], dtype=np.float64)
+
+class ExpiryTracker:
+    """
+    Tombstones des documents d'un index (positions = ids Faiss)
+    La bitmap des vivants est recalculée au plus toutes les refresh_seconds
+    """
+
+    def __init__(self, end_times, refresh_seconds=EXPIRY_REFRESH_SECONDS):
+        import numpy as np
+
+        self.end_times = np.asarray(end_times, dtype=np.float64)
+        self.refresh_seconds = refresh_seconds
+        self.dead = np.zeros(len(self.end_times), dtype=bool)
+        self.alive_bitmap = np.packbits(~self.dead, bitorder="little")
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_documents(cls, metadatas, refresh_seconds=EXPIRY_REFRESH_SECONDS):
+        return cls(end_timestamps(metadatas), refresh_seconds)
+
+    def __len__(self):
+        return len(self.end_times)
+
+    @property
+    def dead_count(self):
+        return int(self.dead.sum())
+
+    @property
+    def dead_fraction(self):
+        return self.dead_count / len(self) if len(self) else 0.0
+
+    def refresh(self, now=None):
+        """
+        Marque les documents dont la date de fin est passée
+        Retourne la bitmap (uint8, bits little-endian) des documents vivants
+        """
+        import numpy as np
+
+        current = time.time() if now is None else now
+        with self._lock:
+            if now is None and self._checked_at is not None \
+                    and current - self._checked_at < self.refresh_seconds:
+                return self.alive_bitmap
+
+            dead = self.end_times < current
+            if (dead != self.dead).any():
+                self.dead = dead
+                # Nouvel objet : les recherches en cours gardent l'ancienne bitmap
+                self.alive_bitmap = np.packbits(~dead, bitorder="little")
+            self._checked_at = current
+            return self.alive_bitmap
+
+    def is_alive(self, position):
+        return not self.dead[position]
+
+    def needs_compaction(self, threshold=COMPACTION_DEAD_FRACTION):
+        return self.dead_fraction > threshold
+
+@span("expiry.compact_index")
+def compact_index(index, documents, dead, full_vectors=None):
+    """
+    Supprime les documents expirés d'un index (copie, l'original reste utilisable)
+    Retourne (index, documents, full_vectors) compactés, dans l'ordre d'origine
+    """
+    import faiss
+    import numpy as np
+
+    dead = np.asarray(dead, dtype=bool)
+    # Copie par sérialisation : clone_index ne sait pas copier les transformations (ACP)
+    compacted = faiss.deserialize_index(faiss.serialize_index(index))
+    compacted.remove_ids(np.flatnonzero(dead).astype(np.int64))
+
+    kept = np.flatnonzero(~dead)
+    documents = [documents[i] for i in kept]
+    vectors = np.asarray(full_vectors[kept]) if full_vectors is not None else None
+
+    set_attributes(compaction__removed=int(dead.sum()), compaction__kept=len(kept))
+    return compacted, documents, vectors
+
+# ========================================
+# COMPACTION EN ARRIÈRE-PLAN
+# ========================================
+
+_compaction_thread = None
+_compaction_lock = threading.Lock()
+# Dernière tentative par retriever : {id(retriever): (génération de l'index, instant)}
+_compaction_attempts = {}
+
+def maybe_start_compaction(retriever, retry_after=COMPACTION_RETRY_SECONDS):
+    """
+    Lance la compaction en arrière-plan si la part de documents expirés dépasse le seuil
+    (une seule compaction à la fois). Retourne True si une compaction a démarré
+    Une compaction réussie change la génération de l'index ; sinon (échec, abandon),
+    la même génération n'est retentée qu'après retry_after secondes
+    """
+    global _compaction_thread
+
+    if retriever.expiry is None or not retriever.expiry.needs_compaction():
+        return False
+    with _compaction_lock:
+        if _compaction_thread is not None and _compaction_thread.is_alive():
+            return False
+        generation, now = retriever.generation, time.monotonic()
+        last = _compaction_attempts.get(id(retriever))
+        if last is not None and last[0] == generation and now - last[1] < retry_after:
+            return False
+        _compaction_attempts[id(retriever)] = (generation, now)
+        _compaction_thread = threading.Thread(
+            target=_run_compaction, args=(retriever,), name="index-compaction", daemon=True
+        )
+        _compaction_thread.start()
+    return True
+
+def _run_compaction(retriever):
+    from src.event_index import EventIndex
+    from src.geo import GeoIndex
+    from src.index_versions import current_version, publish_version, split_version_path, version_path
+    from src.local_embeddings import LocalIndex
+    from src.rag_chain import build_langchain_store
+    from src.vector_store import save_vector_store, load_full_precision_vectors, has_vector_store
+
+    try:
+        generation = retriever.generation
+        (vector_store, full_vectors_in_use, _, expiry,
+         event_index_in_use, local_index_in_use) = retriever.current_index()
+        dead = expiry.dead.copy()
+        documents = [
+            {"text": doc.page_content, "metadata": doc.metadata}
+            for doc in (
+                vector_store.docstore.search(vector_store.index_to_docstore_id[i])
+                for i in range(vector_store.index.ntotal)
+            )
+        ]
+        path = retriever.store_path
+        saved = path is not None and has_vector_store(path)
+        full_vectors = full_vectors_in_use
+        if full_vectors is None and saved:
+            full_vectors = load_full_precision_vectors(path)
+        if full_vectors is not None and len(full_vectors) != len(documents):
+            full_vectors = None
+
+        index, documents, vectors = compact_index(vector_store.index, documents, dead, full_vectors)
+
+        # Sur disque d'abord : un redémarrage repart de l'index compacté
+        # Version publiée : jamais réécrite, le résultat devient une nouvelle version (rollback intact)
+        versioned = split_version_path(path) if saved else None
+        if versioned:
+            root, version = versioned
+            if current_version(root) != version:
+                print("ℹ️ Compaction ignorée : une autre version de l'index est devenue courante")
+                return
+            path = version_path(publish_version(index, documents, vectors, root), root)
+        elif saved:
+            save_vector_store(index, documents, vectors, path)
+
+        new_full_vectors = None
+        if full_vectors_in_use is not None:
+            new_full_vectors = load_full_precision_vectors(path) if saved else vectors
+
+        metadatas = [doc["metadata"] for doc in documents]
+        new_event_index = None
+        if event_index_in_use is not None:
+            new_event_index = EventIndex.load(path if saved else None, metadatas,
+                                              load_full_precision_vectors(path) if saved else vectors)
+        new_local_index = None
+        if local_index_in_use is not None:
+            new_local_index = (LocalIndex.load(path) if saved
+                               else LocalIndex.build([doc["text"] for doc in documents]))
+        swapped = retriever.swap_index(
+            vector_store=build_langchain_store(vector_store.embedding_function, index, documents),
+            full_vectors=new_full_vectors,
+            geo_index=GeoIndex.from_documents(metadatas),
+            expiry=ExpiryTracker.from_documents(metadatas, expiry.refresh_seconds),
+            event_index=new_event_index,
+            local_index=new_local_index,
+            store_path=path,
+            if_generation=generation,
+        )
+        if swapped is None:
+            # Une nouvelle version a été chargée pendant la compaction : elle prime
+            print("ℹ️ Compaction ignorée : l'index a été remplacé entre-temps")
+            return
+        print(f"🧹 Index compacté : {int(dead.sum())} documents expirés supprimés, {index.ntotal} restants")
+    except Exception as e:
+        print(f"❌ Erreur pendant la compaction : {e}")
+
+if __name__ == "__main__":
+    # Compaction hors ligne de l'index servi (sans attendre le seuil), publiée en nouvelle version
+    from src.index_versions import active_store_path, publish_version
+    from src.vector_store import load_vector_store, load_full_precision_vectors
+
+    path = active_store_path()
+    index, documents = load_vector_store(path)
+    tracker = ExpiryTracker.from_documents([doc["metadata"] for doc in documents])
+    tracker.refresh()
+    print(f"⏳ {tracker.dead_count}/{len(tracker)} documents expirés ({tracker.dead_fraction:.1%})")
+
+    if tracker.dead_count:
+        index, documents, vectors = compact_index(index, documents, tracker.dead,
+                                                  load_full_precision_vectors(path))
+        version = publish_version(index, documents, vectors)
+        print(f"✅ Index compacté : {index.ntotal} vecteurs (version {version})")
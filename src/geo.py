@@ -0,0 +1,221 @@
+"""
+Index géographique des événements (questions "près de la gare", "autour de moi")
+
+- gazetteer local des lieux repères et stations de métro de Lille
+- grille spatiale (cellules de GEO_CELL_KM) sur les coordonnées des chunks
+- recherche par rayon ou des k plus proches, combinable avec la similarité vectorielle
+"""
+import math
+import os
+import re
+import sys
+import unicodedata
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import GEO_RADIUS_KM, GEO_CELL_KM
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+
+# Lieux repères et stations de métro (coordonnées approximatives, WGS84)
+# nom affiché -> ((latitude, longitude), alias normalisés)
+GAZETTEER = {
+    "Gare Lille-Flandres": ((50.6365, 3.0707), ["gare", "gare lille flandres", "lille flandres", "gare de lille"]),
+    "Gare Lille-Europe": ((50.6392, 3.0757), ["gare lille europe", "lille europe"]),
+    "Grand'Place": ((50.6370, 3.0633), ["grand place", "grand'place", "place du general de gaulle"]),
+    "Vieux-Lille": ((50.6410, 3.0630), ["vieux lille"]),
+    "Citadelle": ((50.6410, 3.0445), ["citadelle", "bois de boulogne"]),
+    "Palais des Beaux-Arts": ((50.6306, 3.0626), ["palais des beaux arts", "beaux arts"]),
+    "Opéra de Lille": ((50.6383, 3.0667), ["opera", "opera de lille"]),
+    "Euralille": ((50.6366, 3.0752), ["euralille"]),
+    "Lille Grand Palais": ((50.6327, 3.0766), ["lille grand palais", "grand palais"]),
+    "Zénith de Lille": ((50.6334, 3.0780), ["zenith"]),
+    "Hôtel de Ville": ((50.6315, 3.0704), ["hotel de ville", "mairie de lille", "beffroi"]),
+    "Wazemmes": ((50.6275, 3.0495), ["wazemmes", "marche de wazemmes"]),
+    "Stade Pierre-Mauroy": ((50.6119, 3.1305), ["stade pierre mauroy", "grand stade"]),
+    "Gare Saint-Sauveur": ((50.6297, 3.0727), ["saint sauveur", "gare saint sauveur"]),
+    "Station Rihour": ((50.6357, 3.0610), ["rihour"]),
+    "Station République - Beaux-Arts": ((50.6313, 3.0616), ["republique", "republique beaux arts"]),
+    "Station Gambetta": ((50.6259, 3.0540), ["gambetta"]),
+    "Station Porte des Postes": ((50.6199, 3.0448), ["porte des postes"]),
+    "Station CHU - Eurasanté": ((50.6107, 3.0367), ["chu", "eurasante"]),
+    "Station Porte de Douai": ((50.6225, 3.0717), ["porte de douai"]),
+    "Station Porte de Valenciennes": ((50.6252, 3.0778), ["porte de valenciennes"]),
+    "Station Fives": ((50.6322, 3.0896), ["fives"]),
+    "Station Caulier": ((50.6433, 3.0878), ["caulier"]),
+    "Station Cormontaigne": ((50.6303, 3.0432), ["cormontaigne"]),
+    "Station Montebello": ((50.6243, 3.0452), ["montebello"]),
+    "Station Bois Blancs": ((50.6344, 3.0318), ["bois blancs"]),
+    "Station Marbrerie": ((50.6355, 3.1018), ["marbrerie"]),
+}
+
+# Expressions de proximité ("près de", "autour de", "à côté de"...), sur texte normalisé
+PROXIMITY_PATTERN = re.compile(
+    r"\b(pres|proche|autour|a cote|a proximite|aux alentours|non loin|pas loin|vers)\b"
+)
+NEAR_ME_PATTERN = re.compile(r"\b(pres de moi|autour de moi|a cote de moi|proche de moi|ou je suis)\b")
+
+def normalize_place_text(text):
+    """Minuscules, sans accents ni ponctuation (pour la recherche dans le gazetteer)"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = re.sub(r"[^\w']+", " ", text.replace("-", " "))
+    return " ".join(text.split())
+
+def resolve_place(text):
+    """
+    Cherche un lieu du gazetteer dans un texte (alias le plus long en priorité)
+    Retourne (nom, latitude, longitude) ou None
+    """
+    normalized = f" {normalize_place_text(text)} "
+    best = None
+    for name, ((lat, lon), aliases) in GAZETTEER.items():
+        for alias in aliases:
+            if f" {alias} " in normalized and (best is None or len(alias) > best[0]):
+                best = (len(alias), name, lat, lon)
+    return best[1:] if best else None
+
+def locate_query(query, user_location=None):
+    """
+    Point de référence d'une question de proximité
+    "près de la gare" -> gazetteer, "près de moi" -> user_location (latitude, longitude)
+    Retourne (nom, latitude, longitude) ou None si la question n'est pas géographique
+    """
+    normalized = normalize_place_text(query)
+    if user_location and NEAR_ME_PATTERN.search(normalized):
+        return ("votre position", user_location[0], user_location[1])
+    if not PROXIMITY_PATTERN.search(normalized):
+        return None
+    return resolve_place(query)
+
+def haversine_km(lat, lon, lats, lons):
+    """Distance orthodromique (km) entre un point et des tableaux de points"""
+    import numpy as np
+
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+class GeoIndex:
+    """
+    Grille spatiale sur les coordonnées des documents
+    Les positions renvoyées sont celles des documents (= ids de l'index Faiss)
+    Les documents sans coordonnées ne sont pas indexés
+    """
+
+    def __init__(self, latitudes, longitudes, positions, cell_km=GEO_CELL_KM):
+        import numpy as np
+
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+        self.positions = np.asarray(positions, dtype=np.int64)
+        self.cell_km = cell_km
+
+        # Projection équirectangulaire locale : suffisante à l'échelle d'une métropole
+        self.origin = (
+            float(self.latitudes.mean()) if len(self.latitudes) else 0.0,
+            float(self.longitudes.mean()) if len(self.longitudes) else 0.0,
+        )
+        self.cells = {}
+        for i, (cx, cy) in enumerate(zip(*self._cell_of(self.latitudes, self.longitudes))):
+            self.cells.setdefault((int(cx), int(cy)), []).append(i)
+        self.cells = {cell: np.array(rows, dtype=np.int64) for cell, rows in self.cells.items()}
+
+    @classmethod
+    def from_documents(cls, metadatas, cell_km=GEO_CELL_KM):
+        """Construit l'index à partir des métadonnées des documents (dans l'ordre de l'index Faiss)"""
+        latitudes, longitudes, positions = [], [], []
+        for position, metadata in enumerate(metadatas):
+            lat, lon = metadata.get("latitude"), metadata.get("longitude")
+            if lat is None or lon is None:
+                continue
+            latitudes.append(lat)
+            longitudes.append(lon)
+            positions.append(position)
+        return cls(latitudes, longitudes, positions, cell_km)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _cell_of(self, lats, lons):
+        import numpy as np
+
+        lat0, lon0 = self.origin
+        x = (np.asarray(lons) - lon0) * KM_PER_DEGREE * math.cos(math.radians(lat0))
+        y = (np.asarray(lats) - lat0) * KM_PER_DEGREE
+        return (np.floor(x / self.cell_km).astype(np.int64),
+                np.floor(y / self.cell_km).astype(np.int64))
+
+    def _rows_in_ring(self, center, ring):
+        """Lignes des cellules à distance de Chebyshev `ring` de la cellule centrale"""
+        cx, cy = center
+        rows = []
+        for dx in range(-ring, ring + 1):
+            for dy in range(-ring, ring + 1):
+                if max(abs(dx), abs(dy)) != ring:
+                    continue
+                cell = self.cells.get((cx + dx, cy + dy))
+                if cell is not None:
+                    rows.append(cell)
+        return rows
+
+    def _max_ring(self, center):
+        if not self.cells:
+            return 0
+        return max(max(abs(cx - center[0]), abs(cy - center[1])) for cx, cy in self.cells)
+
+    def within_radius(self, lat, lon, radius_km=GEO_RADIUS_KM):
+        """
+        Documents à moins de radius_km du point, triés par distance
+        Retourne (positions, distances_km)
+        """
+        import numpy as np
+
+        if not len(self):
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        cx, cy = self._cell_of(lat, lon)
+        center = (int(cx), int(cy))
+        # +1 anneau : marge pour l'écart entre projection locale et distance orthodromique
+        rings = min(int(math.ceil(radius_km / self.cell_km)) + 1, self._max_ring(center))
+        rows = [cell for ring in range(rings + 1) for cell in self._rows_in_ring(center, ring)]
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        rows = np.concatenate(rows)
+        distances = haversine_km(lat, lon, self.latitudes[rows], self.longitudes[rows])
+        keep = distances <= radius_km
+        order = np.argsort(distances[keep], kind="stable")
+        return self.positions[rows[keep][order]], distances[keep][order]
+
+    def nearest(self, lat, lon, k):
+        """
+        k documents les plus proches du point (parcours des cellules en anneaux)
+        Retourne (positions, distances_km)
+        """
+        import numpy as np
+
+        if not len(self) or k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        cx, cy = self._cell_of(lat, lon)
+        center = (int(cx), int(cy))
+        max_ring = self._max_ring(center)
+        rows, ring = [], 0
+        while ring <= max_ring:
+            rows.extend(self._rows_in_ring(center, ring))
+            if sum(len(cell) for cell in rows) >= k:
+                candidates = np.concatenate(rows)
+                kth = np.partition(
+                    haversine_km(lat, lon, self.latitudes[candidates], self.longitudes[candidates]), k - 1
+                )[k - 1]
+                # Les cellules hors de l'anneau courant sont à plus de ring x cell_km
+                if kth <= ring * self.cell_km:
+                    break
+            ring += 1
+
+        rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+        distances = haversine_km(lat, lon, self.latitudes[rows], self.longitudes[rows])
+        order = np.argsort(distances, kind="stable")[:k]
+        return self.positions[rows[order]], distances[order]
@@ -0,0 +1,197 @@
+"""
+Cache HTTP sur disque pour l'API Open Agenda
+
+- une entrée par URL + paramètres : corps de la réponse et validateurs (ETag, Last-Modified) ;
+  les bornes de dates (VOLATILE_PARAMS), qui changent chaque jour, ne font pas partie de la clé
+- requêtes conditionnelles (If-None-Match / If-Modified-Since) : sur une réponse 304,
+  le corps en cache est réutilisé sans être retéléchargé
+- réponses compressées demandées (Accept-Encoding), connexions keep-alive (Session)
+- taille bornée (HTTP_CACHE_MAX_BYTES) : les entrées les moins récemment utilisées sont supprimées
+"""
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import HTTP_CACHE_ENABLED, HTTP_CACHE_PATH, HTTP_CACHE_MAX_BYTES, OPENAGENDA_TIMEOUT
+from src.telemetry import record_cache, set_attributes
+
+META_SUFFIX = ".json"
+BODY_SUFFIX = ".body"
+# Paramètres recalculés à chaque exécution (fenêtre glissante "aujourd'hui + 1 an") :
+# exclus de la clé pour que la revalidation ETag / Last-Modified s'applique d'un jour à l'autre
+VOLATILE_PARAMS = ("timings[gte]", "timings[lte]")
+
+class CachedResponse:
+    """Réponse HTTP (éventuellement servie par le cache)"""
+
+    def __init__(self, status_code, content, headers=None, from_cache=False):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+        self.from_cache = from_cache
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+class HttpCache:
+    """Entrées sur disque : <clé>.json (URL, validateurs) et <clé>.body (corps)"""
+
+    def __init__(self, path=HTTP_CACHE_PATH, max_bytes=HTTP_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(url, params=None):
+        """
+        Clé stable : URL et paramètres triés, hors VOLATILE_PARAMS
+        (l'en-tête d'authentification n'en fait pas partie)
+        """
+        stable = {name: value for name, value in (params or {}).items() if name not in VOLATILE_PARAMS}
+        payload = json.dumps({"url": url, "params": stable}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _file(self, key, suffix):
+        return os.path.join(self.path, key + suffix)
+
+    def get(self, key):
+        """(métadonnées, corps) d'une entrée, None si absente ou incomplète"""
+        try:
+            with open(self._file(key, META_SUFFIX), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(self._file(key, BODY_SUFFIX), "rb") as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        return meta, body
+
+    def touch(self, key):
+        """Marque une entrée comme récemment utilisée (ordre d'éviction)"""
+        try:
+            os.utime(self._file(key, META_SUFFIX))
+        except OSError:
+            pass
+
+    def put(self, key, meta, body):
+        os.makedirs(self.path, exist_ok=True)
+        with self._lock:
+            # Corps écrit avant les métadonnées : une entrée lisible est toujours complète
+            for suffix, data, mode in ((BODY_SUFFIX, body, "wb"),
+                                       (META_SUFFIX, json.dumps(meta, ensure_ascii=False), "w")):
+                target = self._file(key, suffix)
+                with open(target + ".tmp", mode, **({} if mode == "wb" else {"encoding": "utf-8"})) as f:
+                    f.write(data)
+                os.replace(target + ".tmp", target)
+            self.evict()
+
+    def entries(self):
+        """[(dernier accès, taille, clé)] de toutes les entrées"""
+        if not os.path.isdir(self.path):
+            return []
+        entries = []
+        for name in os.listdir(self.path):
+            if not name.endswith(META_SUFFIX):
+                continue
+            key = name[:-len(META_SUFFIX)]
+            try:
+                last_used = os.path.getmtime(self._file(key, META_SUFFIX))
+                size = os.path.getsize(self._file(key, META_SUFFIX)) + os.path.getsize(self._file(key, BODY_SUFFIX))
+            except OSError:
+                continue
+            entries.append((last_used, size, key))
+        return entries
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """Supprime les entrées les moins récemment utilisées au-delà de max_bytes"""
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, key in entries:
+            if total <= self.max_bytes:
+                break
+            for suffix in (META_SUFFIX, BODY_SUFFIX):
+                try:
+                    os.remove(self._file(key, suffix))
+                except OSError:
+                    pass
+            total -= size
+            removed += 1
+        return removed
+
+# ========================================
+# REQUÊTES
+# ========================================
+
+_session = None
+_cache = None
+
+def get_session():
+    """Session requests partagée (connexions keep-alive), créée au premier appel"""
+    global _session
+    if _session is None:
+        import requests
+        _session = requests.Session()
+    return _session
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        _cache = HttpCache()
+    return _cache
+
+def cached_get(url, params=None, headers=None, cache=None, session=None,
+               timeout=OPENAGENDA_TIMEOUT, enabled=HTTP_CACHE_ENABLED):
+    """
+    GET avec revalidation : le corps en cache est réutilisé si le serveur répond 304
+    Retourne un CachedResponse (status_code 200 pour une réponse servie par le cache)
+    """
+    session = session or get_session()
+    headers = {**(headers or {}), "Accept-Encoding": "gzip, deflate"}
+    if not enabled:
+        response = session.get(url, params=params, headers=headers, timeout=timeout)
+        return CachedResponse(response.status_code, response.content, dict(response.headers))
+
+    cache = cache or get_cache()
+    key = cache.key(url, params)
+    entry = cache.get(key)
+    if entry:
+        meta, _ = entry
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    response = session.get(url, params=params, headers=headers, timeout=timeout)
+
+    if response.status_code == 304 and entry:
+        meta, body = entry
+        cache.touch(key)
+        record_cache("openagenda_http", True)
+        set_attributes(http__cache="revalidated", http__status_code=304)
+        return CachedResponse(200, body, meta.get("headers"), from_cache=True)
+
+    record_cache("openagenda_http", False)
+    set_attributes(http__cache="miss", http__bytes=len(response.content))
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if response.status_code == 200 and (etag or last_modified):
+        cache.put(key, {
+            "url": url,
+            "params": params or {},
+            "etag": etag,
+            "last_modified": last_modified,
+            "headers": {"Content-Type": response.headers.get("Content-Type", "")},
+            "stored_at": time.time(),
+        }, response.content)
+    return CachedResponse(response.status_code, response.content, dict(response.headers))
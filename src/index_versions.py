@@ -0,0 +1,242 @@
+"""
+Versions de l'index et rechargement à chaud
+
+Organisation sur disque :
+    VECTOR_STORE_PATH/versions/<version>/   index, métadonnées, vecteurs d'une construction
+    VECTOR_STORE_PATH/CURRENT               nom de la version servie (remplacé atomiquement)
+
+Les processus de chat surveillent CURRENT : une nouvelle version est chargée en
+arrière-plan puis échangée d'un bloc dans le retriever ; l'ancienne est libérée
+dès que les requêtes en cours l'ont rendue. Sans fichier CURRENT, l'index à plat
+de VECTOR_STORE_PATH est utilisé (ancien format).
+"""
+import os
+import shutil
+import sys
+import threading
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    VECTOR_STORE_PATH,
+    INDEX_WATCH_INTERVAL,
+    INDEX_VERSIONS_KEEP,
+    INDEX_RELEASE_TIMEOUT
+)
+
+VERSIONS_DIRNAME = "versions"
+CURRENT_FILENAME = "CURRENT"
+
+# ========================================
+# VERSIONS SUR DISQUE
+# ========================================
+
+def versions_path(root=VECTOR_STORE_PATH):
+    return os.path.join(root, VERSIONS_DIRNAME)
+
+def version_path(version, root=VECTOR_STORE_PATH):
+    return os.path.join(versions_path(root), version)
+
+def list_versions(root=VECTOR_STORE_PATH):
+    """Versions complètes sur le disque, de la plus ancienne à la plus récente"""
+    path = versions_path(root)
+    if not os.path.isdir(path):
+        return []
+    return sorted(
+        name for name in os.listdir(path)
+        if not name.endswith(".tmp") and os.path.isdir(os.path.join(path, name))
+    )
+
+def split_version_path(path):
+    """(racine, version) si path est le dossier d'une version, None sinon (index à plat, shard)"""
+    if not path:
+        return None
+    path = os.path.normpath(path)
+    parent = os.path.dirname(path)
+    if os.path.basename(parent) != VERSIONS_DIRNAME:
+        return None
+    return os.path.dirname(parent), os.path.basename(path)
+
+def current_version(root=VECTOR_STORE_PATH):
+    """Nom de la version servie (None sans fichier CURRENT)"""
+    current_path = os.path.join(root, CURRENT_FILENAME)
+    if not os.path.exists(current_path):
+        return None
+    with open(current_path, "r", encoding="utf-8") as f:
+        return f.read().strip() or None
+
+def active_store_path(root=VECTOR_STORE_PATH):
+    """Dossier de l'index servi : version courante, sinon index à plat"""
+    version = current_version(root)
+    return version_path(version, root) if version else root
+
+def set_current(version, root=VECTOR_STORE_PATH):
+    """Bascule atomique de la version servie (écriture puis renommage)"""
+    if version not in list_versions(root):
+        raise ValueError(f"Version inconnue : {version}")
+    current_path = os.path.join(root, CURRENT_FILENAME)
+    with open(current_path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(current_path + ".tmp", current_path)
+    print(f"📌 Version courante : {version}")
+
+def new_version_name(root=VECTOR_STORE_PATH):
+    name = datetime.now().strftime("%Y%m%d-%H%M%S")
+    existing = set(list_versions(root))
+    suffix = 1
+    candidate = name
+    while candidate in existing:
+        candidate = f"{name}-{suffix}"
+        suffix += 1
+    return candidate
+
+def publish_version(index, documents, embeddings=None, root=VECTOR_STORE_PATH):
+    """
+    Écrit une nouvelle version complète puis la rend courante
+    (les processus en cours ne voient jamais une version à moitié écrite)
+    """
+    from src.vector_store import save_vector_store
+
+    version = new_version_name(root)
+    tmp_path = version_path(version, root) + ".tmp"
+    save_vector_store(index, documents, embeddings, tmp_path)
+    os.replace(tmp_path, version_path(version, root))
+    set_current(version, root)
+    prune_versions(root=root)
+    return version
+
+def rollback(version=None, root=VECTOR_STORE_PATH):
+    """Revient à une version donnée, ou à celle qui précède la version courante"""
+    versions = list_versions(root)
+    current = current_version(root)
+    if version is None:
+        older = [name for name in versions if current is None or name < current]
+        if not older:
+            raise ValueError("Aucune version antérieure")
+        version = older[-1]
+    set_current(version, root)
+    return version
+
+def prune_versions(keep=INDEX_VERSIONS_KEEP, root=VECTOR_STORE_PATH):
+    """Supprime les versions les plus anciennes (la version courante est toujours gardée)"""
+    current = current_version(root)
+    removable = [name for name in list_versions(root) if name != current]
+    removed = removable[:max(len(removable) - (keep - 1), 0)]
+    for name in removed:
+        shutil.rmtree(version_path(name, root), ignore_errors=True)
+    return removed
+
+# ========================================
+# RECHARGEMENT À CHAUD
+# ========================================
+
+def load_version_into(retriever, version, root=VECTOR_STORE_PATH):
+    """
+    Charge une version en arrière-plan puis l'échange dans le retriever
+    Attend que les requêtes en cours sur l'ancienne version soient terminées
+    """
+    from src.rag_chain import build_langchain_store, build_event_retriever
+    from src.telemetry import span
+    from src.vector_store import load_vector_store, touch_index_pages
+
+    with span("index_versions.reload", index__version=version) as current:
+        path = version_path(version, root)
+        index, documents = load_vector_store(path)
+        vector_store = build_langchain_store(retriever.vector_store.embedding_function, index, documents)
+        loaded = build_event_retriever(vector_store, path, k=retriever.k)
+        touch_index_pages(index)
+
+        old_generation = retriever.swap_index(
+            loaded.vector_store, loaded.full_vectors, loaded.geo_index, loaded.expiry,
+            loaded.event_index, loaded.local_index, path
+        )
+        print(f"🔄 Index rechargé : version {version} ({index.ntotal} vecteurs)")
+
+        released = retriever.wait_released(old_generation, INDEX_RELEASE_TIMEOUT)
+        current.set_attribute("index.previous_released", released)
+        if released:
+            print("♻️ Ancienne version libérée (plus aucune requête en cours)")
+        else:
+            print(f"⚠️ Requêtes encore en cours sur l'ancienne version après {INDEX_RELEASE_TIMEOUT}s")
+    return released
+
+def served_version(retriever, root=VECTOR_STORE_PATH):
+    """Version chargée dans un retriever (None pour l'index à plat)"""
+    path = retriever.store_path
+    if path and os.path.dirname(os.path.normpath(path)) == os.path.normpath(versions_path(root)):
+        return os.path.basename(os.path.normpath(path))
+    return None
+
+class IndexWatcher:
+    """Thread qui surveille CURRENT et recharge le retriever à chaque nouvelle version"""
+
+    def __init__(self, retriever, interval=INDEX_WATCH_INTERVAL, root=VECTOR_STORE_PATH):
+        self.retriever = retriever
+        self.interval = interval
+        self.root = root
+        self.version = served_version(retriever, root)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="index-watcher", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def check(self):
+        """Recharge si CURRENT a changé ; retourne True après un rechargement"""
+        version = current_version(self.root)
+        if version and version == served_version(self.retriever, self.root):
+            # Déjà servie : publiée par ce processus (compaction, src/expiry.py)
+            self.version = version
+        if not version or version == self.version:
+            return False
+        try:
+            load_version_into(self.retriever, version, self.root)
+            self.version = version
+            return True
+        except Exception as e:
+            # On réessaie au prochain passage ; l'ancienne version reste servie
+            print(f"❌ Rechargement de la version {version} impossible : {e}")
+            return False
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+_watcher = None
+
+def start_watcher(retriever, interval=INDEX_WATCH_INTERVAL):
+    """Démarre la surveillance (une seule par processus, interval <= 0 = désactivée)"""
+    global _watcher
+
+    if interval <= 0:
+        return None
+    if _watcher is None:
+        _watcher = IndexWatcher(retriever, interval).start()
+        print(f"👀 Surveillance des nouvelles versions de l'index (toutes les {interval}s)")
+    return _watcher
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Versions de l'index Faiss")
+    parser.add_argument("command", choices=["list", "rollback", "use", "prune"])
+    parser.add_argument("version", nargs="?", help="version cible (rollback, use)")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        current = current_version()
+        for name in list_versions():
+            print(f"{'→' if name == current else ' '} {name}")
+    elif args.command == "rollback":
+        rollback(args.version)
+    elif args.command == "use":
+        if not args.version:
+            parser.error("use nécessite une version")
+        set_current(args.version)
+    else:
+        removed = prune_versions()
+        print(f"🗑️ {len(removed)} version(s) supprimée(s)")
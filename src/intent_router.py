@@ -0,0 +1,306 @@
+"""
+Routeur d'intention : réponses en liste sans appel au LLM
+
+Les questions du type "concerts ce week-end", "expositions gratuites" ou
+"théâtre pour enfants" sont servies directement par un index des métadonnées
+(catégorie, jour, prix) calculé à l'ingestion (data_processor.categorize_event),
+avec une réponse rédigée à partir d'un modèle. Les questions ouvertes (genre
+précis, conseil, lieu, comparaison...) passent par la chaîne RAG habituelle.
+"""
+import os
+import re
+import sys
+import threading
+from collections import defaultdict, namedtuple
+from datetime import date, datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    LIST_MAX_RESULTS,
+    LIST_DEFAULT_DAYS,
+    LIST_MAX_WORDS,
+    LIST_BUCKET_MAX_DAYS
+)
+from src.geo import NEAR_ME_PATTERN, PROXIMITY_PATTERN, normalize_place_text
+from src.telemetry import span
+
+ListIntent = namedtuple("ListIntent", ["category", "start", "end", "period", "free", "kids"])
+
+# Noms génériques des catégories dans une question ("concerts de jazz" reste une question ouverte)
+QUERY_CATEGORY_PATTERNS = {
+    "concert": r"\b(concerts?)\b",
+    "exposition": r"\b(expositions?|expos?)\b",
+    "théâtre": r"\b(pieces? de theatre|theatres?)\b",
+    "spectacle": r"\b(spectacles?)\b",
+    "danse": r"\b(spectacles? de danse|danses?|ballets?)\b",
+    "cinéma": r"\b(seances? de cinema|cinemas?|films?|projections?)\b",
+    "atelier": r"\b(ateliers?|stages?)\b",
+    "conférence": r"\b(conferences?|debats?)\b",
+    "visite": r"\b(visites?( guidees?)?|balades?)\b",
+    "festival": r"\b(festivals?)\b",
+}
+
+# Libellé au pluriel et accord des adjectifs
+CATEGORY_LABELS = {
+    "concert": ("concerts", "m"),
+    "exposition": ("expositions", "f"),
+    "théâtre": ("pièces de théâtre", "f"),
+    "spectacle": ("spectacles", "m"),
+    "danse": ("spectacles de danse", "m"),
+    "cinéma": ("séances de cinéma", "f"),
+    "atelier": ("ateliers", "m"),
+    "conférence": ("conférences", "f"),
+    "visite": ("visites", "f"),
+    "festival": ("festivals", "m"),
+}
+
+# Expressions de date, de la plus précise à la plus large
+PERIOD_PATTERNS = [
+    ("aujourd'hui", r"\b(aujourd'hui|ce soir|cet apres midi|ce jour)\b"),
+    ("demain", r"\b(demain( soir| apres midi)?)\b"),
+    ("ce week-end", r"\b((ce|le) (week end|weekend|we))\b"),
+    ("la semaine prochaine", r"\b(la semaine prochaine)\b"),
+    ("cette semaine", r"\b(cette semaine)\b"),
+    ("ce mois-ci", r"\b(ce mois( ci)?)\b"),
+]
+
+FREE_QUERY_PATTERN = r"\b(gratuit(e|s|es)?|entree libre|sans payer)\b"
+KIDS_QUERY_PATTERN = r"\b((pour|avec) (les |des |mes |nos )?(enfants?|petits|ados)|jeune public|en famille|familial(e|es|aux)?)\b"
+
+# Mots sans contenu d'une question en liste ; tout autre mot renvoie vers le LLM
+FILLER_WORDS = {
+    "quels", "quelles", "quel", "quelle", "quoi", "qu", "que", "est", "ce", "cette", "ces",
+    "il", "y", "a", "t", "ya", "les", "des", "de", "du", "la", "le", "l", "d", "un", "une",
+    "en", "au", "aux", "a", "pour", "se", "passe", "sont", "ont", "lieu", "prevu", "prevus",
+    "prevue", "prevues", "programme", "programmes", "je", "j", "on", "peut", "peux", "puis",
+    "voir", "faire", "aller", "trouver", "liste", "moi", "me", "donne", "donnez", "montre",
+    "montrez", "cherche", "recherche", "et", "ou", "tous", "toutes", "lille", "vous", "avez",
+    "as", "tu", "connais", "existe", "disponibles", "venir", "prochains", "prochaines", "s",
+    "n", "m", "suggere", "propose", "proposes", "proposees", "organise", "organises",
+}
+
+# ========================================
+# QUESTIONS EN LISTE
+# ========================================
+
+def period_range(period, today):
+    """(premier jour, dernier jour) d'une période nommée"""
+    weekday = today.weekday()
+    if period == "aujourd'hui":
+        return today, today
+    if period == "demain":
+        return today + timedelta(days=1), today + timedelta(days=1)
+    if period == "ce week-end":
+        return today + timedelta(days=max(5 - weekday, 0)), today + timedelta(days=6 - weekday)
+    if period == "cette semaine":
+        return today, today + timedelta(days=6 - weekday)
+    if period == "la semaine prochaine":
+        monday = today + timedelta(days=7 - weekday)
+        return monday, monday + timedelta(days=6)
+    if period == "ce mois-ci":
+        next_month = (today.replace(day=28) + timedelta(days=4)).replace(day=1)
+        return today, next_month - timedelta(days=1)
+    return today, today + timedelta(days=LIST_DEFAULT_DAYS)
+
+def parse_list_intent(query, today=None):
+    """
+    Reconnaît une question en liste (catégorie + date / gratuité / jeune public)
+    Retourne un ListIntent, ou None pour une question ouverte
+    """
+    normalized = normalize_place_text(query)
+    words = normalized.replace("'", " ").split()
+    if not words or len(words) > LIST_MAX_WORDS:
+        return None
+    if PROXIMITY_PATTERN.search(normalized) or NEAR_ME_PATTERN.search(normalized):
+        return None
+
+    # Catégorie : la plus longue expression reconnue ("spectacle de danse" avant "spectacle")
+    category, best = None, None
+    for name, pattern in QUERY_CATEGORY_PATTERNS.items():
+        match = re.search(pattern, normalized)
+        if match and (best is None or len(match.group(0)) > len(best.group(0))):
+            category, best = name, match
+    if category is None:
+        return None
+    rest = normalized[:best.start()] + " " + normalized[best.end():]
+
+    period = None
+    for name, pattern in PERIOD_PATTERNS:
+        if re.search(pattern, rest):
+            period = name
+            rest = re.sub(pattern, " ", rest)
+            break
+
+    free = bool(re.search(FREE_QUERY_PATTERN, rest))
+    kids = bool(re.search(KIDS_QUERY_PATTERN, rest))
+    rest = re.sub(KIDS_QUERY_PATTERN, " ", re.sub(FREE_QUERY_PATTERN, " ", rest))
+
+    if any(word not in FILLER_WORDS for word in rest.replace("'", " ").split()):
+        return None
+
+    start, end = period_range(period, today or date.today())
+    return ListIntent(category, start, end, period, free, kids)
+
+# ========================================
+# INDEX DES MÉTADONNÉES
+# ========================================
+
+def parse_day(date_str):
+    """Date ISO (Open Agenda) -> jour local, None si absente ou invalide"""
+    if not date_str:
+        return None
+    try:
+        return datetime.fromisoformat(date_str.replace("Z", "+00:00")).date()
+    except (TypeError, ValueError):
+        return None
+
+def price_key(gratuit):
+    return {True: "gratuit", False: "payant"}.get(gratuit, "inconnu")
+
+class EventCatalog:
+    """
+    Index des événements (un par uid) : (catégorie, jour, prix) -> uids
+    Les événements de plus de LIST_BUCKET_MAX_DAYS jours (expositions longues)
+    sont gardés à part et filtrés par chevauchement de dates
+    """
+
+    def __init__(self, bucket_max_days=LIST_BUCKET_MAX_DAYS):
+        self.bucket_max_days = bucket_max_days
+        self.events = {}
+        self.buckets = defaultdict(set)
+        self.long_running = defaultdict(list)
+
+    @classmethod
+    def from_documents(cls, metadatas, **kwargs):
+        """Index construit sur les métadonnées des chunks (dédupliquées par uid)"""
+        catalog = cls(**kwargs)
+        for metadata in metadatas:
+            catalog.add(metadata)
+        return catalog
+
+    def __len__(self):
+        return len(self.events)
+
+    def add(self, metadata):
+        uid = metadata.get("uid")
+        start = parse_day(metadata.get("date_debut"))
+        if uid is None or uid in self.events or start is None:
+            return
+        if "categories" not in metadata:
+            # Index construit avant categorize_event : attributs recalculés
+            from src.data_processor import categorize_event
+            metadata = {**metadata, **categorize_event(metadata)}
+
+        end = max(parse_day(metadata.get("date_fin")) or start, start)
+        self.events[uid] = {**metadata, "start": start, "end": end}
+        price = price_key(metadata.get("gratuit"))
+        for category in metadata["categories"]:
+            if (end - start).days > self.bucket_max_days:
+                self.long_running[category].append((start, end, uid))
+                continue
+            for offset in range((end - start).days + 1):
+                self.buckets[(category, start + timedelta(days=offset), price)].add(uid)
+
+    def search(self, category, start, end, free=False, kids=False):
+        """Événements de la catégorie ayant lieu entre start et end, triés par date de début"""
+        prices = ["gratuit"] if free else ["gratuit", "payant", "inconnu"]
+        uids = set()
+        for offset in range((end - start).days + 1):
+            day = start + timedelta(days=offset)
+            for price in prices:
+                uids |= self.buckets.get((category, day, price), set())
+        for event_start, event_end, uid in self.long_running.get(category, []):
+            if event_start <= end and event_end >= start:
+                if not free or self.events[uid].get("gratuit") is True:
+                    uids.add(uid)
+
+        events = [self.events[uid] for uid in uids]
+        if kids:
+            events = [event for event in events if event.get("jeune_public")]
+        return sorted(events, key=lambda event: (event["start"], event.get("title", "")))
+
+# ========================================
+# RÉPONSE
+# ========================================
+
+def format_when(event):
+    from src.data_processor import format_date
+
+    if event["start"] == event["end"]:
+        return f"le {format_date(event.get('date_debut'))}"
+    return f"du {event['start']:%d/%m/%Y} au {event['end']:%d/%m/%Y}"
+
+def render_list_answer(intent, events, limit=LIST_MAX_RESULTS):
+    """Réponse en français : en-tête, un événement par ligne avec son lien, relance"""
+    label, gender = CATEGORY_LABELS[intent.category]
+    criteria = ""
+    if intent.free:
+        criteria += " gratuites" if gender == "f" else " gratuits"
+    if intent.kids:
+        criteria += " pour les enfants"
+    period = intent.period or f"dans les {(intent.end - intent.start).days} prochains jours"
+
+    lines = [f"Voici {len(events)} {label}{criteria} {period} :" if len(events) > 1
+             else f"Voici ce que j'ai trouvé comme {label}{criteria} {period} :", ""]
+    for event in events[:limit]:
+        line = f"- **{event.get('title', '')}** — {format_when(event)}"
+        if event.get("lieu"):
+            line += f" · {event['lieu']}"
+        if event.get("gratuit") is True:
+            line += " · Gratuit"
+        if event.get("url"):
+            line += f" — [Plus d'infos]({event['url']})"
+        lines.append(line)
+    if len(events) > limit:
+        rest = len(events) - limit
+        lines.append(f"- … et {rest} {'autres' if rest > 1 else 'autre'}.")
+    lines += ["", "Dites-moi si l'un d'eux vous intéresse, je vous donnerai plus de détails !"]
+    return "\n".join(lines)
+
+class IntentRouter:
+    """
+    Répond aux questions en liste à partir de l'index des métadonnées du retriever
+    L'index est reconstruit quand le retriever change d'index (rechargement, compaction)
+    """
+
+    def __init__(self, retriever, limit=LIST_MAX_RESULTS):
+        self.retriever = retriever
+        self.limit = limit
+        self._catalog = None
+        self._generation = None
+        self._lock = threading.Lock()
+
+    def catalog(self):
+        with self._lock:
+            generation = self.retriever.generation
+            if self._catalog is None or generation != self._generation:
+                vector_store = self.retriever.current_index()[0]
+                with span("intent_router.build_catalog") as current:
+                    self._catalog = EventCatalog.from_documents(
+                        doc.metadata for doc in vector_store.docstore._dict.values()
+                    )
+                    current.set_attribute("catalog.events", len(self._catalog))
+                self._generation = generation
+            return self._catalog
+
+    def answer(self, query, today=None):
+        """
+        (réponse, métadonnées des événements listés) pour une question en liste,
+        None si la question doit passer par le LLM (question ouverte ou aucun résultat)
+        """
+        intent = parse_list_intent(query, today)
+        if intent is None:
+            return None
+        with span("intent_router.answer", intent__category=intent.category,
+                  intent__period=intent.period, intent__free=intent.free, intent__kids=intent.kids) as current:
+            events = self.catalog().search(intent.category, intent.start, intent.end, intent.free, intent.kids)
+            current.set_attribute("intent.results", len(events))
+            if not events:
+                return None
+            return render_list_answer(intent, events, self.limit), events[:self.limit]
+
+def create_intent_router(retriever):
+    """Routeur au-dessus d'un EventRetriever (None pour l'index multi-agendas)"""
+    if not hasattr(retriever, "current_index"):
+        return None
+    return IntentRouter(retriever)
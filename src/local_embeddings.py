@@ -0,0 +1,165 @@
+"""
+Embeddings locaux de secours (mode dégradé) : hachage des termes + pondération TF-IDF
+
+Quand l'API d'embeddings est indisponible (disjoncteur ouvert, délai dépassé, 429/5xx),
+le retriever vectorise la question localement et cherche dans un petit index dédié,
+construit à l'ingestion à côté de l'index Mistral (mêmes positions de chunks).
+Aucun service ni modèle supplémentaire : un vecteur de LOCAL_EMBED_DIM cases par chunk.
+
+Le retriever revient à l'API dès qu'elle répond à nouveau (voir note_embedding_path).
+"""
+import math
+import os
+import re
+import sys
+import threading
+import time
+import unicodedata
+import zlib
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import LOCAL_EMBED_DIM
+from src.context_assembler import STOPWORDS
+from src.telemetry import record_embedding_path
+
+LOCAL_INDEX_FILENAME = "local.index"
+LOCAL_IDF_FILENAME = "local_idf.npy"
+
+WORD_PATTERN = re.compile(r"\w+")
+
+def normalize_text(text):
+    """Minuscules, sans accents"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in text if not unicodedata.combining(char))
+
+def extract_terms(text):
+    """Mots significatifs et paires de mots consécutifs"""
+    words = [
+        word for word in WORD_PATTERN.findall(normalize_text(text))
+        if len(word) > 1 and word not in STOPWORDS
+    ]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+def hash_term(term, dim):
+    """Case et signe d'un terme (CRC32 : stable d'un processus à l'autre)"""
+    value = zlib.crc32(term.encode("utf-8"))
+    return value % dim, 1.0 if value & (1 << 31) else -1.0
+
+class LocalVectorizer:
+    """Vecteurs hachés (LOCAL_EMBED_DIM cases), fréquence sous-linéaire x IDF, normés"""
+
+    def __init__(self, idf):
+        self.idf = idf
+        self.dim = len(idf)
+
+    @classmethod
+    def fit(cls, texts, dim=LOCAL_EMBED_DIM):
+        """IDF de chaque case, appris sur les textes du corpus"""
+        import numpy as np
+
+        document_frequency = np.zeros(dim, dtype=np.float64)
+        for text in texts:
+            buckets = {hash_term(term, dim)[0] for term in extract_terms(text)}
+            document_frequency[list(buckets)] += 1
+        idf = np.log((1 + len(texts)) / (1 + document_frequency)) + 1
+        return cls(idf.astype(np.float32))
+
+    def transform(self, texts):
+        """Matrice (n, dim) float32 de vecteurs normés"""
+        import numpy as np
+        from src.vector_store import normalize_vectors
+
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts = {}
+            for term in extract_terms(text):
+                bucket, sign = hash_term(term, self.dim)
+                counts[(bucket, sign)] = counts.get((bucket, sign), 0) + 1
+            for (bucket, sign), count in counts.items():
+                vectors[row, bucket] += sign * (1 + math.log(count)) * self.idf[bucket]
+        return normalize_vectors(vectors)
+
+class LocalIndex:
+    """Vectoriseur local et index Faiss de ses vecteurs (positions identiques à l'index Mistral)"""
+
+    def __init__(self, vectorizer, index):
+        self.vectorizer = vectorizer
+        self.index = index
+
+    @classmethod
+    def build(cls, texts, dim=LOCAL_EMBED_DIM):
+        from src.vector_store import create_faiss_index
+
+        vectorizer = LocalVectorizer.fit(texts, dim)
+        return cls(vectorizer, create_faiss_index(vectorizer.transform(texts), "flat", transform="none"))
+
+    @classmethod
+    def load(cls, path):
+        """Index local sauvegardé avec l'index Mistral, None s'il n'existe pas"""
+        import faiss
+        import numpy as np
+
+        index_path = os.path.join(path, LOCAL_INDEX_FILENAME)
+        idf_path = os.path.join(path, LOCAL_IDF_FILENAME)
+        if not (os.path.exists(index_path) and os.path.exists(idf_path)):
+            return None
+        return cls(LocalVectorizer(np.load(idf_path)), faiss.read_index(index_path))
+
+    def save(self, path):
+        import faiss
+        import numpy as np
+
+        index_path = os.path.join(path, LOCAL_INDEX_FILENAME)
+        idf_path = os.path.join(path, LOCAL_IDF_FILENAME)
+        with open(idf_path + ".tmp", "wb") as f:
+            np.save(f, self.vectorizer.idf)
+        os.replace(idf_path + ".tmp", idf_path)
+        faiss.write_index(self.index, index_path + ".tmp")
+        os.replace(index_path + ".tmp", index_path)
+
+    def __len__(self):
+        return self.index.ntotal
+
+    def embed(self, text):
+        """Vecteur local d'une question"""
+        return self.vectorizer.transform([text])[0]
+
+def save_local_index(path, documents, dim=LOCAL_EMBED_DIM):
+    """Construit et sauvegarde l'index local des documents ({"text", "metadata"})"""
+    local_index = LocalIndex.build([doc["text"] for doc in documents], dim)
+    local_index.save(path)
+    print(f"💾 Index local de secours sauvegardé ({dim} dimensions) : {path}")
+    return local_index
+
+# ========================================
+# MODE DÉGRADÉ
+# ========================================
+
+_mode_lock = threading.Lock()
+_mode = {"path": None, "degraded_since": None, "local_requests": 0}
+
+def note_embedding_path(path):
+    """
+    Enregistre le chemin qui a vectorisé une question : "cache", "mistral" ou "local"
+    Signale l'entrée en mode dégradé et le retour à l'API
+    """
+    record_embedding_path(path)
+    with _mode_lock:
+        degraded = _mode["degraded_since"] is not None
+        if path == "local":
+            _mode["local_requests"] += 1
+            if not degraded:
+                _mode["degraded_since"] = time.time()
+                print("⚠️ API d'embeddings indisponible : mode dégradé (embeddings locaux)")
+        elif path == "mistral" and degraded:
+            duration = time.time() - _mode["degraded_since"]
+            print(f"✅ API d'embeddings rétablie après {duration:.0f}s "
+                  f"({_mode['local_requests']} questions servies localement)")
+            _mode["degraded_since"] = None
+            _mode["local_requests"] = 0
+        _mode["path"] = path
+
+def embedding_status():
+    """{"path": dernier chemin, "degraded": bool, "degraded_since", "local_requests"}, pour les sondes"""
+    with _mode_lock:
+        return {**_mode, "degraded": _mode["degraded_since"] is not None}
@@ -0,0 +1,184 @@
+"""
+Mémoire conversationnelle plafonnée en tokens
+
+- les derniers échanges sont gardés tels quels tant qu'ils tiennent dans MEMORY_TOKEN_LIMIT
+- les plus anciens sont résumés par le LLM dans un résumé glissant, en arrière-plan
+  après le retour de la réponse (hors du chemin critique)
+- des événements déjà présentés, seuls l'uid et le titre sont conservés
+La taille de l'historique envoyé au LLM reste donc constante sur une longue session.
+"""
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List
+
+from langchain.memory.chat_memory import BaseChatMemory
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from pydantic import PrivateAttr
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import MEMORY_TOKEN_LIMIT, MEMORY_SUMMARY_MAX_TOKENS, MEMORY_MAX_SHOWN_EVENTS
+from src.context_assembler import CHARS_PER_TOKEN, count_tokens
+from src.telemetry import span
+
+SUMMARY_PROMPT = """Voici le résumé d'une conversation entre un utilisateur et un assistant \
+qui recommande des événements culturels, suivi des derniers échanges.
+Mets à jour le résumé en français, en {max_words} mots maximum : garde les préférences de \
+l'utilisateur (types d'événements, dates, lieux, budget, public) et les questions encore \
+ouvertes. Ne recopie pas le détail des événements.
+
+Résumé actuel :
+{summary}
+
+Échanges à intégrer :
+{turns}
+
+Nouveau résumé :"""
+
+def truncate_to_tokens(text, max_tokens):
+    """Coupe un texte à max_tokens (estimation de context_assembler)"""
+    if count_tokens(text) <= max_tokens:
+        return text
+    return text[:int(max_tokens * CHARS_PER_TOKEN)].rsplit(" ", 1)[0] + "…"
+
+class SummarizingMemory(BaseChatMemory):
+    """
+    Mémoire à résumé glissant pour ConversationalRetrievalChain
+    llm : modèle utilisé pour résumer les échanges les plus anciens
+    """
+    llm: Any
+    memory_key: str = "chat_history"
+    max_token_limit: int = MEMORY_TOKEN_LIMIT
+    summary_max_tokens: int = MEMORY_SUMMARY_MAX_TOKENS
+    max_shown_events: int = MEMORY_MAX_SHOWN_EVENTS
+    background: bool = True
+
+    _summary: str = PrivateAttr(default="")
+    _shown_events: Any = PrivateAttr(default_factory=OrderedDict)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+    _summarizing: bool = PrivateAttr(default=False)
+    _epoch: int = PrivateAttr(default=0)
+    _thread: Any = PrivateAttr(default=None)
+
+    @property
+    def memory_variables(self) -> List[str]:
+        return [self.memory_key]
+
+    @property
+    def summary(self):
+        return self._summary
+
+    @property
+    def shown_events(self):
+        """{uid: titre} des événements déjà présentés"""
+        with self._lock:
+            return dict(self._shown_events)
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            messages = list(self.chat_memory.messages)
+            preamble = self._preamble()
+        if preamble:
+            messages = [SystemMessage(content=preamble)] + messages
+        if self.return_messages:
+            return {self.memory_key: messages}
+        return {self.memory_key: "\n".join(f"{message.type}: {message.content}" for message in messages)}
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, Any]) -> None:
+        input_str, output_str = self._get_input_output(inputs, outputs)
+        with self._lock:
+            self.chat_memory.add_messages([HumanMessage(content=input_str), AIMessage(content=output_str)])
+            for doc in outputs.get("source_documents") or []:
+                uid = doc.metadata.get("uid")
+                if uid is None:
+                    continue
+                self._shown_events[uid] = doc.metadata.get("title", "")
+                self._shown_events.move_to_end(uid)
+            while len(self._shown_events) > self.max_shown_events:
+                self._shown_events.popitem(last=False)
+        self._schedule_summary()
+
+    def clear(self) -> None:
+        with self._lock:
+            self.chat_memory.clear()
+            self._summary = ""
+            self._shown_events.clear()
+            # Un résumé en cours sur l'ancienne conversation sera ignoré
+            self._epoch += 1
+
+    def buffer_tokens(self):
+        """Tokens estimés des échanges gardés tels quels"""
+        with self._lock:
+            return sum(count_tokens(message.content) for message in self.chat_memory.messages)
+
+    def wait_for_summary(self, timeout=None):
+        """Attend la fin d'un résumé en arrière-plan (tests, arrêt propre)"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _preamble(self):
+        parts = []
+        if self._summary:
+            parts.append(f"Résumé de la conversation : {self._summary}")
+        if self._shown_events:
+            titles = ", ".join(f"{title} [{uid}]" for uid, title in self._shown_events.items())
+            parts.append(f"Événements déjà présentés : {titles}")
+        return "\n".join(parts)
+
+    def _turns_to_summarize(self):
+        """Plus anciens messages à retirer pour repasser sous la limite (dernier échange gardé)"""
+        messages = self.chat_memory.messages
+        tokens = sum(count_tokens(message.content) for message in messages)
+        count = 0
+        while tokens > self.max_token_limit and len(messages) - count > 2:
+            tokens -= count_tokens(messages[count].content) + count_tokens(messages[count + 1].content)
+            count += 2
+        return messages[:count]
+
+    def _schedule_summary(self):
+        with self._lock:
+            if self._summarizing or not self._turns_to_summarize():
+                return
+            self._summarizing = True
+        if self.background:
+            self._thread = threading.Thread(target=self._summarize, name="memory-summary", daemon=True)
+            self._thread.start()
+        else:
+            self._summarize()
+
+    def _summarize(self):
+        try:
+            with self._lock:
+                epoch = self._epoch
+                turns = self._turns_to_summarize()
+                summary = self._summary
+            if not turns:
+                return
+
+            text = "\n".join(
+                f"{'Utilisateur' if message.type == 'human' else 'Assistant'} : {message.content}"
+                for message in turns
+            )
+            prompt = SUMMARY_PROMPT.format(
+                max_words=int(self.summary_max_tokens * 0.7),
+                summary=summary or "(vide)",
+                turns=text
+            )
+            with span("memory.summarize", memory__turns=len(turns) // 2):
+                response = self.llm.invoke(prompt)
+            new_summary = truncate_to_tokens(getattr(response, "content", str(response)).strip(),
+                                             self.summary_max_tokens)
+
+            with self._lock:
+                if epoch != self._epoch:
+                    return
+                # Les échanges résumés sont toujours en tête de l'historique
+                self.chat_memory.messages = self.chat_memory.messages[len(turns):]
+                self._summary = new_summary
+        except Exception as e:
+            # En cas d'échec, les échanges restent tels quels : nouvel essai au tour suivant
+            print(f"⚠️ Résumé de la mémoire impossible : {e}")
+        finally:
+            with self._lock:
+                self._summarizing = False
@@ -0,0 +1,260 @@
+"""
+Pipeline d'ingestion incrémental : collecte → traitement → embeddings → index
+
+Chaque étape a une empreinte (contenu de ses entrées + paramètres : CHUNK_SIZE,
+CHUNK_OVERLAP, modèle d'embedding, type d'index, réduction ACP). Une étape dont l'empreinte n'a
+pas changé depuis la dernière exécution (et dont les sorties existent) est sautée ;
+une entrée modifiée ne relance que les étapes en aval. Les embeddings des chunks
+inchangés sont réutilisés. Une étape forcée (--force) est relancée avec toutes les
+étapes en aval ; forcer embed recalcule tous les embeddings.
+
+Exemples :
+    python src/pipeline.py                   # rafraîchissement complet
+    python src/pipeline.py --skip-fetch      # sans appel à Open Agenda
+    python src/pipeline.py --force embed     # recalcule tous les embeddings et l'index
+"""
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    CHUNK_SIZE,
+    CHUNK_OVERLAP,
+    MISTRAL_EMBED_MODEL,
+    INDEX_TYPE,
+    INDEX_TRANSFORM,
+    INDEX_TRANSFORM_DIM,
+    LOCAL_FALLBACK_ENABLED,
+    LOCAL_EMBED_DIM,
+    DATA_RAW_PATH,
+    DATA_PROCESSED_PATH,
+    OPENAGENDA_MAX_EVENTS,
+    PIPELINE_STATE_FILE,
+    EMBEDDINGS_FILE
+)
+from src.profiling import profiled
+from src.telemetry import span
+
+RAW_EVENTS_FILE = os.path.join(DATA_RAW_PATH, "events_lille.json")
+DOCUMENTS_FILE = os.path.join(DATA_PROCESSED_PATH, "documents_lille.json")
+EMBEDDING_KEYS_FILE = EMBEDDINGS_FILE + ".keys.json"
+
+# name    : nom de l'étape
+# params  : paramètres qui changent le résultat
+# inputs  : fonction -> {entrée: empreinte du contenu}, None = toujours exécutée (source distante)
+# outputs : fonction -> True si les sorties existent
+# run     : fonction -> nombre d'éléments produits
+Stage = namedtuple("Stage", ["name", "params", "inputs", "outputs", "run"])
+
+# ========================================
+# EMPREINTES ET ÉTAT
+# ========================================
+
+def file_fingerprint(path):
+    """Empreinte SHA-256 du contenu d'un fichier (None s'il n'existe pas)"""
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def stage_fingerprint(params, inputs):
+    """Empreinte d'une étape : paramètres et empreintes de ses entrées"""
+    payload = json.dumps({"params": params, "inputs": inputs}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def load_state(path=PIPELINE_STATE_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_state(state, path=PIPELINE_STATE_FILE):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(path + ".tmp", path)
+
+# ========================================
+# ÉTAPES
+# ========================================
+
+def _load_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _fetch():
+    from src.data_loader import load_all_events, save_events
+
+    events = load_all_events()
+    save_events(events)
+    return len(events)
+
+def _process():
+    from src.data_processor import filter_events, process_events, save_processed_events
+
+    documents = process_events(filter_events(_load_json(RAW_EVENTS_FILE)))
+    save_processed_events(documents)
+    return len(documents)
+
+def _texts_fingerprint():
+    """Seuls les textes comptent pour les embeddings (pas les métadonnées)"""
+    texts = [doc["text"] for doc in _load_json(DOCUMENTS_FILE)]
+    return {"texts": hashlib.sha256("\x00".join(texts).encode("utf-8")).hexdigest()}
+
+def embedding_key(text, model=MISTRAL_EMBED_MODEL):
+    return hashlib.sha1(f"{model}\n{text}".encode("utf-8")).hexdigest()
+
+def _embed(reuse=True):
+    """
+    Embeddings des chunks ; seuls les textes nouveaux ou modifiés partent à l'API
+    reuse=False : tous les embeddings sont recalculés (--force embed)
+    """
+    import numpy as np
+    from src.vector_store import get_embeddings
+
+    texts = [doc["text"] for doc in _load_json(DOCUMENTS_FILE)]
+    keys = [embedding_key(text) for text in texts]
+
+    cached = {}
+    if reuse and os.path.exists(EMBEDDINGS_FILE) and os.path.exists(EMBEDDING_KEYS_FILE):
+        previous = np.load(EMBEDDINGS_FILE)
+        cached = {key: previous[i] for i, key in enumerate(_load_json(EMBEDDING_KEYS_FILE))}
+
+    missing = {key: text for key, text in zip(keys, texts) if key not in cached}
+    print(f"♻️ {len(texts) - len(missing)} embeddings réutilisés, {len(missing)} à calculer")
+    if missing:
+        cached.update(zip(missing, np.asarray(get_embeddings(list(missing.values())), dtype=np.float32)))
+
+    embeddings = np.array([cached[key] for key in keys], dtype=np.float32)
+    with open(EMBEDDINGS_FILE + ".tmp", "wb") as f:
+        np.save(f, embeddings)
+    os.replace(EMBEDDINGS_FILE + ".tmp", EMBEDDINGS_FILE)
+    with open(EMBEDDING_KEYS_FILE + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(keys, f)
+    os.replace(EMBEDDING_KEYS_FILE + ".tmp", EMBEDDING_KEYS_FILE)
+    return len(embeddings)
+
+def _index():
+    import numpy as np
+    from src.index_versions import publish_version
+    from src.vector_store import create_faiss_index
+
+    documents = _load_json(DOCUMENTS_FILE)
+    embeddings = np.load(EMBEDDINGS_FILE)
+    index = create_faiss_index(embeddings, INDEX_TYPE)
+    publish_version(index, documents, embeddings)
+    return index.ntotal
+
+def _has_index():
+    from src.vector_store import has_vector_store
+    return has_vector_store()
+
+def default_stages(force=()):
+    """Les 4 étapes du pipeline, dans l'ordre (force : étapes forcées, voir run_pipeline)"""
+    from src.data_loader import AGENDA_UID
+    from src.data_processor import PROCESSING_VERSION
+
+    return [
+        Stage("fetch", {"agenda": AGENDA_UID, "max_events": OPENAGENDA_MAX_EVENTS}, None,
+              lambda: os.path.exists(RAW_EVENTS_FILE), _fetch),
+        Stage("process", {"chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP,
+                          "version": PROCESSING_VERSION},
+              lambda: {"events": file_fingerprint(RAW_EVENTS_FILE)},
+              lambda: os.path.exists(DOCUMENTS_FILE), _process),
+        Stage("embed", {"model": MISTRAL_EMBED_MODEL}, _texts_fingerprint,
+              lambda: os.path.exists(EMBEDDINGS_FILE), lambda: _embed(reuse="embed" not in force)),
+        Stage("index", {"index_type": INDEX_TYPE, "transform": INDEX_TRANSFORM,
+                        "transform_dim": INDEX_TRANSFORM_DIM,
+                        "local_fallback": LOCAL_FALLBACK_ENABLED, "local_dim": LOCAL_EMBED_DIM},
+              lambda: {"documents": file_fingerprint(DOCUMENTS_FILE),
+                       "embeddings": file_fingerprint(EMBEDDINGS_FILE)},
+              _has_index, _index),
+    ]
+
+# ========================================
+# EXÉCUTION
+# ========================================
+
+def run_pipeline(stages=None, force=(), skip=(), state_path=PIPELINE_STATE_FILE):
+    """
+    Exécute les étapes dont l'empreinte a changé
+    force : étapes à relancer quoi qu'il arrive, avec toutes les étapes en aval
+    skip : étapes à ne pas exécuter
+    Retourne le rapport : [{"stage", "status", "seconds", "items"}]
+    """
+    state = load_state(state_path)
+    report = []
+    forcing = False
+
+    for stage in stages or default_stages(force):
+        forcing = forcing or stage.name in force
+        if stage.name in skip:
+            report.append({"stage": stage.name, "status": "ignorée", "seconds": 0.0,
+                           "items": state.get(stage.name, {}).get("items")})
+            continue
+
+        start = time.perf_counter()
+        inputs = stage.inputs() if stage.inputs else None
+        fingerprint = stage_fingerprint(stage.params, inputs) if inputs is not None else None
+        previous = state.get(stage.name, {})
+        up_to_date = (
+            fingerprint is not None and not forcing
+            and previous.get("fingerprint") == fingerprint and stage.outputs()
+        )
+
+        with span(f"pipeline.{stage.name}", pipeline__skipped=up_to_date) as current:
+            if up_to_date:
+                items = previous.get("items")
+                status = "à jour"
+            else:
+                print(f"\n▶️ Étape {stage.name}")
+                try:
+                    with profiled(f"pipeline.{stage.name}"):
+                        items = stage.run()
+                except Exception as e:
+                    report.append({"stage": stage.name, "status": "échec", "error": str(e),
+                                   "seconds": time.perf_counter() - start, "items": None})
+                    print(f"❌ Étape {stage.name} en échec : {e}")
+                    break
+                status = "exécutée"
+                state[stage.name] = {"fingerprint": fingerprint, "items": items, "finished_at": time.time()}
+                save_state(state, state_path)
+            current.set_attribute("pipeline.items", items or 0)
+
+        report.append({"stage": stage.name, "status": status,
+                       "seconds": time.perf_counter() - start, "items": items})
+    return report
+
+def print_report(report):
+    print("\n📊 Rapport du pipeline")
+    print(f"   {'étape':<10} {'statut':<10} {'durée':>9} {'éléments':>9}")
+    for entry in report:
+        items = "-" if entry["items"] is None else entry["items"]
+        print(f"   {entry['stage']:<10} {entry['status']:<10} {entry['seconds']:>8.2f}s {items:>9}")
+    print(f"   {'total':<10} {'':<10} {sum(entry['seconds'] for entry in report):>8.2f}s")
+
+if __name__ == "__main__":
+    import argparse
+
+    stage_names = ["fetch", "process", "embed", "index"]
+    parser = argparse.ArgumentParser(description="Pipeline d'ingestion incrémental")
+    parser.add_argument("--force", nargs="+", default=[], choices=stage_names,
+                        help="étapes à relancer (avec leur aval) même si leur empreinte est inchangée ; "
+                             "embed recalcule tous les embeddings")
+    parser.add_argument("--skip-fetch", action="store_true",
+                        help="réutilise les événements déjà collectés (pas d'appel à Open Agenda)")
+    args = parser.parse_args()
+
+    # Profil cProfile si PROFILE_ENABLED (une section par étape exécutée)
+    with profiled("pipeline.main"):
+        report = run_pipeline(force=set(args.force), skip={"fetch"} if args.skip_fetch else set())
+    print_report(report)
+    if any(entry["status"] == "échec" for entry in report):
+        sys.exit(1)
@@ -0,0 +1,157 @@
+"""
+Mode profilage : cProfile sur une fraction des requêtes, sans redéploiement
+
+Activation : PROFILE_ENABLED=true (fraction PROFILE_SAMPLE_RATE des requêtes) ou,
+pour une requête donnée, profiled(..., force=True) / chat(question, profile=True).
+
+Pour chaque requête profilée, PROFILE_DIR reçoit :
+- <horodatage>-<nom>.prof : profil complet (pstats, snakeviz...)
+- <horodatage>-<nom>.txt  : temps par couche (réseau, LangChain, Faiss, application),
+  durée des sections imbriquées et top PROFILE_TOP_N des fonctions
+Seuls les PROFILE_MAX_FILES profils les plus récents sont gardés.
+"""
+import io
+import os
+import random
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import PROFILE_ENABLED, PROFILE_SAMPLE_RATE, PROFILE_DIR, PROFILE_TOP_N, PROFILE_MAX_FILES
+
+# Couches du temps propre des fonctions (fichier:fonction), la première qui correspond l'emporte
+LAYER_PATTERNS = [
+    ("Réseau (HTTP, SSL)", re.compile(r"httpx|httpcore|h11|urllib3|requests[/\\]|ssl|socket|selectors?")),
+    ("Faiss / NumPy", re.compile(r"faiss|numpy")),
+    ("LangChain / pydantic", re.compile(r"langchain|pydantic")),
+    ("Attente (threads, verrous)", re.compile(r"_thread\.lock|threading\.py|concurrent[/\\]futures")),
+    ("Application (src/)", re.compile(r"[/\\]src[/\\]")),
+]
+OTHER_LAYER = "Autres"
+
+# Un seul profil à la fois dans le processus (cProfile ne s'imbrique pas)
+_profiler_lock = threading.Lock()
+_local = threading.local()
+
+def classify(filename, function):
+    """Couche d'une fonction du profil"""
+    location = f"{filename}:{function}"
+    for layer, pattern in LAYER_PATTERNS:
+        if pattern.search(location):
+            return layer
+    return OTHER_LAYER
+
+def layer_times(stats):
+    """{couche: temps propre en secondes} à partir d'un pstats.Stats"""
+    times = {}
+    for (filename, _, function), (_, _, self_time, _, _) in stats.stats.items():
+        layer = classify(filename, function)
+        times[layer] = times.get(layer, 0.0) + self_time
+    return times
+
+def should_profile(force=None, enabled=PROFILE_ENABLED, sample_rate=PROFILE_SAMPLE_RATE):
+    """force=True/False décide pour la requête, sinon tirage selon sample_rate"""
+    if force is not None:
+        return bool(force)
+    return enabled and random.random() < sample_rate
+
+@contextmanager
+def profiled(name, force=None, directory=PROFILE_DIR, top_n=PROFILE_TOP_N, **kwargs):
+    """
+    Profile un bloc (utilisable en "with" ou en décorateur, comme telemetry.span)
+    Imbriqué dans un bloc déjà profilé, il n'ajoute qu'une section chronométrée
+    Les blocs imbriqués suivent la décision du bloc englobant (pas de double tirage)
+    """
+    session = getattr(_local, "session", None)
+    if session is not None:
+        start = time.perf_counter()
+        try:
+            yield session
+        finally:
+            if session is not False:
+                session["sections"].append((name, (time.perf_counter() - start) * 1000))
+        return
+
+    if not should_profile(force, **kwargs) or not _profiler_lock.acquire(blocking=False):
+        # Décision "pas de profil" transmise aux blocs imbriqués
+        _local.session = False
+        try:
+            yield None
+        finally:
+            _local.session = None
+        return
+
+    import cProfile
+
+    session = {"name": name, "sections": [], "started_at": datetime.now()}
+    _local.session = session
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    try:
+        profiler.enable()
+        try:
+            yield session
+        finally:
+            profiler.disable()
+            session["duration_ms"] = (time.perf_counter() - start) * 1000
+    finally:
+        _local.session = None
+        _profiler_lock.release()
+        try:
+            session["paths"] = write_profile(profiler, session, directory, top_n)
+            print(f"🔬 Profil {name} ({session['duration_ms']:.0f} ms) : {session['paths'][1]}")
+        except OSError as e:
+            print(f"⚠️ Profil {name} non écrit : {e}")
+
+def prune_profiles(directory=PROFILE_DIR, max_files=PROFILE_MAX_FILES):
+    """Supprime les profils les plus anciens au-delà de max_files (.prof et .txt) ; retourne leur nombre"""
+    if not os.path.isdir(directory):
+        return 0
+    # Noms horodatés : l'ordre alphabétique est l'ordre chronologique
+    bases = sorted({
+        name[:-len(suffix)] for name in os.listdir(directory)
+        for suffix in (".prof", ".txt") if name.endswith(suffix)
+    })
+    removed = bases[:max(len(bases) - max_files, 0)]
+    for base in removed:
+        for suffix in (".prof", ".txt"):
+            try:
+                os.remove(os.path.join(directory, base + suffix))
+            except OSError:
+                pass
+    return len(removed)
+
+def write_profile(profiler, session, directory=PROFILE_DIR, top_n=PROFILE_TOP_N):
+    """Écrit le profil (.prof) et son résumé (.txt) ; retourne leurs chemins"""
+    import pstats
+
+    os.makedirs(directory, exist_ok=True)
+    timestamp = session["started_at"].strftime("%Y%m%d-%H%M%S-%f")
+    base = os.path.join(directory, f"{timestamp}-{session['name']}")
+    profiler.dump_stats(base + ".prof")
+
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    total = sum(layer_times(stats).values()) or 1e-9
+
+    stream.write(f"Profil {session['name']} - {session['started_at']:%Y-%m-%d %H:%M:%S}"
+                 f" - {session['duration_ms']:.1f} ms\n\n")
+    if session["sections"]:
+        stream.write("Sections :\n")
+        for section, duration_ms in session["sections"]:
+            stream.write(f"  {section:<40} {duration_ms:>10.1f} ms\n")
+        stream.write("\n")
+    stream.write("Temps par couche (temps propre des fonctions) :\n")
+    for layer, seconds in sorted(layer_times(stats).items(), key=lambda item: -item[1]):
+        stream.write(f"  {layer:<40} {seconds * 1000:>10.1f} ms {seconds / total:>6.1%}\n")
+    stream.write(f"\nTop {top_n} des fonctions (temps cumulé) :\n")
+    stats.sort_stats("cumulative").print_stats(top_n)
+
+    with open(base + ".txt", "w", encoding="utf-8") as f:
+        f.write(stream.getvalue())
+    prune_profiles(directory)
+    return base + ".prof", base + ".txt"
@@ -1,18 +1,11 @@
 """
 Chaîne RAG avec LangChain et mémoire conversationnelle
+
+Les modules LangChain / Mistral / Faiss sont importés à la demande, dans les
+fonctions qui en ont besoin : importer ce module ne coûte presque rien.
 """
 import os
 import sys
-import faiss
-import numpy as np
-import pickle
-from mistralai import Mistral
-from langchain_mistralai import ChatMistralAI
-from langchain.memory import ConversationBufferWindowMemory
-from langchain.prompts import PromptTemplate
-from langchain.chains import ConversationalRetrievalChain
-from langchain_community.vectorstores import FAISS
-from langchain_mistralai import MistralAIEmbeddings
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import (
@@ -22,48 +15,205 @@ from config import (
     TEMPERATURE,
     MAX_TOKENS,
     TOP_K_RESULTS,
+    MEMORY_MODE,
     MEMORY_WINDOW_SIZE,
-    VECTOR_STORE_PATH
+    MEMORY_SUMMARY_MAX_TOKENS,
+    VECTOR_STORE_PATH,
+    EXPIRY_ENABLED,
+    EVENT_INDEX_ENABLED,
+    LOCAL_FALLBACK_ENABLED
 )
+from src.telemetry import span
+
+def create_embeddings():
+    """Modèle d'embedding des questions (Mistral)"""
+    from langchain_mistralai import MistralAIEmbeddings
+    from src.api_client import create_mistral_http_client
+
+    # Les nouvelles tentatives sont faites par la couche partagée (src/api_client.py)
+    return MistralAIEmbeddings(
+        api_key=MISTRAL_API_KEY,
+        model=MISTRAL_EMBED_MODEL,
+        client=create_mistral_http_client(),
+        max_retries=1
+    )
 
+@span("rag_chain.load_vector_store")
 def load_vector_store_langchain():
     """
     Charge l'index Faiss via LangChain
+    L'index construit par src/vector_store.py (éventuellement quantifié) est utilisé
+    s'il existe, sinon l'index au format LangChain (FAISS.save_local)
     """
-    embeddings = MistralAIEmbeddings(
-        api_key=MISTRAL_API_KEY,
-        model=MISTRAL_EMBED_MODEL
-    )
+    from langchain_community.vectorstores import FAISS
+    from src.vector_store import has_vector_store
 
-    vector_store = FAISS.load_local(
-        VECTOR_STORE_PATH,
-        embeddings,
-        allow_dangerous_deserialization=True
-    )
+    embeddings = create_embeddings()
+
+    if has_vector_store():
+        vector_store = wrap_vector_store(embeddings)
+    else:
+        vector_store = FAISS.load_local(
+            VECTOR_STORE_PATH,
+            embeddings,
+            allow_dangerous_deserialization=True
+        )
 
     print(f"✅ Base vectorielle chargée")
     return vector_store
 
-def create_rag_chain(vector_store):
+def wrap_vector_store(embeddings, path=None):
+    """
+    Expose l'index et les métadonnées de src/vector_store.py sous forme de FAISS LangChain
+    """
+    from src.vector_store import load_vector_store
+
+    index, documents = load_vector_store(path)
+    return build_langchain_store(embeddings, index, documents)
+
+def build_langchain_store(embeddings, index, documents):
+    """FAISS LangChain au-dessus d'un index Faiss et de ses documents ({"text", "metadata"})"""
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+    from langchain_community.vectorstores.utils import DistanceStrategy
+    from langchain_core.documents import Document
+
+    docstore = InMemoryDocstore({
+        str(i): Document(page_content=doc["text"], metadata=doc["metadata"])
+        for i, doc in enumerate(documents)
+    })
+    return FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id={i: str(i) for i in range(len(documents))},
+        distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT
+    )
+
+def build_event_retriever(vector_store, store_path=None, **kwargs):
+    """
+    Crée le retriever d'un index : re-classement (index quantifié ou réduit), index géographique,
+    tombstones des événements passés, centroïdes des événements (recherche en deux temps)
+    et index local de secours (API d'embeddings indisponible)
+    store_path : dossier de l'index sur disque (vecteurs pleine précision, compaction)
+    """
+    from src.event_index import EventIndex
+    from src.expiry import ExpiryTracker
+    from src.geo import GeoIndex
+    from src.local_embeddings import LocalIndex
+    from src.retriever import EventRetriever
+    from src.vector_store import needs_rerank, load_full_precision_vectors
+
+    # Index quantifié ou réduit (ACP) : re-classement avec les vecteurs pleine précision
+    full_vectors = None
+    if store_path and needs_rerank(vector_store.index):
+        full_vectors = load_full_precision_vectors(store_path)
+
+    metadatas = [
+        vector_store.docstore.search(vector_store.index_to_docstore_id[i]).metadata
+        for i in range(vector_store.index.ntotal)
+    ]
+    # Index géographique sur les coordonnées des chunks (questions "près de ...")
+    geo_index = GeoIndex.from_documents(metadatas)
+    print(f"📍 {len(geo_index)} documents géolocalisés")
+    # Tombstones des événements passés depuis la dernière ingestion
+    expiry = ExpiryTracker.from_documents(metadatas) if EXPIRY_ENABLED else None
+    # Centroïdes des événements : seuls les chunks des événements les plus proches sont scorés
+    event_index = None
+    if EVENT_INDEX_ENABLED and store_path:
+        vectors = full_vectors if full_vectors is not None else load_full_precision_vectors(store_path)
+        event_index = EventIndex.load(store_path, metadatas, vectors)
+        if event_index is not None:
+            print(f"🎟️ {len(event_index)} événements indexés (recherche en deux temps)")
+    # Index local de secours (embeddings hachés) : mêmes positions que l'index Mistral
+    local_index = None
+    if LOCAL_FALLBACK_ENABLED and store_path:
+        local_index = LocalIndex.load(store_path)
+        if local_index is not None and len(local_index) != len(metadatas):
+            local_index = None
+        if local_index is not None:
+            print(f"🛟 Index local de secours : {len(local_index)} chunks")
+
+    return EventRetriever(
+        vector_store=vector_store,
+        full_vectors=full_vectors,
+        geo_index=geo_index,
+        expiry=expiry,
+        event_index=event_index,
+        local_index=local_index,
+        store_path=store_path,
+        **kwargs
+    )
+
+def create_rag_chain(vector_store=None, retriever=None):
     """
     Crée la chaîne RAG avec mémoire conversationnelle
+    retriever : retriever déjà construit (ex. index partitionné, voir src/shards.py),
+    sinon un EventRetriever est créé sur vector_store
     """
+    from langchain_mistralai import ChatMistralAI
+    from langchain.memory import ConversationBufferWindowMemory
+    from langchain.prompts import PromptTemplate
+    from langchain.chains import ConversationalRetrievalChain
+    from src.api_client import create_mistral_http_client
+    from src.callbacks import TracingCallbackHandler, CONDENSE_QUESTION_TAG, MEMORY_SUMMARY_TAG
+
+    tracing = TracingCallbackHandler()
+    # Un seul pool de connexions et une seule politique de délais / nouvelles tentatives
+    http_client = create_mistral_http_client()
+
     # Initialiser le LLM Mistral
     llm = ChatMistralAI(
         api_key=MISTRAL_API_KEY,
         model=MISTRAL_MODEL,
         temperature=TEMPERATURE,
-        max_tokens=MAX_TOKENS
+        max_tokens=MAX_TOKENS,
+        client=http_client,
+        max_retries=1,
+        callbacks=[tracing]
     )
 
-    # Initialiser la mémoire conversationnelle
-    memory = ConversationBufferWindowMemory(
-        k=MEMORY_WINDOW_SIZE,
-        memory_key="chat_history",
-        return_messages=True,
-        output_key="answer"
+    # LLM de reformulation de la question (tagué pour distinguer ses spans)
+    condense_question_llm = ChatMistralAI(
+        api_key=MISTRAL_API_KEY,
+        model=MISTRAL_MODEL,
+        temperature=TEMPERATURE,
+        max_tokens=MAX_TOKENS,
+        client=http_client,
+        max_retries=1,
+        callbacks=[tracing],
+        tags=[CONDENSE_QUESTION_TAG]
     )
 
+    # Initialiser la mémoire conversationnelle
+    if MEMORY_MODE == "summary":
+        from src.memory import SummarizingMemory
+
+        # Résumé des anciens échanges, en arrière-plan après chaque réponse
+        summary_llm = ChatMistralAI(
+            api_key=MISTRAL_API_KEY,
+            model=MISTRAL_MODEL,
+            temperature=0,
+            max_tokens=MEMORY_SUMMARY_MAX_TOKENS,
+            client=http_client,
+            max_retries=1,
+            callbacks=[tracing],
+            tags=[MEMORY_SUMMARY_TAG]
+        )
+        memory = SummarizingMemory(
+            llm=summary_llm,
+            memory_key="chat_history",
+            return_messages=True,
+            output_key="answer"
+        )
+    else:
+        memory = ConversationBufferWindowMemory(
+            k=MEMORY_WINDOW_SIZE,
+            memory_key="chat_history",
+            return_messages=True,
+            output_key="answer"
+        )
+
     # Prompt personnalisé
     prompt = PromptTemplate(
         input_variables=["context", "question"],
@@ -83,16 +233,19 @@ Question : {question}
 Réponse :"""
     )
 
-    # Créer le retriever
-    retriever = vector_store.as_retriever(
-        search_kwargs={"k": TOP_K_RESULTS}
-    )
+    # Créer le retriever (embedding et recherche Faiss tracés séparément)
+    if retriever is None:
+        from src.index_versions import active_store_path
+        from src.vector_store import has_vector_store
+        store_path = active_store_path() if has_vector_store() else None
+        retriever = build_event_retriever(vector_store, store_path, k=TOP_K_RESULTS)
 
     # Créer la chaîne RAG
     rag_chain = ConversationalRetrievalChain.from_llm(
         llm=llm,
         retriever=retriever,
         memory=memory,
+        condense_question_llm=condense_question_llm,
         return_source_documents=True,
         combine_docs_chain_kwargs={"prompt": prompt}
     )
@@ -0,0 +1,324 @@
+"""
+Retriever LangChain du chatbot : embedding de la question puis recherche Faiss
+Chaque étape est tracée séparément (voir src/telemetry.py)
+"""
+import os
+import sys
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, List, Optional, Tuple
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import PrivateAttr
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    TOP_K_RESULTS,
+    QUERY_EMBEDDING_CACHE_SIZE,
+    CONTEXT_TOKEN_BUDGET,
+    CONTEXT_MIN_SCORE,
+    LOCAL_MIN_SCORE,
+    GEO_RADIUS_KM
+)
+from src.context_assembler import assemble_context
+from src.expiry import maybe_start_compaction
+from src.geo import locate_query
+from src.local_embeddings import note_embedding_path
+from src.telemetry import span, record_cache
+from src.vector_store import normalize_vectors, search_by_vector, search_in_subset
+
+# Cache LRU des embeddings de questions (questions répétées, évaluations)
+_query_embedding_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+def embed_query(embeddings, query):
+    """
+    Vectorise une question en passant par le cache
+    Retourne (vecteur, cache_hit)
+    """
+    with _cache_lock:
+        if query in _query_embedding_cache:
+            _query_embedding_cache.move_to_end(query)
+            record_cache("query_embedding", True)
+            return _query_embedding_cache[query], True
+
+    vector = embeddings.embed_query(query)
+    record_cache("query_embedding", False)
+
+    with _cache_lock:
+        _query_embedding_cache[query] = vector
+        while len(_query_embedding_cache) > QUERY_EMBEDDING_CACHE_SIZE:
+            _query_embedding_cache.popitem(last=False)
+    return vector, False
+
+def embed_query_with_fallback(embeddings, query, local_index=None):
+    """
+    Vectorise une question : cache, puis API Mistral, puis embeddings locaux si l'API
+    est indisponible (disjoncteur ouvert, délai dépassé, 429/5xx)
+    Retourne (vecteur, chemin) avec chemin "cache", "mistral" ou "local"
+    """
+    try:
+        vector, cache_hit = embed_query(embeddings, query)
+    except Exception as e:
+        from src.api_client import is_unavailable_error
+        if local_index is None or not is_unavailable_error(e):
+            raise
+        vector, path = local_index.embed(query), "local"
+    else:
+        path = "cache" if cache_hit else "mistral"
+    note_embedding_path(path)
+    return vector, path
+
+def request_location(run_manager, default=None):
+    """
+    Position de l'utilisateur pour cette requête : métadonnée "user_location" de l'appel
+    (chain.invoke(..., config={"metadata": {"user_location": (lat, lon)}})), sinon default
+    Passée par requête, elle n'est jamais partagée entre les sessions du processus
+    """
+    metadata = getattr(run_manager, "metadata", None) or {}
+    return metadata.get("user_location") or default
+
+def request_cities(run_manager, default=None):
+    """
+    Villes de la session pour cette requête (index multi-agendas) : métadonnée "cities"
+    de l'appel (chain.invoke(..., config={"metadata": {"cities": [...]}})), sinon default
+    """
+    metadata = getattr(run_manager, "metadata", None) or {}
+    return metadata.get("cities") or default
+
+def group_by_event(documents):
+    """
+    Classement par événement : les événements dans l'ordre de leur meilleur chunk,
+    les chunks d'un même événement côte à côte (documents déjà triés par score)
+    """
+    groups = {}
+    for position, doc in enumerate(documents):
+        uid = doc.metadata.get("uid")
+        groups.setdefault(uid if uid is not None else ("chunk", position), []).append(doc)
+    return [doc for group in groups.values() for doc in group]
+
+class EventRetriever(BaseRetriever):
+    """
+    Retriever au-dessus d'un index FAISS LangChain
+    Le score (similarité cosinus) de chaque document est ajouté à ses métadonnées ("score")
+    full_vectors : vecteurs pleine précision pour re-classer les résultats d'un index quantifié ou réduit (ACP)
+    token_budget : budget de tokens du contexte (None = documents bruts, voir context_assembler)
+    geo_index : index géographique (src/geo.py) ; les questions "près de ..." sont restreintes
+    aux documents à moins de geo_radius_km du lieu cité ou de la position de l'utilisateur
+    ("près de moi" : métadonnée user_location de la requête, voir request_location)
+    expiry : tombstones des événements passés (src/expiry.py), masqués à la recherche
+    store_path : dossier de l'index sur disque (None = index non sauvegardé par ce module)
+    event_index : centroïdes des événements (src/event_index.py) ; les questions non
+    géographiques ne scorent que les chunks des événements les plus proches
+    local_index : index local de secours (src/local_embeddings.py), utilisé quand l'API
+    d'embeddings est indisponible ; le chemin suivi est noté dans "embedding_path"
+    L'index (vector_store, full_vectors, geo_index, expiry, event_index, local_index)
+    est remplacé d'un bloc par swap_index
+    """
+    vector_store: Any
+    k: int = TOP_K_RESULTS
+    full_vectors: Any = None
+    token_budget: Optional[int] = CONTEXT_TOKEN_BUDGET
+    min_score: float = CONTEXT_MIN_SCORE
+    geo_index: Any = None
+    geo_radius_km: float = GEO_RADIUS_KM
+    user_location: Optional[Tuple[float, float]] = None
+    expiry: Any = None
+    store_path: Optional[str] = None
+    event_index: Any = None
+    local_index: Any = None
+
+    _index_lock: Any = PrivateAttr(default_factory=threading.Condition)
+    _generation: int = PrivateAttr(default=0)
+    _in_flight: Any = PrivateAttr(default_factory=dict)
+
+    def current_index(self):
+        """(vector_store, full_vectors, geo_index, expiry, event_index, local_index) cohérents entre eux"""
+        with self._index_lock:
+            return (self.vector_store, self.full_vectors, self.geo_index, self.expiry,
+                    self.event_index, self.local_index)
+
+    @property
+    def generation(self):
+        """Numéro de l'index servi, incrémenté à chaque swap_index"""
+        return self._generation
+
+    @contextmanager
+    def acquire_index(self):
+        """Index servi pour la durée d'une requête (compté jusqu'à sa libération)"""
+        with self._index_lock:
+            generation = self._generation
+            self._in_flight[generation] = self._in_flight.get(generation, 0) + 1
+            snapshot = (self.vector_store, self.full_vectors, self.geo_index, self.expiry,
+                        self.event_index, self.local_index)
+        try:
+            yield snapshot
+        finally:
+            with self._index_lock:
+                self._in_flight[generation] -= 1
+                if not self._in_flight[generation]:
+                    del self._in_flight[generation]
+                    self._index_lock.notify_all()
+
+    def swap_index(self, vector_store, full_vectors=None, geo_index=None, expiry=None,
+                   event_index=None, local_index=None, store_path=None, if_generation=None):
+        """
+        Remplace l'index servi d'un bloc ; les requêtes en cours terminent sur l'ancien
+        if_generation : n'échange que si l'index servi n'a pas changé entre-temps
+        Retourne le numéro de l'ancien index (None si rien n'a été échangé)
+        """
+        with self._index_lock:
+            if if_generation is not None and if_generation != self._generation:
+                return None
+            self.vector_store = vector_store
+            self.full_vectors = full_vectors
+            self.geo_index = geo_index
+            self.expiry = expiry
+            self.event_index = event_index
+            self.local_index = local_index
+            self.store_path = store_path
+            self._generation += 1
+            return self._generation - 1
+
+    def wait_released(self, generation, timeout=None):
+        """Attend qu'aucune requête n'utilise plus l'index `generation` (False si délai dépassé)"""
+        with self._index_lock:
+            return self._index_lock.wait_for(lambda: generation not in self._in_flight, timeout)
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        with self.acquire_index() as snapshot:
+            return self._retrieve(query, *snapshot,
+                                  user_location=request_location(run_manager, self.user_location))
+
+    def _retrieve(self, query, vector_store, full_vectors, geo_index, expiry, event_index=None,
+                  local_index=None, user_location=None):
+        """Recherche sur un index donné (obtenu par acquire_index)"""
+        with span("retriever.embed_query", query__length=len(query)) as current:
+            embedding, embedding_path = embed_query_with_fallback(vector_store.embeddings, query, local_index)
+            current.set_attribute("cache.hit", embedding_path == "cache")
+            current.set_attribute("embedding.path", embedding_path)
+
+        index, min_score = vector_store.index, self.min_score
+        if embedding_path == "local":
+            # Mode dégradé : index local (mêmes positions), sans re-classement ni centroïdes
+            index, full_vectors, event_index, min_score = local_index.index, None, None, LOCAL_MIN_SCORE
+
+        # Événements passés : masqués par la bitmap des vivants
+        alive_bitmap = expiry.refresh() if expiry is not None else None
+
+        place, distances = self._locate(query, geo_index, user_location), {}
+        if place:
+            with span("retriever.geo_filter", geo__place=place[0], geo__radius_km=self.geo_radius_km) as current:
+                positions, km = geo_index.within_radius(place[1], place[2], self.geo_radius_km)
+                distances = {
+                    position: distance for position, distance in zip(positions.tolist(), km.tolist())
+                    if expiry is None or expiry.is_alive(position)
+                }
+                current.set_attribute("geo.candidates", len(distances))
+
+        event_scores = {}
+        if distances:
+            scores, ids = search_in_subset(
+                [embedding], index, list(distances), self.k, full_vectors
+            )
+        elif event_index is not None:
+            # Événements les plus proches d'abord, puis leurs seuls chunks
+            with span("retriever.event_search", search__events=len(event_index)) as current:
+                scores, ids, event_scores = event_index.search(
+                    normalize_vectors([embedding])[0], self.k,
+                    dead=expiry.dead if expiry is not None else None
+                )
+                current.set_attribute("search.event_hits", len(set(event_scores.values())))
+        else:
+            # Question non géographique, ou aucun événement dans le rayon
+            scores, ids = search_by_vector(
+                [embedding], index, self.k, full_vectors, alive_bitmap=alive_bitmap
+            )
+
+        documents = []
+        for score, idx in zip(scores[0], ids[0]):
+            if idx == -1:
+                continue
+            doc = vector_store.docstore.search(vector_store.index_to_docstore_id[int(idx)])
+            metadata = {**doc.metadata, "score": float(score), "embedding_path": embedding_path}
+            text = doc.page_content
+            if int(idx) in distances:
+                metadata["distance_km"] = round(distances[int(idx)], 2)
+                text = f"{text}\nDistance : {metadata['distance_km']} km de {place[0]}"
+            if int(idx) in event_scores:
+                metadata["event_score"] = event_scores[int(idx)]
+            documents.append(Document(page_content=text, metadata=metadata))
+
+        if event_scores:
+            documents = group_by_event(documents)
+
+        if expiry is not None:
+            maybe_start_compaction(self)
+
+        if not self.token_budget:
+            return documents
+
+        with span("retriever.assemble_context", context__budget=self.token_budget) as current:
+            assembled, tokens = assemble_context(documents, query, self.token_budget, min_score)
+            current.set_attribute("context.tokens", tokens)
+            current.set_attribute("context.documents", len(assembled))
+            current.set_attribute("context.dropped", len(documents) - len(assembled))
+        return assembled
+
+    def _locate(self, query, geo_index, user_location=None):
+        """Lieu de référence de la question, si elle est géographique et l'index disponible"""
+        if geo_index is None or not len(geo_index):
+            return None
+        return locate_query(query, user_location)
+
+class ShardedRetriever(BaseRetriever):
+    """
+    Retriever au-dessus d'un index partitionné par agenda (src/shards.py)
+    La question est envoyée aux shards des villes citées (sinon les villes de la requête,
+    voir request_cities, sinon DEFAULT_CITIES),
+    les top-k de chaque shard sont fusionnés par score puis le contexte est assemblé
+    """
+    router: Any
+    k: int = TOP_K_RESULTS
+    token_budget: Optional[int] = CONTEXT_TOKEN_BUDGET
+    min_score: float = CONTEXT_MIN_SCORE
+    user_location: Optional[Tuple[float, float]] = None
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        # Villes de la session transmises par requête (le retriever est partagé entre sessions)
+        with span("retriever.route_shards") as current:
+            slugs = self.router.route(query, request_cities(run_manager))
+            current.set_attribute("shards.routed", slugs)
+
+        # Position transmise aux shards par requête (les shards sont partagés entre sessions)
+        location = request_location(run_manager, self.user_location)
+        documents = []
+        for slug in slugs:
+            shard = self.router.get(slug)
+            # L'embedding de la question est calculé une fois (cache de embed_query)
+            config = {"callbacks": run_manager.get_child(), "metadata": {"user_location": location}}
+            for doc in shard.invoke(query, config=config):
+                doc.metadata["shard"] = slug
+                documents.append(doc)
+
+        documents.sort(key=lambda doc: doc.metadata.get("score", 0.0), reverse=True)
+        documents = documents[:self.k]
+
+        if not self.token_budget:
+            return documents
+
+        # Shards servis en mode dégradé : scores TF-IDF, seuil adapté
+        local = any(doc.metadata.get("embedding_path") == "local" for doc in documents)
+        min_score = LOCAL_MIN_SCORE if local else self.min_score
+        with span("retriever.assemble_context", context__budget=self.token_budget) as current:
+            assembled, tokens = assemble_context(documents, query, self.token_budget, min_score)
+            current.set_attribute("context.tokens", tokens)
+            current.set_attribute("context.documents", len(assembled))
+        return assembled
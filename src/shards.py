@@ -0,0 +1,238 @@
+"""
+Index partitionné par agenda Open Agenda (un shard par agenda / ville)
+
+- ingestion multi-agendas : un index Faiss par agenda dans SHARDS_PATH/<slug>/
+- manifeste (shards.json) : villes couvertes et taille de chaque shard
+- routage : villes citées dans la question, sinon choix de session, sinon DEFAULT_CITIES
+- chargement paresseux des shards, déchargement des moins récemment utilisés
+"""
+import json
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    OPENAGENDA_AGENDAS,
+    AGENDAS_FILE,
+    SHARDS_PATH,
+    MAX_LOADED_SHARDS,
+    DEFAULT_CITIES,
+    TOP_K_RESULTS
+)
+from src.geo import normalize_place_text
+from src.telemetry import span, set_attributes
+
+MANIFEST_FILENAME = "shards.json"
+
+# ========================================
+# AGENDAS ET MANIFESTE
+# ========================================
+
+def load_agendas():
+    """Agendas à ingérer : OPENAGENDA_AGENDAS complétés par AGENDAS_FILE (dédupliqués par slug)"""
+    agendas = list(OPENAGENDA_AGENDAS)
+    if AGENDAS_FILE:
+        with open(AGENDAS_FILE, "r", encoding="utf-8") as f:
+            agendas.extend(json.load(f))
+
+    unique = OrderedDict()
+    for agenda in agendas:
+        unique[agenda["slug"]] = agenda
+    return list(unique.values())
+
+def shard_path(slug, shards_path=SHARDS_PATH):
+    return os.path.join(shards_path, slug)
+
+def load_manifest(shards_path=SHARDS_PATH):
+    """{slug: {"uid", "city", "cities", "documents"}} ({} si aucun shard)"""
+    manifest_path = os.path.join(shards_path, MANIFEST_FILENAME)
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_manifest(manifest, shards_path=SHARDS_PATH):
+    os.makedirs(shards_path, exist_ok=True)
+    manifest_path = os.path.join(shards_path, MANIFEST_FILENAME)
+    with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+def has_shards(shards_path=SHARDS_PATH):
+    """Vrai si l'ingestion multi-agendas a produit au moins un shard"""
+    return bool(load_manifest(shards_path))
+
+# ========================================
+# INGESTION
+# ========================================
+
+@span("shards.build_shard")
+def build_shard(agenda, shards_path=SHARDS_PATH):
+    """
+    Ingestion complète d'un agenda : événements, chunks, embeddings, index
+    Retourne l'entrée du manifeste
+    """
+    from src.data_loader import load_all_events, save_events
+    from src.data_processor import filter_events, process_events
+    from src.vector_store import get_embeddings, create_faiss_index, save_vector_store
+
+    slug, city = agenda["slug"], agenda["city"]
+    events = load_all_events(agenda["uid"], slug, city)
+    save_events(events, f"events_{slug}.json")
+
+    documents = process_events(filter_events(events))
+    for doc in documents:
+        doc["metadata"]["agenda"] = slug
+    if not documents:
+        raise ValueError(f"Aucun document pour l'agenda {slug}")
+
+    embeddings = get_embeddings([doc["text"] for doc in documents])
+    index = create_faiss_index(embeddings)
+    save_vector_store(index, documents, embeddings, shard_path(slug, shards_path))
+
+    cities = sorted({doc["metadata"].get("ville") or city for doc in documents} | {city})
+    set_attributes(agenda__slug=slug, documents__count=len(documents))
+    return {"uid": agenda["uid"], "city": city, "cities": cities, "documents": len(documents)}
+
+def build_shards(agendas=None, shards_path=SHARDS_PATH):
+    """Construit un shard par agenda ; le manifeste est mis à jour après chaque shard"""
+    manifest = load_manifest(shards_path)
+    for agenda in agendas or load_agendas():
+        print(f"\n🗂️ Shard {agenda['slug']} ({agenda['city']})")
+        try:
+            manifest[agenda["slug"]] = build_shard(agenda, shards_path)
+            save_manifest(manifest, shards_path)
+        except Exception as e:
+            print(f"❌ Shard {agenda['slug']} non construit : {e}")
+    return manifest
+
+# ========================================
+# ROUTAGE
+# ========================================
+
+def cities_in_text(text, cities):
+    """Villes (parmi cities) citées dans un texte, la plus longue en priorité"""
+    normalized = f" {normalize_place_text(text)} "
+    found = []
+    for city in sorted(cities, key=len, reverse=True):
+        pattern = f" {normalize_place_text(city)} "
+        if pattern in normalized:
+            found.append(city)
+            # "Villeneuve-d'Ascq" ne doit pas aussi déclencher une ville plus courte contenue dedans
+            normalized = normalized.replace(pattern, " ")
+    return found
+
+def route_query(query, manifest, cities=None, default_cities=DEFAULT_CITIES):
+    """
+    Shards à interroger pour une question
+    Priorité : villes citées > villes de la session (cities) > default_cities
+    Sans correspondance, tous les shards sont interrogés
+    """
+    known = {city for entry in manifest.values() for city in entry["cities"]}
+    targets = cities_in_text(query, known) or cities or default_cities
+    wanted = {normalize_place_text(city) for city in targets}
+
+    slugs = [
+        slug for slug, entry in manifest.items()
+        if wanted & {normalize_place_text(city) for city in entry["cities"]}
+    ]
+    return slugs or list(manifest)
+
+class ShardRouter:
+    """
+    Accès aux shards : routage des questions, chargement paresseux et cache LRU
+    Chaque shard est servi par un EventRetriever (géo, tombstones, compaction)
+    Un shard est chargé sous son propre verrou : les autres shards restent servis
+    pendant le chargement, et deux requêtes sur le même shard ne le chargent qu'une fois
+    """
+
+    def __init__(self, embeddings, manifest=None, shards_path=SHARDS_PATH,
+                 max_loaded=MAX_LOADED_SHARDS, k=TOP_K_RESULTS):
+        self.embeddings = embeddings
+        self.shards_path = shards_path
+        self.manifest = manifest if manifest is not None else load_manifest(shards_path)
+        self.max_loaded = max_loaded
+        self.k = k
+        self._loaded = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def route(self, query, cities=None):
+        return route_query(query, self.manifest, cities)
+
+    def loaded_shards(self):
+        with self._lock:
+            return list(self._loaded)
+
+    def get(self, slug):
+        """Retriever du shard, chargé au premier accès (hors du verrou du routeur)"""
+        retriever = self._cached(slug)
+        if retriever is not None:
+            return retriever
+        with self._lock:
+            loading = self._loading.setdefault(slug, threading.Lock())
+
+        with loading:
+            # Chargé par une autre requête pendant l'attente du verrou du shard
+            retriever = self._cached(slug)
+            if retriever is not None:
+                return retriever
+            retriever = self._load(slug)
+
+            with self._lock:
+                self._loading.pop(slug, None)
+                self._loaded[slug] = retriever
+                while len(self._loaded) > self.max_loaded:
+                    evicted, _ = self._loaded.popitem(last=False)
+                    print(f"📤 Shard {evicted} déchargé")
+            return retriever
+
+    def _cached(self, slug):
+        """Retriever d'un shard déjà chargé (marqué récemment utilisé), None sinon"""
+        with self._lock:
+            if slug in self._loaded:
+                self._loaded.move_to_end(slug)
+                return self._loaded[slug]
+        return None
+
+    def evict(self, slug):
+        """Décharge un shard (les requêtes en cours terminent dessus)"""
+        with self._lock:
+            return self._loaded.pop(slug, None) is not None
+
+    def preload(self, cities=None):
+        """Charge les shards des villes par défaut (ou de la session) et précharge leurs pages"""
+        from src.vector_store import touch_index_pages
+
+        for slug in route_query("", self.manifest, cities):
+            touch_index_pages(self.get(slug).vector_store.index)
+
+    def _load(self, slug):
+        from src.rag_chain import build_langchain_store, build_event_retriever
+        from src.vector_store import load_vector_store
+
+        with span("shards.load_shard", shard__slug=slug):
+            path = shard_path(slug, self.shards_path)
+            index, documents = load_vector_store(path)
+            vector_store = build_langchain_store(self.embeddings, index, documents)
+            print(f"📥 Shard {slug} chargé ({index.ntotal} vecteurs)")
+            return build_event_retriever(vector_store, path, k=self.k, token_budget=None)
+
+def create_sharded_retriever(embeddings=None):
+    """Retriever de la chaîne RAG au-dessus de tous les shards du manifeste"""
+    from src.rag_chain import create_embeddings
+    from src.retriever import ShardedRetriever
+
+    router = ShardRouter(embeddings or create_embeddings())
+    print(f"🗂️ {len(router.manifest)} shards disponibles : {', '.join(router.manifest)}")
+    return ShardedRetriever(router=router, k=TOP_K_RESULTS)
+
+if __name__ == "__main__":
+    # Ingestion multi-agendas : un shard par agenda
+    manifest = build_shards()
+    print(f"\n✅ {len(manifest)} shards dans {SHARDS_PATH}")
+    for slug, entry in manifest.items():
+        print(f"   {slug} : {entry['documents']} documents ({', '.join(entry['cities'][:5])})")
@@ -0,0 +1,160 @@
+"""
+Traçage et métriques OpenTelemetry du pipeline (ingestion et chat)
+
+L'export se choisit dans config.py (OTEL_EXPORTER) :
+- "none"    : API OpenTelemetry sans fournisseur, les spans ne coûtent rien
+- "console" : spans et métriques affichés sur la sortie standard
+- "otlp"    : envoi à un collecteur local (OTLP/HTTP, OTEL_ENDPOINT)
+"""
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import OTEL_EXPORTER, OTEL_ENDPOINT, OTEL_SERVICE_NAME
+
+INSTRUMENTATION_NAME = "puls-events-rag"
+
+# Variables globales
+_initialized = False
+_instruments = {}
+
+def init_telemetry():
+    """
+    Installe les fournisseurs de traces et de métriques selon la configuration
+    (idempotent, appelé automatiquement au premier span)
+    """
+    global _initialized
+    if _initialized:
+        return
+    _initialized = True
+
+    if OTEL_EXPORTER == "none":
+        return
+
+    from opentelemetry import trace, metrics
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+    from opentelemetry.sdk.metrics import MeterProvider
+    from opentelemetry.sdk.metrics.export import (
+        PeriodicExportingMetricReader,
+        ConsoleMetricExporter
+    )
+
+    if OTEL_EXPORTER == "console":
+        span_exporter = ConsoleSpanExporter()
+        metric_exporter = ConsoleMetricExporter()
+    elif OTEL_EXPORTER == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.exporter.otlp.proto.http.metric_exporter import OTLPMetricExporter
+        span_exporter = OTLPSpanExporter(endpoint=f"{OTEL_ENDPOINT}/v1/traces")
+        metric_exporter = OTLPMetricExporter(endpoint=f"{OTEL_ENDPOINT}/v1/metrics")
+    else:
+        raise ValueError(f"❌ OTEL_EXPORTER inconnu : {OTEL_EXPORTER} (none, console ou otlp)")
+
+    resource = Resource.create({"service.name": OTEL_SERVICE_NAME})
+
+    tracer_provider = TracerProvider(resource=resource)
+    tracer_provider.add_span_processor(BatchSpanProcessor(span_exporter))
+    trace.set_tracer_provider(tracer_provider)
+
+    reader = PeriodicExportingMetricReader(metric_exporter)
+    metrics.set_meter_provider(MeterProvider(resource=resource, metric_readers=[reader]))
+
+    print(f"📡 Télémétrie OpenTelemetry activée ({OTEL_EXPORTER})")
+
+def get_tracer():
+    """Retourne le tracer du projet"""
+    from opentelemetry import trace
+    init_telemetry()
+    return trace.get_tracer(INSTRUMENTATION_NAME)
+
+def _instrument(name):
+    """Crée (une seule fois) les instruments de métriques"""
+    if not _instruments:
+        from opentelemetry import metrics
+        init_telemetry()
+        meter = metrics.get_meter(INSTRUMENTATION_NAME)
+        _instruments["duration"] = meter.create_histogram(
+            "puls_events.stage.duration", unit="ms",
+            description="Durée de chaque étape du pipeline"
+        )
+        _instruments["tokens"] = meter.create_counter(
+            "puls_events.llm.tokens", unit="{token}",
+            description="Tokens consommés par les appels LLM"
+        )
+        _instruments["cache"] = meter.create_counter(
+            "puls_events.cache.requests",
+            description="Accès aux caches (attribut hit)"
+        )
+        _instruments["api_latency"] = meter.create_histogram(
+            "puls_events.api.latency", unit="ms",
+            description="Latence des appels API par endpoint (attribut outcome)"
+        )
+        _instruments["embedding_path"] = meter.create_counter(
+            "puls_events.retriever.embedding_path",
+            description="Questions vectorisées par chemin (cache, mistral, local)"
+        )
+    return _instruments[name]
+
+def _clean_attributes(attributes):
+    """
+    OpenTelemetry n'accepte que des types simples (les None sont ignorés)
+    Les noms d'attributs utilisent "__" à la place de "." (search__k=5 → search.k)
+    """
+    return {
+        key.replace("__", "."): value
+        for key, value in attributes.items() if value is not None
+    }
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Ouvre un span et enregistre sa durée dans l'histogramme des étapes
+    Utilisable en bloc "with" ou en décorateur (@span("data_loader.fetch_events"))
+    """
+    start = time.perf_counter()
+    with get_tracer().start_as_current_span(name, attributes=_clean_attributes(attributes)) as current:
+        try:
+            yield current
+        finally:
+            record_duration(name, (time.perf_counter() - start) * 1000)
+
+def start_span(name, **attributes):
+    """Version sans contexte de span(), pour les callbacks (à terminer avec end_span)"""
+    current = get_tracer().start_span(name, attributes=_clean_attributes(attributes))
+    return current, time.perf_counter()
+
+def end_span(name, current, start):
+    """Termine un span ouvert par start_span() et enregistre sa durée"""
+    current.end()
+    record_duration(name, (time.perf_counter() - start) * 1000)
+
+def record_duration(stage, duration_ms):
+    """Ajoute une durée à l'histogramme des étapes"""
+    _instrument("duration").record(duration_ms, {"stage": stage})
+
+def record_tokens(stage, prompt_tokens, completion_tokens):
+    """Comptabilise les tokens d'un appel LLM"""
+    counter = _instrument("tokens")
+    counter.add(prompt_tokens or 0, {"stage": stage, "type": "prompt"})
+    counter.add(completion_tokens or 0, {"stage": stage, "type": "completion"})
+
+def record_cache(cache, hit):
+    """Comptabilise un accès à un cache"""
+    _instrument("cache").add(1, {"cache": cache, "hit": bool(hit)})
+
+def record_api_latency(endpoint, duration_ms, outcome):
+    """Ajoute la latence d'une tentative d'appel API à l'histogramme de son endpoint"""
+    _instrument("api_latency").record(duration_ms, {"endpoint": endpoint, "outcome": outcome})
+
+def record_embedding_path(path):
+    """Comptabilise le chemin qui a vectorisé une question"""
+    _instrument("embedding_path").add(1, {"path": path})
+
+def set_attributes(**attributes):
+    """Ajoute des attributs au span courant (utile avec @span(...) en décorateur)"""
+    from opentelemetry import trace
+    trace.get_current_span().set_attributes(_clean_attributes(attributes))
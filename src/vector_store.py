@@ -4,22 +4,44 @@ Création et gestion de la base vectorielle Faiss
 import json
 import os
 import sys
-import faiss
-import numpy as np
 import pickle
-from tqdm import tqdm
-from mistralai import Mistral
+from contextlib import contextmanager
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import (
     MISTRAL_API_KEY,
     MISTRAL_EMBED_MODEL,
     DATA_PROCESSED_PATH,
-    VECTOR_STORE_PATH
+    INDEX_TYPE,
+    INDEX_TRANSFORM,
+    INDEX_TRANSFORM_DIM,
+    LOCAL_FALLBACK_ENABLED,
+    RERANK_FACTOR,
+    TOP_K_RESULTS,
+    SEARCH_ENGINE,
+    SEARCH_THREADS,
+    SEARCH_BLOCK_SIZE
 )
+from src.index_versions import active_store_path
+from src.telemetry import span, set_attributes
 
-# Initialiser le client Mistral
-client = Mistral(api_key=MISTRAL_API_KEY)
+# Client Mistral, créé au premier appel (pas d'effet de bord à l'import)
+_client = None
+
+# Fichiers de la base vectorielle
+INDEX_FILENAME = "events.index"
+METADATA_FILENAME = "metadata.pkl"
+FULL_VECTORS_FILENAME = "vectors.f32.npy"  # vecteurs pleine précision (re-classement, moteur NumPy)
+
+def get_client():
+    """Retourne le client Mistral partagé (initialisé à la demande)"""
+    global _client
+    if _client is None:
+        from mistralai import Mistral
+        from src.api_client import create_http_client
+        # Pool, délais et nouvelles tentatives : couche partagée de src/api_client.py
+        _client = Mistral(api_key=MISTRAL_API_KEY, client=create_http_client(), retry_config=None)
+    return _client
 
 def load_documents():
     """Charge les documents traités"""
@@ -29,104 +51,375 @@ def load_documents():
     print(f"📂 {len(documents)} documents chargés")
     return documents
 
-def get_embeddings(texts, batch_size=10):
+@span("vector_store.get_embeddings")
+def get_embeddings(texts, batch_size=10, pause=1.5):
     """
     Génère les embeddings via l'API Mistral
     On envoie les textes par batch pour éviter de dépasser les limites de l'API
+    (pause : attente en secondes entre deux batchs, 0 pour les mesures de latence)
+    Les 429 sont retentés par le transport partagé (src/api_client.py, Retry-After respecté)
     """
     import time
+    from tqdm import tqdm
+    client = get_client()
     all_embeddings = []
 
     for i in tqdm(range(0, len(texts), batch_size), desc="🔄 Génération des embeddings"):
         batch = texts[i:i + batch_size]
-
-        # Retry en cas de rate limit
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                response = client.embeddings.create(
-                    model=MISTRAL_EMBED_MODEL,
-                    inputs=batch
-                )
-                batch_embeddings = [item.embedding for item in response.data]
-                all_embeddings.extend(batch_embeddings)
-                break
-            except Exception as e:
-                if "429" in str(e) and attempt < max_retries - 1:
-                    wait_time = 10 * (attempt + 1)
-                    print(f"\n⚠️ Rate limit atteint, pause de {wait_time}s...")
-                    time.sleep(wait_time)
-                else:
-                    raise e
+        response = client.embeddings.create(
+            model=MISTRAL_EMBED_MODEL,
+            inputs=batch
+        )
+        all_embeddings.extend(item.embedding for item in response.data)
 
         # Pause entre chaque batch
-        time.sleep(1.5)
+        if pause and i + batch_size < len(texts):
+            time.sleep(pause)
 
+    set_attributes(texts__count=len(texts), batch__size=batch_size)
     return all_embeddings
 
-def create_faiss_index(embeddings):
+def normalize_vectors(embeddings):
+    """Convertit en matrice float32 normalisée (similarité cosinus = produit scalaire)"""
+    import numpy as np
+
+    vectors = np.array(embeddings, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors.reshape(1, -1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors /= np.maximum(norms, 1e-12)
+    return vectors
+
+def fit_pca(vectors, dim):
+    """
+    ACP non centrée des vecteurs normés (axes principaux de la matrice de Gram)
+    Sans centrage, les produits scalaires projetés approchent les similarités cosinus
+    Retourne (matrice de projection (dim, d), part de la variance conservée)
+    """
+    import numpy as np
+
+    vectors = np.asarray(vectors, dtype=np.float64)
+    eigenvalues, eigenvectors = np.linalg.eigh(vectors.T @ vectors)
+    order = np.argsort(eigenvalues)[::-1][:dim]
+    retained = float(eigenvalues[order].sum() / max(eigenvalues.sum(), 1e-12))
+    return eigenvectors[:, order].T.astype(np.float32), retained
+
+def pca_transform(vectors, dim):
+    """
+    Projection ACP vers dim dimensions suivie d'une renormalisation, au format Faiss
+    Retourne (transformations dans l'ordre d'application, part de la variance conservée)
+    """
+    import faiss
+
+    matrix, retained = fit_pca(vectors, dim)
+    projection = faiss.LinearTransform(vectors.shape[1], dim, False)
+    faiss.copy_array_to_vector(matrix.ravel(), projection.A)
+    projection.is_trained = True
+    return [projection, faiss.NormalizationTransform(dim, 2.0)], retained
+
+@span("vector_store.create_faiss_index")
+def create_faiss_index(embeddings, index_type=INDEX_TYPE, transform=INDEX_TRANSFORM,
+                       transform_dim=INDEX_TRANSFORM_DIM):
     """
     Crée un index Faiss à partir des embeddings
+    index_type : "flat" (float32), "fp16" (demi-précision) ou "sq8" (quantification 8 bits)
+    transform  : "none" ou "pca" (réduction à transform_dim dimensions, apprise sur le corpus,
+                 sauvegardée dans l'index et appliquée automatiquement aux requêtes)
     """
-    embeddings_array = np.array(embeddings, dtype=np.float32)
+    import faiss
+
+    # Normaliser les vecteurs (pour la similarité cosinus)
+    embeddings_array = normalize_vectors(embeddings)
     dimension = embeddings_array.shape[1]
     print(f"📐 Dimension des vecteurs : {dimension}")
 
-    # Normaliser les vecteurs (pour la similarité cosinus)
-    faiss.normalize_L2(embeddings_array)
+    transforms, retained = [], None
+    if transform == "pca" and transform_dim < dimension:
+        transforms, retained = pca_transform(embeddings_array, transform_dim)
+        print(f"📉 ACP {dimension} → {transform_dim} dimensions : {retained:.1%} de la variance conservée")
+    elif transform not in ("none", "pca"):
+        raise ValueError(f"❌ INDEX_TRANSFORM inconnu : {transform} (none ou pca)")
+    index_dimension = transforms[-1].d_out if transforms else dimension
 
     # Créer l'index
-    index = faiss.IndexFlatIP(dimension)  # IP = Inner Product (similarité cosinus)
+    if index_type == "flat":
+        index = faiss.IndexFlatIP(index_dimension)  # IP = Inner Product (similarité cosinus)
+    elif index_type in ("fp16", "sq8"):
+        qtype = faiss.ScalarQuantizer.QT_fp16 if index_type == "fp16" else faiss.ScalarQuantizer.QT_8bit
+        index = faiss.IndexScalarQuantizer(index_dimension, qtype, faiss.METRIC_INNER_PRODUCT)
+    else:
+        raise ValueError(f"❌ INDEX_TYPE inconnu : {index_type} (flat, fp16 ou sq8)")
+
+    if transforms:
+        # Les transformations sont appliquées par Faiss aux vecteurs ajoutés et aux requêtes
+        index = faiss.IndexPreTransform(index)
+        for vector_transform in reversed(transforms):
+            index.prepend_transform(vector_transform)
+    if not index.is_trained:
+        index.train(embeddings_array)
     index.add(embeddings_array)
 
-    print(f"✅ Index Faiss créé avec {index.ntotal} vecteurs")
+    print(f"✅ Index Faiss ({index_type}) créé avec {index.ntotal} vecteurs")
+    set_attributes(index__ntotal=index.ntotal, index__dimension=index_dimension, index__type=index_type)
+    if retained is not None:
+        set_attributes(index__transform=transform, index__variance_retained=retained)
+    return index
+
+def base_index(index):
+    """Index qui stocke les codes (sous les éventuelles transformations)"""
+    import faiss
+
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexPreTransform):
+        return faiss.downcast_index(index.index)
     return index
 
-def save_vector_store(index, documents):
+def is_transformed(index):
+    """Vrai si les vecteurs sont projetés (ACP) avant d'être indexés"""
+    import faiss
+    return isinstance(faiss.downcast_index(index), faiss.IndexPreTransform)
+
+def is_quantized(index):
+    """Vrai si l'index stocke des codes quantifiés (re-classement utile)"""
+    import faiss
+    return isinstance(base_index(index), faiss.IndexScalarQuantizer)
+
+def needs_rerank(index):
+    """Vrai si les scores de l'index sont approchés (codes quantifiés ou dimension réduite)"""
+    return is_quantized(index) or is_transformed(index)
+
+def index_memory_bytes(index):
+    """Mémoire occupée par les codes de l'index"""
+    return base_index(index).code_size * index.ntotal
+
+@span("vector_store.save_vector_store")
+def save_vector_store(index, documents, embeddings=None, path=None):
     """
     Sauvegarde l'index Faiss et les métadonnées
+    Les embeddings pleine précision sont écrits à part (fichier .npy lu en mémoire
+    mappée) : re-classement des index quantifiés et moteur de recherche NumPy,
+    avec les centroïdes des événements (recherche en deux temps, src/event_index.py)
+    L'index local de secours (src/local_embeddings.py) est reconstruit à chaque sauvegarde
+    path : dossier de la base (par défaut celui que lisent les chargeurs : version courante,
+    sinon VECTOR_STORE_PATH ; ou un shard, voir src/shards.py). Pour publier une nouvelle
+    version, utiliser index_versions.publish_version
     """
-    os.makedirs(VECTOR_STORE_PATH, exist_ok=True)
+    import faiss
+    import numpy as np
+    from src.event_index import EVENT_CENTROIDS_FILENAME, save_event_centroids
+    from src.local_embeddings import LOCAL_INDEX_FILENAME, LOCAL_IDF_FILENAME, save_local_index
+
+    path = path or active_store_path()
+    os.makedirs(path, exist_ok=True)
+
+    # Écriture dans un fichier temporaire puis renommage : un processus qui lit
+    # (ou a mappé en mémoire) l'ancienne version n'est jamais exposé à un fichier tronqué
 
     # Sauvegarder l'index Faiss
-    index_path = os.path.join(VECTOR_STORE_PATH, "events.index")
-    faiss.write_index(index, index_path)
+    index_path = os.path.join(path, INDEX_FILENAME)
+    faiss.write_index(index, index_path + ".tmp")
+    os.replace(index_path + ".tmp", index_path)
     print(f"💾 Index Faiss sauvegardé : {index_path}")
 
     # Sauvegarder les métadonnées (pour retrouver les infos des événements)
-    metadata_path = os.path.join(VECTOR_STORE_PATH, "metadata.pkl")
-    with open(metadata_path, "wb") as f:
+    metadata_path = os.path.join(path, METADATA_FILENAME)
+    with open(metadata_path + ".tmp", "wb") as f:
         pickle.dump(documents, f)
+    os.replace(metadata_path + ".tmp", metadata_path)
     print(f"💾 Métadonnées sauvegardées : {metadata_path}")
 
-def load_vector_store():
+    # Sauvegarder les vecteurs pleine précision
+    vectors_path = os.path.join(path, FULL_VECTORS_FILENAME)
+    centroids_path = os.path.join(path, EVENT_CENTROIDS_FILENAME)
+    if embeddings is not None:
+        vectors = normalize_vectors(embeddings)
+        with open(vectors_path + ".tmp", "wb") as f:
+            np.save(f, vectors)
+        os.replace(vectors_path + ".tmp", vectors_path)
+        print(f"💾 Vecteurs pleine précision sauvegardés : {vectors_path}")
+        save_event_centroids(path, vectors, [doc.get("metadata", {}) for doc in documents])
+    else:
+        for stale_path in (vectors_path, centroids_path):
+            if os.path.exists(stale_path):
+                os.remove(stale_path)
+
+    # Index local de secours (embeddings hachés, mode dégradé)
+    if LOCAL_FALLBACK_ENABLED:
+        save_local_index(path, documents)
+    else:
+        for stale_path in (os.path.join(path, LOCAL_INDEX_FILENAME), os.path.join(path, LOCAL_IDF_FILENAME)):
+            if os.path.exists(stale_path):
+                os.remove(stale_path)
+
+@span("vector_store.load_vector_store")
+def load_vector_store(path=None):
     """
     Charge l'index Faiss et les métadonnées depuis le disque
+    (par défaut la version courante, voir src/index_versions.py)
     """
-    index_path = os.path.join(VECTOR_STORE_PATH, "events.index")
-    metadata_path = os.path.join(VECTOR_STORE_PATH, "metadata.pkl")
+    import faiss
+
+    path = path or active_store_path()
+
+    index_path = os.path.join(path, INDEX_FILENAME)
 
     index = faiss.read_index(index_path)
-    with open(metadata_path, "rb") as f:
-        documents = pickle.load(f)
+    documents = load_metadata(path)
 
     print(f"✅ Index Faiss chargé : {index.ntotal} vecteurs")
     return index, documents
 
-def search(query, index, documents, top_k=5):
+def load_metadata(path=None):
+    """Charge les documents associés aux vecteurs (sans Faiss)"""
+    path = path or active_store_path()
+    metadata_path = os.path.join(path, METADATA_FILENAME)
+    with open(metadata_path, "rb") as f:
+        return pickle.load(f)
+
+def has_vector_store(path=None):
+    """Vrai si l'index construit par ce module existe sur le disque"""
+    path = path or active_store_path()
+    return os.path.exists(os.path.join(path, INDEX_FILENAME))
+
+def load_full_precision_vectors(path=None):
+    """
+    Ouvre les vecteurs pleine précision en mémoire mappée (None s'ils n'existent pas)
+    Seules les lignes des candidats à re-classer sont lues depuis le disque
+    """
+    import numpy as np
+
+    path = path or active_store_path()
+
+    vectors_path = os.path.join(path, FULL_VECTORS_FILENAME)
+    if not os.path.exists(vectors_path):
+        return None
+    return np.load(vectors_path, mmap_mode="r")
+
+def touch_index_pages(index, page_size=4096):
+    """
+    Lit un octet par page mémoire des vecteurs de l'index pour les rendre résidents
+    (évite les défauts de page sur les premières recherches)
+    Retourne le nombre d'octets parcourus
+    """
+    import faiss
+
+    codes = getattr(base_index(index), "codes", None)
+    if codes is None or codes.size() == 0:
+        return 0
+
+    data = faiss.rev_swig_ptr(codes.data(), codes.size())
+    int(data[::page_size].sum())
+    return codes.size()
+
+def rerank(query_vectors, candidate_ids, full_vectors, top_k):
+    """
+    Re-classe les candidats d'un index quantifié ou réduit avec les vecteurs pleine précision
+    Retourne (scores, ids) de forme (n_requêtes, top_k)
+    """
+    import numpy as np
+
+    n_queries = query_vectors.shape[0]
+    scores = np.full((n_queries, top_k), -np.inf, dtype=np.float32)
+    ids = np.full((n_queries, top_k), -1, dtype=np.int64)
+
+    for row in range(n_queries):
+        candidates = candidate_ids[row][candidate_ids[row] != -1]
+        if len(candidates) == 0:
+            continue
+        # Lecture triée : accès séquentiel au fichier mappé
+        order = np.argsort(candidates)
+        exact = np.asarray(full_vectors[candidates[order]]) @ query_vectors[row]
+        best = np.argsort(-exact)[:top_k]
+        scores[row, :len(best)] = exact[best]
+        ids[row, :len(best)] = candidates[order][best]
+
+    return scores, ids
+
+def search_by_vector(query_vectors, index, top_k=TOP_K_RESULTS, full_vectors=None,
+                     rerank_factor=RERANK_FACTOR, alive_bitmap=None):
+    """
+    Recherche Faiss à partir de vecteurs de requêtes (une ligne par requête)
+    Les scores sont des similarités cosinus, quel que soit le type d'index
+    Si full_vectors est fourni, k x rerank_factor candidats sont re-classés en pleine précision
+    alive_bitmap : bits des documents encore valides (voir src/expiry.py), les autres sont ignorés
+    Retourne (scores, ids)
+    """
+    import faiss
+
+    query_vectors = normalize_vectors(query_vectors)
+    fetch_k = top_k * rerank_factor if full_vectors is not None else top_k
+
+    params = None
+    if alive_bitmap is not None:
+        params = faiss.SearchParameters(sel=faiss.IDSelectorBitmap(alive_bitmap))
+
+    with span("vector_store.faiss_search", search__k=top_k, search__fetch_k=fetch_k) as current:
+        scores, ids = index.search(query_vectors, min(fetch_k, max(index.ntotal, 1)), params=params)
+
+        # Index L2 (format LangChain) : distance² = 2 - 2 x cosinus pour des vecteurs normés
+        if index.metric_type == faiss.METRIC_L2:
+            scores = 1 - scores / 2
+
+        if full_vectors is not None:
+            scores, ids = rerank(query_vectors, ids, full_vectors, top_k)
+        current.set_attribute("search.scores", [float(score) for score in scores[0]])
+
+    return scores, ids
+
+def search_in_subset(query_vectors, index, candidate_ids, top_k=TOP_K_RESULTS, full_vectors=None):
+    """
+    Recherche vectorielle restreinte à un sous-ensemble de documents (filtre géographique...)
+    Avec full_vectors : produit scalaire exact sur les candidats, sinon filtre d'ids Faiss
+    Retourne (scores, ids) comme search_by_vector
+    """
+    import faiss
+    import numpy as np
+
+    query_vectors = normalize_vectors(query_vectors)
+    candidate_ids = np.asarray(candidate_ids, dtype=np.int64)
+
+    with span("vector_store.subset_search", search__k=top_k, search__candidates=len(candidate_ids)):
+        if full_vectors is not None:
+            return rerank(query_vectors, np.tile(candidate_ids, (len(query_vectors), 1)), full_vectors, top_k)
+
+        params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(candidate_ids))
+        scores, ids = index.search(query_vectors, max(min(top_k, len(candidate_ids)), 1), params=params)
+        if index.metric_type == faiss.METRIC_L2:
+            scores = 1 - scores / 2
+    return scores, ids
+
+def search_near(query_vectors, index, geo_index, latitude, longitude, radius_km=None,
+                nearest_k=None, top_k=TOP_K_RESULTS, full_vectors=None):
+    """
+    Recherche vectorielle parmi les documents proches d'un point (voir src/geo.py)
+    Candidats : documents à moins de radius_km, ou les nearest_k plus proches
+    Retourne (scores, ids, distances_km) ; distances_km est aligné sur ids (NaN pour -1)
+    """
+    import numpy as np
+
+    if radius_km is not None:
+        positions, km = geo_index.within_radius(latitude, longitude, radius_km)
+    else:
+        positions, km = geo_index.nearest(latitude, longitude, nearest_k or top_k)
+
+    scores, ids = search_in_subset(query_vectors, index, positions, top_k, full_vectors)
+    lookup = dict(zip(positions.tolist(), km.tolist()))
+    distances = np.array([[lookup.get(int(i), np.nan) for i in row] for row in ids])
+    return scores, ids, distances
+
+def search(query, index, documents, top_k=5, full_vectors=None):
     """
     Recherche les documents les plus similaires à une requête
     """
     # Vectoriser la requête
-    response = client.embeddings.create(
-        model=MISTRAL_EMBED_MODEL,
-        inputs=[query]
-    )
-    query_embedding = np.array([response.data[0].embedding], dtype=np.float32)
-    faiss.normalize_L2(query_embedding)
+    with span("vector_store.embed_query", query__length=len(query)):
+        response = get_client().embeddings.create(
+            model=MISTRAL_EMBED_MODEL,
+            inputs=[query]
+        )
 
     # Rechercher dans Faiss
-    scores, indices = index.search(query_embedding, top_k)
+    scores, indices = search_by_vector([response.data[0].embedding], index, top_k, full_vectors)
 
     # Retourner les documents correspondants
     results = []
@@ -139,30 +432,273 @@ def search(query, index, documents, top_k=5):
 
     return results
 
+# ========================================
+# RECHERCHE EN BATCH
+# ========================================
+
+def faiss_available():
+    """Vrai si Faiss est installé (sans l'importer)"""
+    import importlib.util
+    return importlib.util.find_spec("faiss") is not None
+
+@contextmanager
+def search_threads(threads):
+    """
+    Nombre de threads OpenMP de Faiss le temps d'un bloc (None = inchangé)
+    Le réglage est global au processus : la valeur précédente est rétablie en sortie
+    """
+    if not threads or not faiss_available():
+        yield
+        return
+    import faiss
+    previous = faiss.omp_get_max_threads()
+    faiss.omp_set_num_threads(threads)
+    try:
+        yield
+    finally:
+        faiss.omp_set_num_threads(previous)
+
+def _numpy_search_block(query_block, vectors, top_k, block_size):
+    """
+    Top-k exact d'un bloc de requêtes : produit matriciel par blocs de documents,
+    argpartition sur chaque bloc puis fusion avec les meilleurs résultats courants
+    """
+    import numpy as np
+
+    n_queries = query_block.shape[0]
+    best_scores = np.full((n_queries, 0), -np.inf, dtype=np.float32)
+    best_ids = np.full((n_queries, 0), -1, dtype=np.int64)
+
+    for start in range(0, vectors.shape[0], block_size):
+        block = np.asarray(vectors[start:start + block_size], dtype=np.float32)
+        scores = np.concatenate([best_scores, query_block @ block.T], axis=1)
+        ids = np.concatenate(
+            [best_ids, np.broadcast_to(np.arange(start, start + block.shape[0]), (n_queries, block.shape[0]))],
+            axis=1
+        )
+        keep = min(top_k, scores.shape[1])
+        part = np.argpartition(-scores, keep - 1, axis=1)[:, :keep]
+        best_scores = np.take_along_axis(scores, part, axis=1)
+        best_ids = np.take_along_axis(ids, part, axis=1)
+
+    order = np.argsort(-best_scores, axis=1)
+    return np.take_along_axis(best_scores, order, axis=1), np.take_along_axis(best_ids, order, axis=1)
+
+def numpy_search(query_vectors, vectors, top_k=TOP_K_RESULTS, threads=SEARCH_THREADS,
+                 block_size=SEARCH_BLOCK_SIZE):
+    """
+    Recherche exacte en pur NumPy (environnements sans Faiss)
+    Les blocs de requêtes sont répartis sur un pool de threads (le produit
+    matriciel NumPy libère le GIL)
+    Retourne (scores, ids) comme search_by_vector
+    """
+    import numpy as np
+    from concurrent.futures import ThreadPoolExecutor
+
+    query_vectors = normalize_vectors(query_vectors)
+    blocks = [query_vectors[i:i + block_size] for i in range(0, len(query_vectors), block_size)]
+
+    with span("vector_store.numpy_search", search__k=top_k, search__queries=len(query_vectors)):
+        if threads and threads > 1 and len(blocks) > 1:
+            with ThreadPoolExecutor(max_workers=threads) as pool:
+                results = list(pool.map(lambda b: _numpy_search_block(b, vectors, top_k, block_size), blocks))
+        else:
+            results = [_numpy_search_block(b, vectors, top_k, block_size) for b in blocks]
+
+    scores = np.concatenate([r[0] for r in results])
+    ids = np.concatenate([r[1] for r in results])
+
+    # Moins de documents que k : compléter comme Faiss (-1)
+    if ids.shape[1] < top_k:
+        missing = top_k - ids.shape[1]
+        scores = np.pad(scores, ((0, 0), (0, missing)), constant_values=-np.inf)
+        ids = np.pad(ids, ((0, 0), (0, missing)), constant_values=-1)
+    return scores, ids
+
+def search_batch(queries, index=None, documents=None, top_k=TOP_K_RESULTS, engine=SEARCH_ENGINE,
+                 threads=SEARCH_THREADS, full_vectors=None, embed_batch_size=32):
+    """
+    Recherche pour de nombreuses requêtes en une seule recherche matricielle
+
+    queries      : liste de textes (vectorisés par batchs) ou matrice de vecteurs
+    engine       : "faiss" (index requis), "numpy" (full_vectors requis) ou "auto"
+    threads      : threads OpenMP (Faiss) ou taille du pool de threads (NumPy)
+    full_vectors : vecteurs du corpus (moteur NumPy, re-classement des index quantifiés ou réduits)
+
+    Retourne, pour chaque requête, la liste des {"document", "score"} si documents
+    est fourni, sinon le couple (scores, ids)
+    """
+    if len(queries) and isinstance(queries[0], str):
+        query_vectors = get_embeddings(list(queries), batch_size=embed_batch_size, pause=0)
+    else:
+        query_vectors = queries
+
+    if engine == "auto":
+        engine = "faiss" if index is not None and faiss_available() else "numpy"
+
+    with span("vector_store.search_batch", search__engine=engine, search__queries=len(query_vectors)):
+        if engine == "faiss":
+            rerank_vectors = full_vectors if full_vectors is not None and needs_rerank(index) else None
+            with search_threads(threads):
+                scores, ids = search_by_vector(query_vectors, index, top_k, rerank_vectors)
+        elif engine == "numpy":
+            if full_vectors is None:
+                raise ValueError("❌ Le moteur NumPy nécessite les vecteurs du corpus (full_vectors)")
+            scores, ids = numpy_search(query_vectors, full_vectors, top_k, threads)
+        else:
+            raise ValueError(f"❌ Moteur de recherche inconnu : {engine} (auto, faiss ou numpy)")
+
+    if documents is None:
+        return scores, ids
+
+    return [
+        [
+            {"document": documents[idx], "score": float(score)}
+            for score, idx in zip(row_scores, row_ids) if idx != -1
+        ]
+        for row_scores, row_ids in zip(scores, ids)
+    ]
+
+def _report_queries(full_vectors, query_embeddings=None, n_queries=200, seed=0):
+    """Requêtes des rapports : fournies, sinon un échantillon des embeddings du corpus"""
+    import numpy as np
+
+    if query_embeddings is not None:
+        return normalize_vectors(query_embeddings)
+    rng = np.random.default_rng(seed)
+    sample = rng.choice(len(full_vectors), min(n_queries, len(full_vectors)), replace=False)
+    return full_vectors[sample]
+
+def _recall(ids, truth):
+    """Part des top-k exacts retrouvés, en moyenne sur les requêtes"""
+    import numpy as np
+
+    return float(np.mean([
+        len(set(found[found != -1]) & set(expected)) / len(expected)
+        for found, expected in zip(ids, truth)
+    ]))
+
+def quantization_report(embeddings, query_embeddings=None, top_k=TOP_K_RESULTS,
+                        index_types=("fp16", "sq8"), n_queries=200, seed=0):
+    """
+    Compare les index quantifiés à l'index flat (référence exacte) :
+    mémoire des codes et recall@k, sans puis avec re-classement pleine précision
+    Sans requêtes fournies, un échantillon des embeddings du corpus sert de requêtes
+    """
+    full_vectors = normalize_vectors(embeddings)
+    queries = _report_queries(full_vectors, query_embeddings, n_queries, seed)
+
+    flat = create_faiss_index(full_vectors, "flat", transform="none")
+    _, truth = flat.search(queries, top_k)
+    flat_bytes = index_memory_bytes(flat)
+
+    def recall(ids):
+        return _recall(ids, truth)
+
+    report = [{"index_type": "flat", "memory_bytes": flat_bytes, "memory_saved": 0.0,
+               "recall": 1.0, "recall_rerank": 1.0}]
+    for index_type in index_types:
+        index = create_faiss_index(full_vectors, index_type, transform="none")
+        _, ids = search_by_vector(queries, index, top_k)
+        _, ids_rerank = search_by_vector(queries, index, top_k, full_vectors)
+        memory = index_memory_bytes(index)
+        report.append({
+            "index_type": index_type,
+            "memory_bytes": memory,
+            "memory_saved": 1 - memory / flat_bytes,
+            "recall": recall(ids),
+            "recall_rerank": recall(ids_rerank),
+        })
+
+    print(f"\n📊 Quantification ({len(queries)} requêtes, recall@{top_k} vs flat)")
+    for row in report:
+        print(
+            f"   {row['index_type']:<5} {row['memory_bytes'] / 1024:9.1f} Ko "
+            f"(-{row['memory_saved']:.0%})  recall {row['recall']:.3f}  "
+            f"avec re-classement {row['recall_rerank']:.3f}"
+        )
+    return report
+
+def transform_report(embeddings, query_embeddings=None, top_k=TOP_K_RESULTS,
+                     dims=(64, 128, 256, 512), index_type=INDEX_TYPE, n_queries=200, seed=0):
+    """
+    Compare les index réduits par ACP à l'index sans réduction (référence exacte) :
+    variance conservée, mémoire des codes et recall@k, sans puis avec re-classement
+    Sans requêtes fournies, un échantillon des embeddings du corpus sert de requêtes
+    """
+    full_vectors = normalize_vectors(embeddings)
+    queries = _report_queries(full_vectors, query_embeddings, n_queries, seed)
+
+    flat = create_faiss_index(full_vectors, "flat", transform="none")
+    _, truth = flat.search(queries, top_k)
+    flat_bytes = index_memory_bytes(flat)
+
+    report = [{"dim": full_vectors.shape[1], "variance": 1.0, "memory_bytes": flat_bytes,
+               "memory_saved": 0.0, "recall": 1.0, "recall_rerank": 1.0}]
+    for dim in dims:
+        if dim >= full_vectors.shape[1]:
+            continue
+        index = create_faiss_index(full_vectors, index_type, transform="pca", transform_dim=dim)
+        _, ids = search_by_vector(queries, index, top_k)
+        _, ids_rerank = search_by_vector(queries, index, top_k, full_vectors)
+        memory = index_memory_bytes(index)
+        report.append({
+            "dim": dim,
+            "variance": fit_pca(full_vectors, dim)[1],
+            "memory_bytes": memory,
+            "memory_saved": 1 - memory / flat_bytes,
+            "recall": _recall(ids, truth),
+            "recall_rerank": _recall(ids_rerank, truth),
+        })
+
+    print(f"\n📊 Réduction ACP, index {index_type} ({len(queries)} requêtes, recall@{top_k} vs flat)")
+    for row in report:
+        print(
+            f"   {row['dim']:>5} dim  variance {row['variance']:6.1%}  "
+            f"{row['memory_bytes'] / 1024:9.1f} Ko (-{row['memory_saved']:.0%})  "
+            f"recall {row['recall']:.3f}  avec re-classement {row['recall_rerank']:.3f}"
+        )
+    return report
+
 if __name__ == "__main__":
-    # 1. Charger les documents
-    documents = load_documents()
+    from src.profiling import profiled
+
+    # Profil cProfile si PROFILE_ENABLED (src/profiling.py)
+    with profiled("vector_store.main"):
+        from src.index_versions import publish_version
+
+        # 1. Charger les documents
+        documents = load_documents()
+
+        # 2. Extraire les textes
+        texts = [doc["text"] for doc in documents]
 
-    # 2. Extraire les textes
-    texts = [doc["text"] for doc in documents]
+        # 3. Générer les embeddings
+        print(f"\n🚀 Génération des embeddings pour {len(texts)} documents...")
+        embeddings = get_embeddings(texts, batch_size=10)
 
-    # 3. Générer les embeddings
-    print(f"\n🚀 Génération des embeddings pour {len(texts)} documents...")
-    embeddings = get_embeddings(texts, batch_size=10)
+        # 4. Créer l'index Faiss
+        print("\n🏗️ Création de l'index Faiss...")
+        index = create_faiss_index(embeddings)
 
-    # 4. Créer l'index Faiss
-    print("\n🏗️ Création de l'index Faiss...")
-    index = create_faiss_index(embeddings)
+        # 5. Publier une nouvelle version (les processus de chat la rechargent à chaud)
+        publish_version(index, documents, embeddings)
 
-    # 5. Sauvegarder
-    save_vector_store(index, documents)
+        # 6. Mémoire économisée et recall des index quantifiés ou réduits
+        if is_quantized(index):
+            quantization_report(embeddings)
+        if is_transformed(index):
+            transform_report(embeddings, dims=sorted({INDEX_TRANSFORM_DIM // 2, INDEX_TRANSFORM_DIM,
+                                                      INDEX_TRANSFORM_DIM * 2}))
 
-    # 6. Test de recherche
-    print("\n🧪 Test de recherche...")
-    index, documents = load_vector_store()
-    results = search("concert de musique à Lille", index, documents, top_k=3)
+        # 7. Test de recherche
+        print("\n🧪 Test de recherche...")
+        index, documents = load_vector_store()
+        full_vectors = load_full_precision_vectors() if needs_rerank(index) else None
+        results = search("concert de musique à Lille", index, documents, top_k=3,
+                         full_vectors=full_vectors)
 
-    print("\n🎯 Résultats pour 'concert de musique à Lille' :")
-    for i, result in enumerate(results):
-        print(f"\n--- Résultat {i+1} (score: {result['score']:.3f}) ---")
-        print(result["document"]["text"][:300])
\ No newline at end of file
+        print("\n🎯 Résultats pour 'concert de musique à Lille' :")
+        for i, result in enumerate(results):
+            print(f"\n--- Résultat {i+1} (score: {result['score']:.3f}) ---")
+            print(result["document"]["text"][:300])
\ No newline at end of file
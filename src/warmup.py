@@ -0,0 +1,206 @@
+"""
+Préchauffage du chatbot en arrière-plan et état de disponibilité (readiness)
+
+Au démarrage du processus, start_warmup() charge l'index et construit la chaîne
+dans un thread, lit les pages de l'index et peut ouvrir les connexions API.
+Les requêtes attendent la fin du préchauffage (wait_until_ready) au lieu de
+déclencher elles-mêmes le chargement.
+
+États : "idle" → "loading" → "ready" (ou "failed")
+Après un échec, le prochain start_warmup() (ou chat) relance le préchauffage.
+L'échec de l'étape optionnelle des appels API est signalé ("warnings") sans
+empêcher le chatbot, déjà chargé, d'être prêt.
+"""
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import WARMUP_API_CALLS, WARMUP_TIMEOUT, READINESS_FILE, HEALTH_PORT
+from src.telemetry import span
+
+# Variables globales
+_state = {
+    "status": "idle",
+    "error": None,
+    "started_at": None,
+    "ready_at": None,
+    "timings_ms": {},
+    "warnings": [],
+}
+_lock = threading.Lock()
+_ready = threading.Event()
+_thread = None
+_health_server = None
+
+def start_warmup(warm_api_calls=WARMUP_API_CALLS):
+    """
+    Lance le préchauffage dans un thread (idempotent tant qu'il est en cours ou réussi,
+    relancé après un échec)
+    Démarre aussi le serveur /health si HEALTH_PORT est configuré
+    """
+    global _thread
+
+    with _lock:
+        if _thread is not None:
+            return _thread
+        _ready.clear()
+        _state["status"] = "loading"
+        _state["error"] = None
+        _state["warnings"] = []
+        _state["started_at"] = time.time()
+        _clear_readiness_file()
+        _thread = threading.Thread(
+            target=_run_warmup, args=(warm_api_calls,),
+            name="chatbot-warmup", daemon=True
+        )
+        _thread.start()
+
+    if HEALTH_PORT:
+        start_health_server(HEALTH_PORT)
+    return _thread
+
+def _timed(step, func, *args):
+    """Exécute une étape du préchauffage en mesurant sa durée"""
+    start = time.perf_counter()
+    with span(f"warmup.{step}"):
+        result = func(*args)
+    _state["timings_ms"][step] = round((time.perf_counter() - start) * 1000, 1)
+    return result
+
+def _run_warmup(warm_api_calls):
+    """Corps du thread de préchauffage"""
+    global _thread
+    from src.chatbot import initialize_chatbot
+    from src.vector_store import touch_index_pages
+
+    try:
+        print("🔥 Préchauffage du chatbot en arrière-plan...")
+        rag_chain, _ = _timed("load", initialize_chatbot)
+        retriever = rag_chain.retriever
+        if hasattr(retriever, "router"):
+            # Index multi-agendas : seuls les shards des villes par défaut sont chargés
+            _timed("load_shards", retriever.router.preload)
+        else:
+            _timed("touch_pages", touch_index_pages, retriever.vector_store.index)
+        if warm_api_calls:
+            try:
+                _timed("api_calls", _warm_api_calls, rag_chain)
+            except Exception as e:
+                # Étape optionnelle : le chatbot est chargé, il reste prêt
+                with _lock:
+                    _state["warnings"].append(f"api_calls : {e}")
+                print(f"⚠️ Préchauffage des appels API impossible : {e}")
+
+        with _lock:
+            _state["status"] = "ready"
+            _state["ready_at"] = time.time()
+    except Exception as e:
+        with _lock:
+            _state["status"] = "failed"
+            _state["error"] = str(e)
+            # Le prochain start_warmup() relance le préchauffage (nouveau thread, _ready remis à zéro)
+            _thread = None
+            _ready.set()
+        print(f"❌ Échec du préchauffage : {e}")
+        return
+
+    try:
+        _write_readiness_file()
+    except OSError as e:
+        print(f"⚠️ Fichier de disponibilité non écrit : {e}")
+    _ready.set()
+    print(f"✅ Préchauffage terminé : {_state['timings_ms']}")
+
+def _warm_api_calls(rag_chain):
+    """Un embedding et un appel LLM minimal pour ouvrir les connexions HTTP"""
+    from src.retriever import embed_query
+
+    retriever = rag_chain.retriever
+    embeddings = retriever.router.embeddings if hasattr(retriever, "router") else retriever.vector_store.embeddings
+    embed_query(embeddings, "concert à Lille")
+    rag_chain.combine_docs_chain.llm_chain.llm.invoke("Bonjour", max_tokens=1)
+
+def is_ready():
+    """Vrai si le chatbot peut répondre"""
+    return _state["status"] == "ready"
+
+def get_status():
+    """État de disponibilité (copie), pour les sondes et l'interface"""
+    with _lock:
+        status = dict(_state)
+        status["timings_ms"] = dict(_state["timings_ms"])
+        status["warnings"] = list(_state["warnings"])
+    # Latences des appels API, si des clients ont déjà été créés
+    if "src.api_client" in sys.modules:
+        status["api_latency_ms"] = sys.modules["src.api_client"].latency_summary()
+    # Chemin des embeddings de questions (API ou secours local), si le retriever a servi
+    if "src.local_embeddings" in sys.modules:
+        status["embeddings"] = sys.modules["src.local_embeddings"].embedding_status()
+    return status
+
+def wait_until_ready(timeout=WARMUP_TIMEOUT):
+    """
+    Attend la fin du préchauffage (le démarre si besoin)
+    Retourne True si le chatbot est prêt, False en cas d'échec ou de délai dépassé
+    """
+    start_warmup()
+    _ready.wait(timeout)
+    return is_ready()
+
+# ========================================
+# SONDES (fichier et HTTP)
+# ========================================
+
+def _write_readiness_file():
+    if READINESS_FILE:
+        with open(READINESS_FILE, "w", encoding="utf-8") as f:
+            json.dump(get_status(), f)
+
+def _clear_readiness_file():
+    if READINESS_FILE and os.path.exists(READINESS_FILE):
+        os.remove(READINESS_FILE)
+
+def start_health_server(port):
+    """
+    Serveur HTTP minimal dans un thread :
+    - /health : 200 tant que le processus tourne (liveness)
+    - /ready  : 200 si le chatbot est prêt, 503 sinon (readiness)
+    """
+    global _health_server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    if _health_server is not None:
+        return _health_server
+
+    class HealthHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/health":
+                code = 200
+            elif self.path == "/ready":
+                code = 200 if is_ready() else 503
+            else:
+                self.send_error(404)
+                return
+            body = json.dumps(get_status()).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    _health_server = ThreadingHTTPServer(("0.0.0.0", port), HealthHandler)
+    threading.Thread(target=_health_server.serve_forever, name="health-server", daemon=True).start()
+    print(f"🩺 Sondes disponibles sur http://0.0.0.0:{port}/health et /ready")
+    return _health_server
+
+if __name__ == "__main__":
+    # Vérification ponctuelle : préchauffe puis affiche l'état (code 0 si prêt)
+    ready = wait_until_ready()
+    print(json.dumps(get_status(), ensure_ascii=False, indent=2))
+    sys.exit(0 if ready else 1)
@@ -0,0 +1,111 @@
+"""
+Benchmark du temps de démarrage (imports et initialisation du chatbot)
+
+Chaque mesure est faite dans un processus Python neuf avec "python -X importtime",
+comme lors d'un démarrage à froid de Streamlit ou d'un conteneur.
+
+Exemples :
+    python tests/benchmark_startup.py
+    python tests/benchmark_startup.py --top 15
+    python tests/benchmark_startup.py --full    # inclut le chargement de l'index et de la chaîne
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+from config import IMPORT_TIME_BUDGET_MS
+
+# Modules chargés au démarrage de l'application et des scripts
+STARTUP_MODULES = [
+    "src.chatbot",
+    "src.rag_chain",
+    "src.vector_store",
+    "src.data_loader",
+    "src.data_processor",
+    "src.warmup",
+]
+
+# Dépendances lourdes qui ne doivent pas être importées au démarrage
+HEAVY_MODULES = ["faiss", "numpy", "langchain", "langchain_core", "mistralai", "requests"]
+
+def parse_importtime(stderr):
+    """
+    Analyse la sortie de -X importtime
+    Retourne une liste de (module, self_us, cumulative_us)
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        entries.append((module.strip(), int(self_us), int(cumulative_us)))
+    return entries
+
+def measure_imports(modules):
+    """Importe les modules dans un processus neuf et retourne les mesures"""
+    code = "import " + ", ".join(modules)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True
+    )
+    entries = parse_importtime(result.stderr)
+    total_us = sum(cumulative for module, _, cumulative in entries if module in modules)
+    return total_us / 1000, entries
+
+def loaded_heavy_modules(modules):
+    """Liste les dépendances lourdes présentes dans sys.modules après l'import"""
+    code = (
+        "import sys\n"
+        f"import {', '.join(modules)}\n"
+        f"print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True
+    )
+    return result.stdout.split()
+
+def measure_full_startup():
+    """Mesure le temps jusqu'au chatbot prêt (index chargé, chaîne construite)"""
+    code = "from src.chatbot import initialize_chatbot; initialize_chatbot()"
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT_DIR, check=True, capture_output=True)
+    return (time.perf_counter() - start) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du temps de démarrage")
+    parser.add_argument("--top", type=int, default=10, help="Nombre d'imports les plus lents à afficher")
+    parser.add_argument("--full", action="store_true", help="Mesure aussi l'initialisation du chatbot")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("⏱️ BENCHMARK DU DÉMARRAGE")
+    print("=" * 60)
+
+    import_ms, entries = measure_imports(STARTUP_MODULES)
+    print(f"\n📦 Import de {', '.join(STARTUP_MODULES)}")
+    print(f"   Total : {import_ms:.1f} ms (budget : {IMPORT_TIME_BUDGET_MS} ms)")
+
+    print(f"\n🐢 {args.top} imports les plus coûteux (cumulé) :")
+    for module, _, cumulative in sorted(entries, key=lambda e: e[2], reverse=True)[:args.top]:
+        print(f"   {cumulative / 1000:8.1f} ms  {module}")
+
+    heavy = loaded_heavy_modules(STARTUP_MODULES)
+    if heavy:
+        print(f"\n⚠️ Dépendances lourdes importées au démarrage : {', '.join(heavy)}")
+
+    if args.full:
+        full_ms = measure_full_startup()
+        print(f"\n🚀 Démarrage complet (chatbot prêt) : {full_ms:.0f} ms")
+
+    over_budget = import_ms > IMPORT_TIME_BUDGET_MS
+    print()
+    print("❌ Budget d'import dépassé" if over_budget else "✅ Budget d'import respecté")
+    sys.exit(1 if over_budget else 0)
+
+if __name__ == "__main__":
+    main()
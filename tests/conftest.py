@@ -0,0 +1,24 @@
+"""
+Fixtures partagées des tests unitaires
+"""
+import pytest
+
+@pytest.fixture
+def fake_embeddings():
+    """
+    Fabrique d'embeddings factices : fake_embeddings(vector) renvoie toujours vector,
+    pour la question comme pour les documents (aucun appel à l'API Mistral)
+    """
+    from langchain_core.embeddings import Embeddings
+
+    class FakeEmbeddings(Embeddings):
+        def __init__(self, vector):
+            self.vector = [float(value) for value in vector]
+
+        def embed_documents(self, texts):
+            return [self.vector for _ in texts]
+
+        def embed_query(self, text):
+            return self.vector
+
+    return FakeEmbeddings
@@ -0,0 +1,291 @@
+"""
+Évaluation de la recherche seule (sans LLM) avec le jeu de données test
+
+Seules les étapes d'embedding et de recherche Faiss sont exécutées, en batch :
+une requête d'embedding pour toutes les questions, puis une recherche matricielle.
+Métriques : recall@k, MRR, nDCG@k et latence.
+
+Exemples :
+    python tests/run_retrieval_evaluation.py
+    python tests/run_retrieval_evaluation.py --k 1 3 5 10
+    python tests/run_retrieval_evaluation.py --chunk-sizes 300 500 800 --chunk-overlaps 0 50
+    python tests/run_retrieval_evaluation.py --index-types flat fp16 sq8
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    CHUNK_SIZE,
+    CHUNK_OVERLAP,
+    TOP_K_RESULTS,
+    INDEX_TYPE,
+    SEARCH_ENGINE,
+    SEARCH_THREADS
+)
+
+DEFAULT_K_VALUES = [1, 3, TOP_K_RESULTS, 10]
+
+# ========================================
+# JUGEMENT DE PERTINENCE
+# ========================================
+
+def keyword_matches(keyword, text):
+    """Vérifie un mot-clé (avec alternatives "a|b") dans un texte déjà en minuscules"""
+    return any(alt.lower() in text for alt in keyword.split("|"))
+
+def expected_items(test_case):
+    """
+    Retourne les éléments attendus d'une question :
+    les uids s'ils sont renseignés, sinon les mots-clés de recherche
+    """
+    uids = test_case.get("expected_uids") or []
+    if uids:
+        return uids
+    return test_case.get("expected_retrieval_keywords") or []
+
+def judge_document(document, test_case):
+    """
+    Retourne l'ensemble des éléments attendus couverts par un document
+    (vide si le document n'est pas pertinent)
+    """
+    uids = test_case.get("expected_uids") or []
+    if uids:
+        uid = document.get("metadata", {}).get("uid")
+        return {uid} if uid in uids else set()
+
+    text = document.get("text", "").lower()
+    keywords = test_case.get("expected_retrieval_keywords") or []
+    return {kw for kw in keywords if keyword_matches(kw, text)}
+
+# ========================================
+# MÉTRIQUES
+# ========================================
+
+def recall_at_k(hits, n_expected, k):
+    """
+    Part des éléments attendus couverts par les k premiers résultats
+    (hits : liste d'ensembles renvoyés par judge_document, dans l'ordre du classement)
+    """
+    if n_expected == 0:
+        return 0.0
+    covered = set()
+    for hit in hits[:k]:
+        covered |= hit
+    return len(covered) / n_expected
+
+def reciprocal_rank(hits):
+    """Inverse du rang du premier résultat pertinent (0 si aucun)"""
+    for rank, hit in enumerate(hits, 1):
+        if hit:
+            return 1.0 / rank
+    return 0.0
+
+def ndcg_at_k(hits, k, n_relevant):
+    """
+    nDCG@k à pertinence binaire
+    n_relevant : nombre de documents pertinents dans le corpus (borne de l'idéal)
+    """
+    dcg = sum(
+        1.0 / math.log2(rank + 1)
+        for rank, hit in enumerate(hits[:k], 1) if hit
+    )
+    ideal_count = min(k, n_relevant)
+    if ideal_count == 0:
+        return 0.0
+    idcg = sum(1.0 / math.log2(rank + 1) for rank in range(1, ideal_count + 1))
+    return dcg / idcg
+
+def compute_metrics(test_cases, ranked_documents, corpus, k_values):
+    """
+    Agrège les métriques sur toutes les questions évaluables
+    ranked_documents : pour chaque question, la liste ordonnée des documents retrouvés
+    """
+    totals = {f"recall@{k}": 0.0 for k in k_values}
+    totals.update({f"ndcg@{k}": 0.0 for k in k_values})
+    totals["mrr"] = 0.0
+    evaluated = 0
+
+    for test, documents in zip(test_cases, ranked_documents):
+        n_expected = len(expected_items(test))
+        if n_expected == 0:
+            continue
+
+        hits = [judge_document(doc, test) for doc in documents]
+        n_relevant = sum(1 for doc in corpus if judge_document(doc, test))
+
+        for k in k_values:
+            totals[f"recall@{k}"] += recall_at_k(hits, n_expected, k)
+            totals[f"ndcg@{k}"] += ndcg_at_k(hits, k, n_relevant)
+        totals["mrr"] += reciprocal_rank(hits)
+        evaluated += 1
+
+    metrics = {name: (value / evaluated if evaluated else 0.0) for name, value in totals.items()}
+    metrics["questions"] = evaluated
+    return metrics
+
+# ========================================
+# RECHERCHE EN BATCH
+# ========================================
+
+def embed_questions(questions):
+    """
+    Vectorise toutes les questions en un seul appel
+    (une fois par exécution, partagé par toutes les configurations balayées)
+    """
+    from src.vector_store import get_embeddings
+
+    start = time.perf_counter()
+    embeddings = get_embeddings(questions, batch_size=len(questions), pause=0)
+    embed_ms = (time.perf_counter() - start) * 1000
+    return embeddings, embed_ms
+
+def batch_retrieve(query_embeddings, index, documents, top_k, full_vectors=None,
+                   engine=SEARCH_ENGINE, threads=SEARCH_THREADS):
+    """
+    Interroge l'index en une seule recherche matricielle (Faiss ou NumPy)
+    Retourne les documents classés et la latence de recherche (en ms)
+    """
+    from src.vector_store import search_batch
+
+    start = time.perf_counter()
+    results = search_batch(query_embeddings, index, documents, top_k, engine, threads, full_vectors)
+    search_ms = (time.perf_counter() - start) * 1000
+
+    ranked = [[result["document"] for result in row] for row in results]
+    return ranked, search_ms
+
+def evaluate_retrieval(test_cases, query_embeddings, embed_ms, index, documents, k_values,
+                       full_vectors=None, engine=SEARCH_ENGINE, threads=SEARCH_THREADS):
+    """Évalue un index déjà construit"""
+    n_queries = len(test_cases)
+    ranked, search_ms = batch_retrieve(query_embeddings, index, documents, max(k_values),
+                                       full_vectors, engine, threads)
+    metrics = compute_metrics(test_cases, ranked, documents, k_values)
+    metrics.update({
+        "embed_ms": embed_ms,
+        "search_ms": search_ms,
+        "embed_ms_per_query": embed_ms / n_queries,
+        "search_ms_per_query": search_ms / n_queries,
+    })
+    return metrics
+
+def build_corpus_for_config(chunk_size, chunk_overlap):
+    """Re-découpe les événements bruts et vectorise les documents obtenus"""
+    from src.data_processor import load_raw_events, filter_events, process_events
+    from src.vector_store import get_embeddings
+
+    events = filter_events(load_raw_events())
+    documents = process_events(events, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    embeddings = get_embeddings([doc["text"] for doc in documents])
+    return embeddings, documents
+
+def load_current_corpus():
+    """Embeddings et documents de l'index courant (vecteurs pleine précision si disponibles)"""
+    from src.vector_store import load_vector_store, load_full_precision_vectors
+
+    index, documents = load_vector_store()
+    full_vectors = load_full_precision_vectors()
+    embeddings = full_vectors if full_vectors is not None else index.reconstruct_n(0, index.ntotal)
+    return embeddings, documents
+
+def build_index_for_type(embeddings, index_type):
+    """Construit l'index d'un type donné (+ vecteurs pleine précision du corpus)"""
+    from src.vector_store import create_faiss_index, normalize_vectors
+
+    index = create_faiss_index(embeddings, index_type)
+    return index, normalize_vectors(embeddings)
+
+def print_metrics(label, metrics, k_values):
+    """Affiche les métriques d'une configuration"""
+    print(f"\n📊 {label} ({metrics['questions']} questions évaluées)")
+    for k in k_values:
+        print(f"   recall@{k:<3} {metrics[f'recall@{k}']:.3f}   nDCG@{k:<3} {metrics[f'ndcg@{k}']:.3f}")
+    print(f"   MRR        {metrics['mrr']:.3f}")
+    print(f"   ⏱️ Embedding : {metrics['embed_ms']:.0f} ms ({metrics['embed_ms_per_query']:.1f} ms/question)")
+    print(f"   ⏱️ Recherche : {metrics['search_ms']:.2f} ms ({metrics['search_ms_per_query']:.3f} ms/question)")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Évaluation de la recherche seule (sans LLM)")
+    parser.add_argument("--k", type=int, nargs="+", default=DEFAULT_K_VALUES,
+                        help="Valeurs de k pour recall@k et nDCG@k")
+    parser.add_argument("--chunk-sizes", type=int, nargs="+",
+                        help="Balayage de CHUNK_SIZE (reconstruit un index par configuration)")
+    parser.add_argument("--chunk-overlaps", type=int, nargs="+",
+                        help="Balayage de CHUNK_OVERLAP")
+    parser.add_argument("--index-types", nargs="+", choices=["flat", "fp16", "sq8"],
+                        help="Balayage du type d'index (INDEX_TYPE)")
+    parser.add_argument("--engine", choices=["auto", "faiss", "numpy"], default=SEARCH_ENGINE,
+                        help="Moteur de recherche en batch")
+    parser.add_argument("--threads", type=int, default=SEARCH_THREADS,
+                        help="Threads de recherche (OpenMP pour Faiss, pool pour NumPy)")
+    parser.add_argument("--output", help="Fichier JSON où écrire les résultats")
+    return parser.parse_args()
+
+def main():
+    from tests.run_evaluation import load_test_dataset
+
+    args = parse_args()
+    k_values = sorted(set(args.k))
+    test_cases = load_test_dataset()["test_cases"]
+
+    print("=" * 60)
+    print("🔎 ÉVALUATION DE LA RECHERCHE (SANS LLM)")
+    print("=" * 60)
+
+    questions = [test["question"] for test in test_cases]
+    query_embeddings, embed_ms = embed_questions(questions)
+
+    results = []
+    if args.chunk_sizes or args.chunk_overlaps or args.index_types:
+        if args.chunk_sizes or args.chunk_overlaps:
+            chunk_configs = [
+                (chunk_size, chunk_overlap)
+                for chunk_size in args.chunk_sizes or [CHUNK_SIZE]
+                for chunk_overlap in args.chunk_overlaps or [CHUNK_OVERLAP]
+            ]
+        else:
+            chunk_configs = [None]
+
+        for chunk_config in chunk_configs:
+            if chunk_config is None:
+                chunk_size, chunk_overlap = CHUNK_SIZE, CHUNK_OVERLAP
+                embeddings, documents = load_current_corpus()
+            else:
+                chunk_size, chunk_overlap = chunk_config
+                print(f"\n🏗️ Découpage et vectorisation : chunk_size={chunk_size} chunk_overlap={chunk_overlap}")
+                embeddings, documents = build_corpus_for_config(chunk_size, chunk_overlap)
+
+            for index_type in args.index_types or [INDEX_TYPE]:
+                label = f"chunk_size={chunk_size} chunk_overlap={chunk_overlap} index={index_type}"
+                index, full_vectors = build_index_for_type(embeddings, index_type)
+                metrics = evaluate_retrieval(test_cases, query_embeddings, embed_ms,
+                                             index, documents, k_values, full_vectors,
+                                             args.engine, args.threads)
+                print_metrics(label, metrics, k_values)
+                results.append({"chunk_size": chunk_size, "chunk_overlap": chunk_overlap,
+                                "index_type": index_type, **metrics})
+    else:
+        from src.vector_store import load_vector_store, load_metadata, load_full_precision_vectors
+        if args.engine == "numpy":
+            index, documents = None, load_metadata()
+        else:
+            index, documents = load_vector_store()
+        metrics = evaluate_retrieval(test_cases, query_embeddings, embed_ms, index, documents,
+                                     k_values, load_full_precision_vectors(),
+                                     args.engine, args.threads)
+        print_metrics("Index courant", metrics, k_values)
+        results.append({"chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP,
+                        "index_type": INDEX_TYPE, **metrics})
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Résultats sauvegardés dans {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Tests unitaires - Couche client partagée (nouvelles tentatives, disjoncteur, doublage)
+"""
+import os
+import sys
+import threading
+import time
+import httpx
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.api_client import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LatencyWindow,
+    ResilientTransport,
+    backoff_delay,
+    endpoint_name
+)
+
+# ========================================
+# FIXTURES
+# ========================================
+
+def make_client(handler, **kwargs):
+    """Client httpx dont le réseau est remplacé par handler(request) → httpx.Response"""
+    sleeps = []
+    transport = ResilientTransport(httpx.MockTransport(handler), sleep=sleeps.append, **kwargs)
+    return httpx.Client(base_url="https://api.test/v1", transport=transport), transport, sleeps
+
+# ========================================
+# TESTS - NOUVELLES TENTATIVES ET DÉLAIS
+# ========================================
+
+def test_retries_retryable_status_with_jittered_backoff():
+    """Un 503 est retenté avec une attente aléatoire bornée, un 400 ne l'est pas"""
+    statuses = iter([503, 503, 200])
+    client, transport, sleeps = make_client(lambda request: httpx.Response(next(statuses)))
+    assert client.post("/embeddings", json={"input": ["a"]}).status_code == 200
+    assert len(sleeps) == 2 and all(0 <= delay <= 1.0 for delay in sleeps)
+
+    client, _, sleeps = make_client(lambda request: httpx.Response(400))
+    assert client.post("/chat/completions", json={}).status_code == 400
+    assert sleeps == []
+
+def test_backoff_delay_is_capped():
+    assert all(0 <= backoff_delay(attempt, base=0.5, cap=2) <= 2 for attempt in range(10))
+    assert endpoint_name("/v1/chat/completions") == "/chat/completions"
+
+def test_deadline_caps_request_timeouts():
+    """Aucune phase de la requête ne peut dépasser le délai total de l'endpoint"""
+    seen = {}
+
+    def handler(request):
+        seen.update(request.extensions["timeout"])
+        return httpx.Response(200)
+
+    client, _, _ = make_client(handler, deadlines={"/embeddings": 2})
+    client.post("/embeddings", json={}, timeout=30)
+    assert 0 < seen["read"] <= 2 and seen["connect"] <= 2
+
+# ========================================
+# TESTS - DISJONCTEUR
+# ========================================
+
+def test_circuit_opens_then_half_opens():
+    """Ouvert après N échecs, un seul essai après le délai, refermé par un succès"""
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+    breaker.record_failure(now=0)
+    assert breaker.allow(now=1)
+    breaker.record_failure(now=1)
+    assert not breaker.allow(now=5)
+
+    assert breaker.allow(now=12) and not breaker.allow(now=12)
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+def test_open_circuit_fails_fast():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(500)
+
+    client, transport, _ = make_client(handler, max_retries=10)
+    transport.breaker("/embeddings").failure_threshold = 3
+    client.post("/embeddings", json={})
+    assert len(calls) == 3
+    with pytest.raises(CircuitOpenError):
+        client.post("/embeddings", json={})
+    assert len(calls) == 3
+
+def test_throttling_is_retried_without_opening_circuit():
+    """Un 429 est retenté (Retry-After respecté) mais ne compte pas comme une panne"""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(429, headers={"Retry-After": "0.2"})
+
+    client, transport, sleeps = make_client(handler, max_retries=4)
+    transport.breaker("/embeddings").failure_threshold = 2
+    assert client.post("/embeddings", json={}).status_code == 429
+    assert len(calls) == 5 and sleeps == [0.2] * 4
+    assert transport.breaker("/embeddings").state == "closed"
+
+# ========================================
+# TESTS - REQUÊTES DOUBLÉES ET LATENCES
+# ========================================
+
+def test_hedged_request_returns_fastest_response():
+    """Si la 1re requête dépasse le p95, la 2e part et la plus rapide l'emporte"""
+    first = threading.Event()
+
+    def handler(request):
+        if not first.is_set():
+            first.set()
+            time.sleep(0.5)
+            return httpx.Response(200, json={"from": "slow"})
+        return httpx.Response(200, json={"from": "hedge"})
+
+    client, transport, _ = make_client(handler, hedge_endpoints={"/embeddings"})
+    window = transport.latency("/embeddings")
+    for _ in range(50):
+        window.add(20.0)
+
+    start = time.perf_counter()
+    assert client.post("/embeddings", json={}).json() == {"from": "hedge"}
+    assert time.perf_counter() - start < 0.4
+
+def test_latency_window_percentiles():
+    window = LatencyWindow(size=100)
+    assert window.percentile(95) is None
+    for value in range(1, 101):
+        window.add(float(value))
+    assert window.percentile(50) == 51.0 and window.percentile(95) == 96.0
@@ -0,0 +1,75 @@
+"""
+Tests unitaires - Assemblage du contexte avec budget de tokens
+"""
+import os
+import sys
+import pytest
+from langchain_core.documents import Document
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.context_assembler import assemble_context, count_tokens, trim_description
+
+# ========================================
+# FIXTURES
+# ========================================
+
+def make_document(uid, title, description, lieu, score):
+    text = "\n".join([
+        f"Événement : {title}",
+        f"Description : {description}",
+        f"Lieu : {lieu}",
+        "Ville : Lille",
+        f"Plus d'infos : https://openagenda.com/ville-de-lille/events/{uid}",
+    ])
+    return Document(page_content=text, metadata={"uid": uid, "score": score})
+
+@pytest.fixture
+def documents():
+    return [
+        make_document(1, "Jazz au parc", "Un concert de jazz en plein air.", "Parc Barbieux", 0.82),
+        make_document(2, "Nuit du rock", "Trois groupes de rock sur scène.", "Aéronef", 0.74),
+        make_document(3, "Atelier couture", "Apprendre à coudre.", "Maison Folie", 0.30),
+    ]
+
+# ========================================
+# TESTS
+# ========================================
+
+def test_low_score_documents_are_dropped(documents):
+    """Les résultats sous le score minimal sont écartés"""
+    assembled, _ = assemble_context(documents, "concert", token_budget=1000, min_score=0.5)
+    assert [doc.metadata["uid"] for doc in assembled] == [1, 2]
+
+def test_city_line_is_deduplicated_across_events(documents):
+    """"Ville : Lille" n'apparaît qu'une fois dans le contexte"""
+    assembled, _ = assemble_context(documents, "concert", token_budget=1000, min_score=0.5)
+    context = "\n".join(doc.page_content for doc in assembled)
+    assert context.count("Ville : Lille") == 1
+    assert "Lieu : Aéronef" in context
+
+def test_repeated_chunk_headers_are_deduplicated():
+    """Les en-têtes répétés par le chevauchement des chunks d'un événement sont retirés"""
+    chunks = [
+        Document(page_content="Lieu : Aéronef\nDescription : Début.", metadata={"uid": 7, "score": 0.9}),
+        Document(page_content="Lieu : Aéronef\nSuite du texte.", metadata={"uid": 7, "score": 0.8}),
+    ]
+    assembled, _ = assemble_context(chunks, "rock", token_budget=1000, min_score=0)
+    assert assembled[1].page_content == "Suite du texte."
+
+def test_budget_is_respected(documents):
+    """Le contexte ne dépasse jamais le budget de tokens"""
+    budget = count_tokens(documents[0].page_content) + 5
+    assembled, tokens = assemble_context(documents, "concert", token_budget=budget, min_score=0)
+    assert tokens <= budget
+    assert assembled[0].metadata["uid"] == 1
+
+def test_trim_description_keeps_most_relevant_sentences():
+    """Les phrases les plus proches de la question sont conservées, dans l'ordre"""
+    description = (
+        "Venez nombreux avec vos amis et votre famille ce soir. "
+        "Le groupe joue des standards de jazz manouche. "
+        "Une buvette est installée sur place pour toute la soirée."
+    )
+    trimmed = trim_description(description, "concert de jazz manouche", max_tokens=20)
+    assert "jazz manouche" in trimmed
+    assert count_tokens(trimmed) <= 20
@@ -0,0 +1,102 @@
+"""
+Tests unitaires - Index des événements (centroïdes, recherche en deux temps)
+"""
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.event_index import EventIndex, group_chunks
+from src.vector_store import create_faiss_index, normalize_vectors, search_by_vector
+
+# ========================================
+# FIXTURES
+# ========================================
+
+@pytest.fixture
+def corpus():
+    """40 événements de 1 à 4 chunks, les chunks d'un événement proches les uns des autres"""
+    rng = np.random.default_rng(3)
+    vectors, metadatas = [], []
+    for event in range(40):
+        center = rng.normal(size=32)
+        for chunk in range(1 + event % 4):
+            vectors.append(center + 0.3 * rng.normal(size=32))
+            metadatas.append({"uid": f"evt-{event}", "chunk_index": chunk})
+    return normalize_vectors(vectors), metadatas
+
+# ========================================
+# TESTS
+# ========================================
+
+def test_centroids_group_chunks_by_uid(corpus):
+    """Un centroïde par uid : moyenne normée des chunks de l'événement"""
+    vectors, metadatas = corpus
+    uids, event_of_chunk = group_chunks(metadatas)
+    event_index = EventIndex.from_vectors(vectors, metadatas)
+
+    assert len(event_index) == 40 and uids[:2] == ["evt-0", "evt-1"]
+    expected = vectors[event_of_chunk == 3].mean(axis=0)
+    np.testing.assert_allclose(event_index.centroids[3], expected / np.linalg.norm(expected), rtol=1e-5)
+    assert event_index.chunks[3].tolist() == np.flatnonzero(event_of_chunk == 3).tolist()
+
+def test_two_stage_search_matches_exhaustive_search(corpus):
+    """Les meilleurs chunks des événements retenus sont ceux de la recherche exhaustive"""
+    vectors, metadatas = corpus
+    event_index = EventIndex.from_vectors(vectors, metadatas)
+    flat = create_faiss_index(vectors, "flat", transform="none")
+
+    for row in (0, 10, 50):
+        exact_scores, exact_ids = search_by_vector(vectors[row:row + 1], flat, 3)
+        scores, ids, event_scores = event_index.search(vectors[row], 3)
+        np.testing.assert_array_equal(ids, exact_ids)
+        np.testing.assert_allclose(scores, exact_scores, rtol=1e-5)
+        assert set(event_scores) == set(ids[0].tolist())
+
+def test_two_stage_search_skips_expired_chunks(corpus):
+    """Les chunks expirés ne sont pas candidats ; un événement entièrement expiré est ignoré"""
+    vectors, metadatas = corpus
+    _, event_of_chunk = group_chunks(metadatas)
+    event_index = EventIndex.from_vectors(vectors, metadatas)
+    dead = event_of_chunk == event_of_chunk[10]
+
+    events, _ = event_index.top_events(vectors[10], 5, dead)
+    _, ids, _ = event_index.search(vectors[10], 5, dead=dead)
+
+    assert event_of_chunk[10] not in events.tolist()
+    assert not dead[ids[0][ids[0] != -1]].any()
+
+def test_centroids_saved_with_index(corpus, tmp_path):
+    """Les centroïdes sont écrits avec l'index et relus tels quels"""
+    from src.event_index import EVENT_CENTROIDS_FILENAME
+    from src.vector_store import save_vector_store
+
+    vectors, metadatas = corpus
+    documents = [{"text": f"doc {i}", "metadata": metadata} for i, metadata in enumerate(metadatas)]
+    save_vector_store(create_faiss_index(vectors, "flat"), documents, vectors, str(tmp_path))
+
+    saved = np.load(tmp_path / EVENT_CENTROIDS_FILENAME)
+    loaded = EventIndex.load(str(tmp_path), metadatas, vectors)
+    np.testing.assert_array_equal(loaded.centroids, saved)
+    assert EventIndex.load(str(tmp_path), metadatas, None) is None
+
+def test_retriever_groups_chunks_by_event(corpus, fake_embeddings):
+    """Le retriever sert les chunks regroupés par événement, avec le score de l'événement"""
+    from src.rag_chain import build_langchain_store
+    from src.retriever import EventRetriever
+
+    vectors, metadatas = corpus
+    documents = [{"text": f"doc {i}", "metadata": metadata} for i, metadata in enumerate(metadatas)]
+
+    retriever = EventRetriever(
+        vector_store=build_langchain_store(fake_embeddings(vectors[10]), create_faiss_index(vectors, "flat"), documents),
+        k=6, token_budget=None, event_index=EventIndex.from_vectors(vectors, metadatas)
+    )
+    results = retriever.invoke("événement à deux chunks")
+
+    uids = [doc.metadata["uid"] for doc in results]
+    assert results[0].page_content == "doc 10" and "event_score" in results[0].metadata
+    # Chaque événement n'apparaît qu'en un seul bloc contigu
+    blocks = [uid for position, uid in enumerate(uids) if position == 0 or uids[position - 1] != uid]
+    assert len(blocks) == len(set(uids))
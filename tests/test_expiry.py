@@ -0,0 +1,117 @@
+"""
+Tests unitaires - Expiration des événements passés (tombstones, compaction)
+"""
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.expiry import ExpiryTracker, compact_index, parse_end_date
+from src.vector_store import create_faiss_index, normalize_vectors, search_by_vector
+
+NOW = parse_end_date("2030-01-01T00:00:00+00:00")
+
+# ========================================
+# FIXTURES
+# ========================================
+
+@pytest.fixture
+def embeddings():
+    return np.random.default_rng(1).normal(size=(8, 16)).astype(np.float32)
+
+@pytest.fixture
+def documents():
+    """8 chunks : les 3 premiers se terminent avant NOW, le dernier n'a pas de date de fin"""
+    dates = ["2020-05-01T20:00:00+02:00", "2020-05-30T23:00:00Z", "2029-12-31T23:59:00Z",
+             "2030-01-01T00:01:00Z", "2099-07-14", "2099-12-31T23:59:00+01:00",
+             "2099-01-15T18:00:00+01:00", ""]
+    return [{"text": f"doc {i}", "metadata": {"uid": i, "date_fin": date}} for i, date in enumerate(dates)]
+
+# ========================================
+# TESTS - TOMBSTONES
+# ========================================
+
+def test_tracker_marks_past_events(documents):
+    """Les chunks dont la date de fin est passée sont marqués, ceux sans date jamais"""
+    tracker = ExpiryTracker.from_documents([doc["metadata"] for doc in documents])
+    tracker.refresh(now=NOW)
+
+    assert tracker.dead.tolist() == [True, True, True, False, False, False, False, False]
+    assert tracker.dead_fraction == pytest.approx(3 / 8)
+    assert tracker.needs_compaction(0.2) and not tracker.needs_compaction(0.5)
+
+def test_alive_bitmap_masks_search(embeddings, documents):
+    """Les chunks expirés n'occupent plus de place dans le top-k"""
+    tracker = ExpiryTracker.from_documents([doc["metadata"] for doc in documents])
+    bitmap = tracker.refresh(now=NOW)
+
+    for index_type, full_vectors in (("flat", None), ("sq8", normalize_vectors(embeddings))):
+        index = create_faiss_index(embeddings, index_type)
+        scores, ids = search_by_vector(embeddings[:3], index, 5, full_vectors, alive_bitmap=bitmap)
+        assert not set(ids.ravel().tolist()) & {0, 1, 2}
+        assert (ids != -1).all()
+
+# ========================================
+# TESTS - COMPACTION
+# ========================================
+
+def test_compact_index_keeps_order(embeddings, documents):
+    """La compaction retire les vecteurs expirés sans changer l'ordre des autres"""
+    tracker = ExpiryTracker.from_documents([doc["metadata"] for doc in documents])
+    tracker.refresh(now=NOW)
+    index = create_faiss_index(embeddings, "flat")
+
+    compacted, kept_documents, vectors = compact_index(index, documents, tracker.dead,
+                                                      normalize_vectors(embeddings))
+
+    assert index.ntotal == 8 and compacted.ntotal == 5
+    assert [doc["metadata"]["uid"] for doc in kept_documents] == [3, 4, 5, 6, 7]
+    _, ids = search_by_vector(embeddings[3:8], compacted, 1)
+    assert ids[:, 0].tolist() == [0, 1, 2, 3, 4]
+    np.testing.assert_allclose(vectors, normalize_vectors(embeddings)[3:])
+
+def test_background_compaction_swaps_retriever_index(embeddings, documents, fake_embeddings):
+    """La compaction remplace d'un bloc l'index servi par le retriever"""
+    from src.expiry import _run_compaction
+    from src.rag_chain import build_langchain_store
+    from src.retriever import EventRetriever
+
+    tracker = ExpiryTracker.from_documents([doc["metadata"] for doc in documents])
+    tracker.refresh(now=NOW)
+    retriever = EventRetriever(
+        vector_store=build_langchain_store(fake_embeddings(embeddings[6]), create_faiss_index(embeddings, "flat"), documents),
+        k=3, token_budget=None, expiry=tracker
+    )
+
+    _run_compaction(retriever)
+
+    vector_store, _, geo_index, expiry, *_ = retriever.current_index()
+    assert vector_store.index.ntotal == 5 and len(expiry) == 5 and len(geo_index) == 0
+    uids = [doc.metadata["uid"] for doc in retriever.invoke("concert")]
+    assert uids[0] == 6 and not set(uids) & {0, 1, 2}
+
+def test_failed_compaction_waits_before_retry(embeddings, documents, monkeypatch):
+    """Une compaction sans effet n'est pas relancée à chaque requête sur le même index"""
+    from src import expiry as expiry_module
+    from src.retriever import EventRetriever
+
+    attempts = []
+    monkeypatch.setattr(expiry_module, "_run_compaction", attempts.append)
+    monkeypatch.setattr(expiry_module, "_compaction_attempts", {})
+    tracker = ExpiryTracker.from_documents([doc["metadata"] for doc in documents])
+    tracker.refresh(now=NOW)
+    retriever = EventRetriever(vector_store=None, expiry=tracker)
+
+    def start(**kwargs):
+        started = expiry_module.maybe_start_compaction(retriever, **kwargs)
+        expiry_module._compaction_thread.join()
+        return started
+
+    assert start()
+    assert not expiry_module.maybe_start_compaction(retriever)
+    assert start(retry_after=0)
+    # Nouvel index (rechargement, compaction réussie) : pas d'attente
+    retriever.swap_index(None, expiry=tracker)
+    assert start()
+    assert len(attempts) == 3
@@ -0,0 +1,120 @@
+"""
+Tests unitaires - Index géographique (grille, gazetteer, recherche filtrée)
+"""
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.geo import GeoIndex, haversine_km, locate_query, resolve_place
+
+# ========================================
+# FIXTURES
+# ========================================
+
+@pytest.fixture
+def points():
+    """300 points aléatoires autour de Lille (environ 10 km x 10 km)"""
+    rng = np.random.default_rng(7)
+    return 50.63 + rng.uniform(-0.05, 0.05, 300), 3.06 + rng.uniform(-0.07, 0.07, 300)
+
+@pytest.fixture
+def geo_index(points):
+    latitudes, longitudes = points
+    return GeoIndex(latitudes, longitudes, np.arange(len(latitudes)))
+
+# ========================================
+# TESTS - GRILLE
+# ========================================
+
+@pytest.mark.parametrize("radius_km", [0.3, 1.5, 4.0])
+def test_within_radius_matches_brute_force(points, geo_index, radius_km):
+    """La grille renvoie exactement les points du rayon, triés par distance"""
+    latitudes, longitudes = points
+    distances = haversine_km(50.6365, 3.0707, latitudes, longitudes)
+    expected = np.flatnonzero(distances <= radius_km)
+
+    positions, km = geo_index.within_radius(50.6365, 3.0707, radius_km)
+    assert sorted(positions.tolist()) == sorted(expected.tolist())
+    assert (np.diff(km) >= 0).all()
+
+@pytest.mark.parametrize("k", [1, 10, 300])
+def test_nearest_matches_brute_force(points, geo_index, k):
+    """Les k plus proches correspondent au tri complet des distances"""
+    latitudes, longitudes = points
+    distances = haversine_km(50.61, 3.10, latitudes, longitudes)
+
+    positions, km = geo_index.nearest(50.61, 3.10, k)
+    np.testing.assert_allclose(km, np.sort(distances)[:k])
+
+def test_documents_without_coordinates_are_skipped():
+    """Les documents sans coordonnées ne sont pas indexés"""
+    index = GeoIndex.from_documents([
+        {"latitude": 50.63, "longitude": 3.06},
+        {"latitude": None, "longitude": None},
+        {"latitude": 50.64, "longitude": 3.07},
+    ])
+    assert len(index) == 2
+    positions, _ = index.nearest(50.64, 3.07, 1)
+    assert positions.tolist() == [2]
+
+# ========================================
+# TESTS - GAZETTEER
+# ========================================
+
+def test_resolve_place_prefers_longest_alias():
+    """"gare lille europe" l'emporte sur l'alias générique "gare" """
+    assert resolve_place("Concerts près de la gare")[0] == "Gare Lille-Flandres"
+    assert resolve_place("un spectacle à côté de la gare Lille-Europe ?")[0] == "Gare Lille-Europe"
+    assert resolve_place("Que faire à Lille ?") is None
+
+def test_locate_query_requires_proximity():
+    """Seules les questions de proximité sont géolocalisées"""
+    assert locate_query("Expositions près de République")[0] == "Station République - Beaux-Arts"
+    assert locate_query("Histoire de la gare Saint-Sauveur") is None
+    assert locate_query("Un concert près de moi", user_location=(50.6, 3.0)) == ("votre position", 50.6, 3.0)
+
+# ========================================
+# TESTS - RECHERCHE COMBINÉE
+# ========================================
+
+def test_search_near_restricts_to_radius(points, geo_index):
+    """La recherche vectorielle ne renvoie que des documents du rayon"""
+    from src.vector_store import create_faiss_index, normalize_vectors, search_near
+
+    embeddings = np.random.default_rng(3).normal(size=(300, 32)).astype(np.float32)
+    index = create_faiss_index(embeddings, "flat")
+    allowed, _ = geo_index.within_radius(50.6365, 3.0707, 2.0)
+
+    for full_vectors in (None, normalize_vectors(embeddings)):
+        scores, ids, km = search_near(embeddings[:1], index, geo_index, 50.6365, 3.0707,
+                                      radius_km=2.0, top_k=5, full_vectors=full_vectors)
+        assert set(ids[0].tolist()) <= set(allowed.tolist())
+        assert (km[0] <= 2.0).all()
+        assert (np.diff(scores[0]) <= 1e-6).all()
+
+def test_user_location_is_per_request(points, fake_embeddings):
+    """"Près de moi" utilise la position de la requête, sans la garder dans le retriever partagé"""
+    from src.rag_chain import build_langchain_store
+    from src.retriever import EventRetriever
+    from src.vector_store import create_faiss_index
+
+    latitudes, longitudes = points
+    embeddings = np.random.default_rng(3).normal(size=(300, 32)).astype(np.float32)
+    documents = [
+        {"text": f"doc {i}", "metadata": {"uid": i, "latitude": float(lat), "longitude": float(lon)}}
+        for i, (lat, lon) in enumerate(zip(latitudes, longitudes))
+    ]
+
+    retriever = EventRetriever(
+        vector_store=build_langchain_store(fake_embeddings(embeddings[0]), create_faiss_index(embeddings, "flat"), documents),
+        k=3, token_budget=None, geo_index=GeoIndex(latitudes, longitudes, np.arange(300)), geo_radius_km=1.0
+    )
+    location = (float(latitudes[10]), float(longitudes[10]))
+
+    near = retriever.invoke("un concert près de moi", config={"metadata": {"user_location": location}})
+    assert near and all(doc.metadata["distance_km"] <= 1.0 for doc in near)
+    assert retriever.user_location is None
+    # Autre session sans position : pas de filtre géographique
+    assert all("distance_km" not in doc.metadata for doc in retriever.invoke("un concert près de moi"))
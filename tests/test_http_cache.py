@@ -0,0 +1,76 @@
+"""
+Tests unitaires - Cache HTTP sur disque (requêtes conditionnelles, éviction)
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.http_cache import HttpCache, cached_get
+
+URL = "https://api.openagenda.com/v2/agendas/1/events"
+
+class FakeResponse:
+    def __init__(self, status_code, content=b"", headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+class FakeSession:
+    """Serveur simulé : 304 si le client présente l'ETag courant"""
+
+    def __init__(self, body=b'{"events": []}', etag='"v1"'):
+        self.body = body
+        self.etag = etag
+        self.requests = []
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        self.requests.append(dict(headers))
+        if headers.get("If-None-Match") == self.etag:
+            return FakeResponse(304, headers={"ETag": self.etag})
+        return FakeResponse(200, self.body, {"ETag": self.etag, "Content-Type": "application/json"})
+
+def test_revalidation_reuses_cached_body(tmp_path):
+    cache, session = HttpCache(str(tmp_path)), FakeSession()
+
+    first = cached_get(URL, {"size": 100}, {"key": "secret"}, cache=cache, session=session, enabled=True)
+    assert first.status_code == 200 and not first.from_cache
+    assert "If-None-Match" not in session.requests[0]
+    assert session.requests[0]["Accept-Encoding"].startswith("gzip")
+
+    second = cached_get(URL, {"size": 100}, {"key": "secret"}, cache=cache, session=session, enabled=True)
+    assert session.requests[1]["If-None-Match"] == '"v1"'
+    assert second.from_cache and second.json() == {"events": []}
+
+    # Contenu modifié côté serveur : nouvelle version téléchargée et mise en cache
+    session.body, session.etag = b'{"events": [1]}', '"v2"'
+    third = cached_get(URL, {"size": 100}, cache=cache, session=session, enabled=True)
+    assert not third.from_cache and third.json() == {"events": [1]}
+
+def test_key_depends_on_params():
+    assert HttpCache.key(URL, {"after": "a", "size": 100}) == HttpCache.key(URL, {"size": 100, "after": "a"})
+    assert HttpCache.key(URL, {"after": "a"}) != HttpCache.key(URL, {"after": "b"})
+
+def test_next_day_fetch_revalidates(tmp_path):
+    """Les bornes de dates changent chaque jour : même entrée, requête conditionnelle (304)"""
+    cache, session = HttpCache(str(tmp_path)), FakeSession()
+    day_one = {"size": 100, "timings[gte]": "2026-10-18", "timings[lte]": "2027-10-18"}
+    day_two = {"size": 100, "timings[gte]": "2026-10-19", "timings[lte]": "2027-10-19"}
+
+    cached_get(URL, day_one, cache=cache, session=session, enabled=True)
+    second = cached_get(URL, day_two, cache=cache, session=session, enabled=True)
+
+    assert HttpCache.key(URL, day_one) == HttpCache.key(URL, day_two)
+    assert session.requests[1]["If-None-Match"] == '"v1"'
+    assert second.from_cache and second.json() == {"events": []}
+
+def test_eviction_keeps_recently_used_entries(tmp_path):
+    cache = HttpCache(str(tmp_path), max_bytes=10_000)
+    for name in ("a", "b", "c"):
+        cache.put(name, {"etag": name}, b"x" * 3000)
+        time.sleep(0.01)
+    os.utime(os.path.join(str(tmp_path), "a.json"), (time.time() + 5, time.time() + 5))
+
+    cache.put("d", {"etag": "d"}, b"x" * 3000)
+    assert cache.size() <= 10_000
+    assert cache.get("b") is None and cache.get("a") is not None and cache.get("d") is not None
@@ -0,0 +1,141 @@
+"""
+Tests unitaires - Versions de l'index et rechargement à chaud
+"""
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.index_versions import (
+    IndexWatcher,
+    active_store_path,
+    current_version,
+    list_versions,
+    prune_versions,
+    rollback,
+    set_current,
+    split_version_path,
+    version_path
+)
+
+# ========================================
+# FIXTURES
+# ========================================
+
+def make_version(root, name, n_documents):
+    """Écrit une version de n_documents et la retourne (sans la rendre courante)"""
+    from src.vector_store import create_faiss_index, save_vector_store
+
+    embeddings = np.random.default_rng(n_documents).normal(size=(n_documents, 8)).astype(np.float32)
+    documents = [{"text": f"doc {i}", "metadata": {"uid": f"{name}-{i}"}} for i in range(n_documents)]
+    save_vector_store(create_faiss_index(embeddings, "flat"), documents, embeddings, version_path(name, root))
+    return embeddings
+
+@pytest.fixture
+def root(tmp_path):
+    return str(tmp_path)
+
+# ========================================
+# TESTS - VERSIONS SUR DISQUE
+# ========================================
+
+def test_current_pointer_and_rollback(root):
+    """CURRENT désigne la version servie ; rollback revient à la précédente"""
+    assert current_version(root) is None and active_store_path(root) == root
+
+    for name in ("20260101-000000", "20260102-000000", "20260103-000000"):
+        make_version(root, name, 3)
+    set_current("20260103-000000", root)
+    assert active_store_path(root) == version_path("20260103-000000", root)
+
+    assert rollback(root=root) == "20260102-000000"
+    assert current_version(root) == "20260102-000000"
+    with pytest.raises(ValueError):
+        set_current("inconnue", root)
+
+def test_prune_keeps_current_version(root):
+    """Les versions les plus anciennes sont supprimées, jamais la version courante"""
+    names = [f"2026010{i}-000000" for i in range(1, 6)]
+    for name in names:
+        make_version(root, name, 2)
+    set_current(names[0], root)
+
+    removed = prune_versions(keep=3, root=root)
+    assert removed == names[1:3]
+    assert list_versions(root) == [names[0], names[3], names[4]]
+
+# ========================================
+# TESTS - RECHARGEMENT À CHAUD
+# ========================================
+
+def test_watcher_swaps_new_version(root, fake_embeddings):
+    """Une nouvelle version courante est chargée puis échangée dans le retriever"""
+    from src.rag_chain import build_event_retriever, build_langchain_store
+    from src.vector_store import load_vector_store
+
+    make_version(root, "20260101-000000", 3)
+    new_embeddings = make_version(root, "20260102-000000", 5)
+    set_current("20260101-000000", root)
+
+    path = active_store_path(root)
+    index, documents = load_vector_store(path)
+    retriever = build_event_retriever(
+        build_langchain_store(fake_embeddings(new_embeddings[4]), index, documents),
+        path, k=2, token_budget=None
+    )
+    watcher = IndexWatcher(retriever, interval=60, root=root)
+    assert watcher.version == "20260101-000000" and not watcher.check()
+
+    set_current("20260102-000000", root)
+    assert watcher.check()
+    assert retriever.generation == 1
+    assert retriever.vector_store.index.ntotal == 5
+    assert retriever.invoke("concert au zénith")[0].metadata["uid"] == "20260102-000000-4"
+
+def test_old_index_released_after_in_flight_requests(root, fake_embeddings):
+    """L'ancien index n'est libéré qu'une fois les requêtes en cours terminées"""
+    from src.rag_chain import build_event_retriever, build_langchain_store
+    from src.vector_store import load_vector_store
+
+    make_version(root, "20260101-000000", 3)
+    index, documents = load_vector_store(version_path("20260101-000000", root))
+    vector_store = build_langchain_store(fake_embeddings([0.0] * 8), index, documents)
+    retriever = build_event_retriever(vector_store, None, k=2)
+
+    with retriever.acquire_index() as (in_flight_store, *_):
+        old = retriever.swap_index(vector_store)
+        assert in_flight_store is vector_store
+        assert not retriever.wait_released(old, timeout=0.05)
+    assert retriever.wait_released(old, timeout=0.05)
+    assert retriever.swap_index(vector_store, if_generation=old) is None
+
+def test_compaction_publishes_new_version(root, fake_embeddings):
+    """La compaction d'une version servie publie une nouvelle version, l'ancienne reste intacte"""
+    from src.expiry import _run_compaction, parse_end_date
+    from src.rag_chain import build_event_retriever, build_langchain_store
+    from src.vector_store import load_vector_store
+
+    embeddings = make_version(root, "20260101-000000", 4)
+    set_current("20260101-000000", root)
+    path = active_store_path(root)
+    index, documents = load_vector_store(path)
+    for i, doc in enumerate(documents):
+        doc["metadata"]["date_fin"] = "2020-01-01" if i < 2 else "2099-01-01"
+    retriever = build_event_retriever(
+        build_langchain_store(fake_embeddings(embeddings[3]), index, documents),
+        path, k=2, token_budget=None
+    )
+    retriever.expiry.refresh(now=parse_end_date("2030-01-01"))
+    watcher = IndexWatcher(retriever, interval=60, root=root)
+
+    _run_compaction(retriever)
+
+    new_version = current_version(root)
+    assert new_version != "20260101-000000"
+    assert split_version_path(retriever.store_path) == (os.path.normpath(root), new_version)
+    assert retriever.vector_store.index.ntotal == 2
+    assert load_vector_store(version_path("20260101-000000", root))[0].ntotal == 4
+    # Déjà servie par ce processus : pas de rechargement
+    assert not watcher.check() and watcher.version == new_version
+    assert rollback(root=root) == "20260101-000000"
@@ -0,0 +1,72 @@
+"""
+Tests unitaires - Routeur d'intention et index des métadonnées (réponses en liste)
+"""
+import os
+import sys
+from datetime import date
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.data_processor import categorize_event
+from src.intent_router import EventCatalog, parse_list_intent, render_list_answer
+
+# Samedi 17 octobre 2026
+TODAY = date(2026, 10, 17)
+
+def make_event(uid, title, begin, end, tarifs="", keywords=(), description=""):
+    event = {"uid": uid, "title": title, "date_debut": begin, "date_fin": end, "tarifs": tarifs,
+             "keywords": list(keywords), "description": description, "lieu": "Salle",
+             "url": f"https://openagenda.com/ville-de-lille/events/{uid}"}
+    return {**event, **categorize_event(event)}
+
+EVENTS = [
+    make_event(1, "Concert de jazz", "2026-10-17T20:00:00+02:00", "2026-10-17T23:00:00+02:00", "12 €"),
+    make_event(2, "Concert au parc", "2026-10-18T15:00:00+02:00", "2026-10-18T17:00:00+02:00", "Gratuit"),
+    make_event(3, "Concert de rentrée", "2026-10-24T20:00:00+02:00", "2026-10-24T22:00:00+02:00"),
+    make_event(4, "Exposition photo", "2026-06-01T10:00:00+02:00", "2027-01-31T18:00:00+01:00", "Entrée libre"),
+    make_event(5, "Théâtre d'ombres", "2026-10-21T15:00:00+02:00", "2026-10-21T16:00:00+02:00",
+               description="Un spectacle pour les enfants dès 4 ans"),
+]
+
+# ========================================
+# TESTS - RECONNAISSANCE DES QUESTIONS
+# ========================================
+
+def test_parse_list_questions():
+    intent = parse_list_intent("Concerts ce week-end", TODAY)
+    assert (intent.category, intent.start, intent.end) == ("concert", TODAY, date(2026, 10, 18))
+
+    intent = parse_list_intent("Quelles expositions gratuites ?", TODAY)
+    assert intent.category == "exposition" and intent.free and intent.period is None
+
+    intent = parse_list_intent("théâtre pour enfants", TODAY)
+    assert intent.category == "théâtre" and intent.kids
+
+def test_open_questions_fall_through():
+    """Genre précis, conseil ou lieu : la question passe par le LLM"""
+    assert parse_list_intent("Y a-t-il des concerts de jazz ?", TODAY) is None
+    assert parse_list_intent("Quel concert me conseilles-tu ce week-end ?", TODAY) is None
+    assert parse_list_intent("Concerts près de la gare", TODAY) is None
+    assert parse_list_intent("Que faire ce soir ?", TODAY) is None
+
+# ========================================
+# TESTS - INDEX ET RÉPONSE
+# ========================================
+
+def test_catalog_filters_by_date_price_and_audience():
+    catalog = EventCatalog.from_documents(EVENTS + [EVENTS[0]], bucket_max_days=62)
+    assert len(catalog) == 5
+
+    weekend = catalog.search("concert", TODAY, date(2026, 10, 18))
+    assert [event["uid"] for event in weekend] == [1, 2]
+    assert [event["uid"] for event in catalog.search("concert", TODAY, date(2026, 10, 18), free=True)] == [2]
+    # Exposition de plusieurs mois : hors des cases par jour, trouvée par chevauchement
+    assert [event["uid"] for event in catalog.search("exposition", TODAY, TODAY, free=True)] == [4]
+    assert [event["uid"] for event in catalog.search("théâtre", TODAY, date(2026, 10, 31), kids=True)] == [5]
+
+def test_render_list_answer_has_links():
+    intent = parse_list_intent("concerts ce week-end", TODAY)
+    events = EventCatalog.from_documents(EVENTS).search("concert", intent.start, intent.end)
+    answer = render_list_answer(intent, events, limit=1)
+    assert answer.startswith("Voici 2 concerts ce week-end")
+    assert "[Plus d'infos](https://openagenda.com/ville-de-lille/events/1)" in answer
+    assert "et 1 autre." in answer and "Concert au parc" not in answer
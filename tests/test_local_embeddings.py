@@ -0,0 +1,113 @@
+"""
+Tests unitaires - Embeddings locaux de secours (mode dégradé)
+Aucun appel à l'API Mistral : les pannes sont simulées
+"""
+import os
+import sys
+import httpx
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.api_client import CircuitOpenError, DeadlineExceededError, is_unavailable_error
+from src.local_embeddings import LocalIndex, LocalVectorizer, embedding_status
+
+TEXTS = [
+    "Concert de jazz au Grand Palais avec un quartet new-yorkais",
+    "Exposition de peinture flamande au Palais des Beaux-Arts",
+    "Atelier de cuisine végétarienne pour les enfants",
+    "Festival de musique électronique à la Gare Saint-Sauveur",
+    "Visite guidée du Vieux-Lille et de ses façades baroques",
+]
+
+# ========================================
+# TESTS - VECTORISEUR
+# ========================================
+
+def test_local_vectors_rank_shared_terms_first():
+    """Les textes qui partagent des termes (sans accents ni casse) sont les plus proches"""
+    vectorizer = LocalVectorizer.fit(TEXTS, dim=256)
+    vectors = vectorizer.transform(TEXTS)
+    query = vectorizer.transform(["une EXPOSITION de peinture"])[0]
+
+    assert vectors.shape == (5, 256)
+    np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), 1.0, rtol=1e-5)
+    assert int(np.argmax(vectors @ query)) == 1
+    # Hachage stable : un autre vectoriseur appris sur les mêmes textes donne les mêmes vecteurs
+    np.testing.assert_array_equal(LocalVectorizer.fit(TEXTS, dim=256).transform(TEXTS), vectors)
+
+def test_local_index_saved_with_vector_store(tmp_path):
+    """L'index local est construit à la sauvegarde de la base, aux mêmes positions"""
+    from src.vector_store import create_faiss_index, save_vector_store, search_by_vector
+
+    documents = [{"text": text, "metadata": {"uid": i}} for i, text in enumerate(TEXTS)]
+    embeddings = np.random.default_rng(0).normal(size=(5, 16)).astype(np.float32)
+    save_vector_store(create_faiss_index(embeddings, "flat"), documents, embeddings, str(tmp_path))
+
+    local_index = LocalIndex.load(str(tmp_path))
+    assert len(local_index) == 5
+    _, ids = search_by_vector([local_index.embed("atelier cuisine enfants")], local_index.index, 1)
+    assert ids[0, 0] == 2
+    assert LocalIndex.load(str(tmp_path / "absent")) is None
+
+# ========================================
+# TESTS - BASCULE
+# ========================================
+
+def test_unavailable_errors():
+    """Disjoncteur, délai et 429/5xx (même enveloppés) déclenchent le secours, pas les 4xx"""
+    from tenacity import retry, stop_after_attempt
+
+    request = httpx.Request("POST", "https://api.mistral.ai/v1/embeddings")
+
+    def status_error(code):
+        return httpx.HTTPStatusError("erreur", request=request, response=httpx.Response(code, request=request))
+
+    @retry(stop=stop_after_attempt(1))
+    def always_times_out():
+        raise DeadlineExceededError("délai", request=request)
+
+    with pytest.raises(Exception) as wrapped:
+        always_times_out()
+
+    assert is_unavailable_error(CircuitOpenError("ouvert", request=request))
+    assert is_unavailable_error(wrapped.value)
+    assert is_unavailable_error(status_error(429)) and is_unavailable_error(status_error(503))
+    assert not is_unavailable_error(status_error(400))
+    assert not is_unavailable_error(ValueError("réponse invalide"))
+
+def test_retriever_switches_to_local_index_and_back():
+    """API indisponible : index local ; API rétablie : retour à l'index Mistral"""
+    from langchain_core.embeddings import Embeddings
+    from src.rag_chain import build_langchain_store
+    from src.retriever import EventRetriever
+    from src.vector_store import create_faiss_index
+
+    documents = [{"text": text, "metadata": {"uid": i}} for i, text in enumerate(TEXTS)]
+    embeddings = np.random.default_rng(0).normal(size=(5, 16)).astype(np.float32)
+    api = {"down": True}
+
+    class FlakyEmbeddings(Embeddings):
+        def embed_documents(self, texts):
+            return [self.embed_query(text) for text in texts]
+
+        def embed_query(self, text):
+            if api["down"]:
+                raise CircuitOpenError("Disjoncteur ouvert pour /embeddings")
+            return embeddings[4].tolist()
+
+    retriever = EventRetriever(
+        vector_store=build_langchain_store(FlakyEmbeddings(), create_faiss_index(embeddings, "flat"), documents),
+        k=2, token_budget=None, local_index=LocalIndex.build(TEXTS, dim=256)
+    )
+
+    degraded = retriever.invoke("festival de musique électronique (panne)")
+    assert degraded[0].metadata["uid"] == 3
+    assert degraded[0].metadata["embedding_path"] == "local"
+    assert embedding_status()["degraded"]
+
+    api["down"] = False
+    recovered = retriever.invoke("visite du Vieux-Lille (rétablie)")
+    assert recovered[0].metadata["uid"] == 4
+    assert recovered[0].metadata["embedding_path"] == "mistral"
+    assert not embedding_status()["degraded"] and embedding_status()["path"] == "mistral"
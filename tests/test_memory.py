@@ -0,0 +1,88 @@
+"""
+Tests unitaires - Mémoire conversationnelle à résumé glissant
+"""
+import os
+import sys
+import pytest
+from langchain_core.documents import Document
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.memory import SummarizingMemory, truncate_to_tokens
+
+# ========================================
+# FIXTURES
+# ========================================
+
+class FakeLLM:
+    """Résume en comptant les appels ; mémorise le dernier prompt"""
+
+    def __init__(self, response="L'utilisateur cherche des concerts gratuits à Lille."):
+        self.response = response
+        self.calls = 0
+        self.prompt = None
+
+    def invoke(self, prompt):
+        self.calls += 1
+        self.prompt = prompt
+        return self.response
+
+@pytest.fixture
+def memory():
+    return SummarizingMemory(
+        llm=FakeLLM(), max_token_limit=100, summary_max_tokens=40,
+        max_shown_events=3, return_messages=True, output_key="answer", background=False
+    )
+
+def turn(memory, i, sources=()):
+    memory.save_context(
+        {"question": f"Question {i} : " + "quels concerts ce week-end ? " * 5},
+        {"answer": f"Réponse {i} : " + "voici plusieurs concerts à Lille. " * 5,
+         "source_documents": [Document(page_content="texte complet " * 50, metadata=meta)
+                              for meta in sources]}
+    )
+
+# ========================================
+# TESTS
+# ========================================
+
+def test_recent_turns_kept_verbatim_under_limit(memory):
+    """Sous la limite, aucun résumé : les échanges sont gardés tels quels"""
+    turn(memory, 1)
+    assert memory.llm.calls == 0
+    messages = memory.load_memory_variables({})["chat_history"]
+    assert [message.type for message in messages] == ["human", "ai"]
+    assert messages[0].content.startswith("Question 1")
+
+def test_old_turns_summarized_and_buffer_stays_bounded(memory):
+    """Les anciens échanges sont résumés et la taille de l'historique reste plafonnée"""
+    sizes = []
+    for i in range(10):
+        turn(memory, i)
+        sizes.append(memory.buffer_tokens())
+
+    assert memory.llm.calls > 0
+    assert memory.summary.startswith("L'utilisateur cherche")
+    assert max(sizes[3:]) <= sizes[2] + 100
+    messages = memory.load_memory_variables({})["chat_history"]
+    assert messages[0].type == "system" and "Résumé de la conversation" in messages[0].content
+    assert messages[-2].content.startswith("Question 9")
+    assert not any(message.content.startswith("Question 0") for message in messages)
+
+def test_shown_events_keep_only_uid_and_title(memory):
+    """Seuls uid et titre des événements présentés sont mémorisés (les plus récents)"""
+    turn(memory, 1, [{"uid": i, "title": f"Concert {i}"} for i in range(4)] + [{"title": "sans uid"}])
+    assert memory.shown_events == {1: "Concert 1", 2: "Concert 2", 3: "Concert 3"}
+    preamble = memory.load_memory_variables({})["chat_history"][0].content
+    assert "Concert 3 [3]" in preamble and "texte complet" not in preamble
+
+def test_clear_resets_summary_and_events(memory):
+    for i in range(5):
+        turn(memory, i, [{"uid": i, "title": f"Expo {i}"}])
+    memory.clear()
+    assert memory.summary == "" and memory.shown_events == {}
+    assert memory.load_memory_variables({})["chat_history"] == []
+
+def test_truncate_to_tokens():
+    text = "mot " * 200
+    assert truncate_to_tokens("court", 10) == "court"
+    assert len(truncate_to_tokens(text, 20)) <= 20 * 3.5 + 1
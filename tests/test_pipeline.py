@@ -0,0 +1,78 @@
+"""
+Tests unitaires - Pipeline incrémental (empreintes des étapes)
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.pipeline import Stage, file_fingerprint, run_pipeline, stage_fingerprint
+
+def make_stages(tmp_path, params, runs):
+    """source.txt → upper.txt → length.txt ; runs compte les exécutions de chaque étape"""
+    source, upper, length = (str(tmp_path / name) for name in ("source.txt", "upper.txt", "length.txt"))
+
+    def run_upper():
+        runs.append("upper")
+        text = open(source).read()
+        open(upper, "w").write(text.upper() if params["upper"] else text)
+        return 1
+
+    def run_length():
+        runs.append("length")
+        open(length, "w").write(str(len(open(upper).read())))
+        return 1
+
+    return [
+        Stage("upper", dict(params), lambda: {"source": file_fingerprint(source)},
+              lambda: os.path.exists(upper), run_upper),
+        Stage("length", {}, lambda: {"upper": file_fingerprint(upper)},
+              lambda: os.path.exists(length), run_length),
+    ], source
+
+def test_unchanged_stages_are_skipped(tmp_path):
+    runs, state = [], str(tmp_path / "state.json")
+    stages, source = make_stages(tmp_path, {"upper": True}, runs)
+    open(source, "w").write("concert")
+
+    report = run_pipeline(stages, state_path=state)
+    assert runs == ["upper", "length"] and [entry["status"] for entry in report] == ["exécutée"] * 2
+
+    report = run_pipeline(stages, state_path=state)
+    assert runs == ["upper", "length"] and [entry["status"] for entry in report] == ["à jour"] * 2
+    assert [entry["items"] for entry in report] == [1, 1]
+
+    run_pipeline(stages, force={"length"}, state_path=state)
+    assert runs == ["upper", "length", "length"]
+
+def test_forced_stage_reruns_downstream(tmp_path):
+    runs, state = [], str(tmp_path / "state.json")
+    stages, source = make_stages(tmp_path, {"upper": True}, runs)
+    open(source, "w").write("concert")
+    run_pipeline(stages, state_path=state)
+
+    # Sortie identique, mais une étape forcée relance aussi son aval
+    report = run_pipeline(stages, force={"upper"}, state_path=state)
+    assert runs[2:] == ["upper", "length"] and [entry["status"] for entry in report] == ["exécutée"] * 2
+
+def test_changes_rerun_downstream_only_when_output_changes(tmp_path):
+    runs, state = [], str(tmp_path / "state.json")
+    stages, source = make_stages(tmp_path, {"upper": True}, runs)
+    open(source, "w").write("concert")
+    run_pipeline(stages, state_path=state)
+
+    # Entrée modifiée : l'étape et son aval sont relancés
+    open(source, "w").write("exposition")
+    run_pipeline(stages, state_path=state)
+    assert runs[2:] == ["upper", "length"]
+
+    # Paramètre modifié sans changer la sortie : l'aval reste à jour
+    open(source, "w").write("EXPO")
+    run_pipeline(stages, state_path=state)
+    stages, _ = make_stages(tmp_path, {"upper": False}, runs)
+    report = run_pipeline(stages, state_path=state)
+    assert runs[-1] == "upper" and report[1]["status"] == "à jour"
+
+def test_stage_fingerprint():
+    assert stage_fingerprint({"chunk_size": 800}, {"a": "1"}) == stage_fingerprint({"chunk_size": 800}, {"a": "1"})
+    assert stage_fingerprint({"chunk_size": 800}, {"a": "1"}) != stage_fingerprint({"chunk_size": 500}, {"a": "1"})
+    assert file_fingerprint("/nonexistent/file") is None
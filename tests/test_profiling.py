@@ -0,0 +1,55 @@
+"""
+Tests unitaires - Mode profilage (échantillonnage, sections, résumé par couche)
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.profiling import classify, profiled, should_profile
+
+def busy(n=20000):
+    return sum(i * i for i in range(n))
+
+def test_forced_profile_writes_profile_and_summary(tmp_path):
+    """Profil .prof + résumé .txt avec sections imbriquées et temps par couche"""
+    with profiled("chatbot.chat", force=True, directory=str(tmp_path), top_n=5) as session:
+        busy()
+        with profiled("rag_chain.invoke"):
+            busy()
+
+    prof_path, summary_path = session["paths"]
+    assert os.path.exists(prof_path) and os.path.basename(prof_path).endswith("-chatbot.chat.prof")
+    summary = open(summary_path, encoding="utf-8").read()
+    assert "rag_chain.invoke" in summary
+    assert "Temps par couche" in summary and "Top 5 des fonctions" in summary
+
+def test_nested_blocks_follow_outer_decision(tmp_path):
+    """Un bloc non échantillonné ne laisse pas ses blocs imbriqués se profiler"""
+    with profiled("chatbot.chat", force=False, directory=str(tmp_path)):
+        with profiled("rag_chain.invoke", force=True, directory=str(tmp_path)) as inner:
+            busy(10)
+    assert inner is False and os.listdir(str(tmp_path)) == []
+
+def test_sampling_and_layers():
+    assert not should_profile(enabled=False, sample_rate=1.0)
+    assert should_profile(enabled=True, sample_rate=1.0)
+    assert not should_profile(enabled=True, sample_rate=0.0)
+    assert should_profile(force=True, enabled=False)
+
+    assert classify("/venv/lib/httpcore/_sync/connection.py", "handle_request") == "Réseau (HTTP, SSL)"
+    assert classify("~", "<method 'read' of '_ssl._SSLSocket' objects>") == "Réseau (HTTP, SSL)"
+    assert classify("/venv/lib/langchain_core/runnables/base.py", "invoke") == "LangChain / pydantic"
+    assert classify("/app/src/context_assembler.py", "assemble_context") == "Application (src/)"
+
+def test_old_profiles_are_pruned(tmp_path):
+    """Au-delà de max_files, les profils les plus anciens (.prof et .txt) sont supprimés"""
+    from src.profiling import prune_profiles
+
+    for day in range(1, 6):
+        for suffix in (".prof", ".txt"):
+            (tmp_path / f"2026010{day}-000000-000000-chatbot.chat{suffix}").write_text("")
+
+    assert prune_profiles(str(tmp_path), max_files=2) == 3
+    assert sorted(os.listdir(tmp_path)) == [
+        f"2026010{day}-000000-000000-chatbot.chat{suffix}" for day in (4, 5) for suffix in (".prof", ".txt")
+    ]
@@ -0,0 +1,89 @@
+"""
+Tests unitaires - Métriques de l'évaluation de la recherche
+"""
+import json
+import os
+import sys
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tests.run_retrieval_evaluation import (
+    judge_document,
+    recall_at_k,
+    reciprocal_rank,
+    ndcg_at_k,
+    compute_metrics
+)
+
+# ========================================
+# FIXTURES
+# ========================================
+
+@pytest.fixture
+def corpus():
+    """Petit corpus de documents au format de data/processed"""
+    return [
+        {"text": "Concert de jazz au Splendid", "metadata": {"uid": 1}},
+        {"text": "Exposition de peinture, entrée gratuite", "metadata": {"uid": 2}},
+        {"text": "Concert de rock samedi soir", "metadata": {"uid": 3}},
+        {"text": "Atelier pour enfants", "metadata": {"uid": 4}},
+    ]
+
+# ========================================
+# TESTS - JUGEMENT DE PERTINENCE
+# ========================================
+
+def test_judge_by_keywords_with_alternatives(corpus):
+    """Les alternatives "a|b" sont couvertes par l'une ou l'autre"""
+    test = {"expected_retrieval_keywords": ["exposition", "gratuit|libre"]}
+    assert judge_document(corpus[1], test) == {"exposition", "gratuit|libre"}
+    assert judge_document(corpus[0], test) == set()
+
+def test_judge_by_uid_takes_precedence(corpus):
+    """Les uids attendus priment sur les mots-clés"""
+    test = {"expected_uids": [3], "expected_retrieval_keywords": ["jazz"]}
+    assert judge_document(corpus[0], test) == set()
+    assert judge_document(corpus[2], test) == {3}
+
+# ========================================
+# TESTS - MÉTRIQUES
+# ========================================
+
+def test_recall_at_k_counts_covered_items():
+    """Le recall cumule les éléments couverts dans les k premiers rangs"""
+    hits = [set(), {"a"}, {"a", "b"}]
+    assert recall_at_k(hits, 2, 1) == 0.0
+    assert recall_at_k(hits, 2, 2) == 0.5
+    assert recall_at_k(hits, 2, 3) == 1.0
+
+def test_reciprocal_rank():
+    """Le MRR prend le rang du premier résultat pertinent"""
+    assert reciprocal_rank([set(), set(), {"a"}]) == pytest.approx(1 / 3)
+    assert reciprocal_rank([set(), set()]) == 0.0
+
+def test_ndcg_perfect_and_partial_ranking():
+    """Un classement idéal vaut 1, un pertinent relégué vaut moins"""
+    assert ndcg_at_k([{"a"}, {"a"}, set()], 3, 2) == pytest.approx(1.0)
+    assert 0 < ndcg_at_k([set(), {"a"}], 2, 1) < 1
+    assert ndcg_at_k([set(), set()], 2, 0) == 0.0
+
+def test_compute_metrics_skips_questions_without_expectations(corpus):
+    """Les questions hors base (sans attentes) ne comptent pas"""
+    test_cases = [
+        {"question": "jazz ?", "expected_retrieval_keywords": ["jazz"]},
+        {"question": "météo ?", "expected_retrieval_keywords": []},
+    ]
+    ranked = [[corpus[0], corpus[2]], [corpus[3]]]
+    metrics = compute_metrics(test_cases, ranked, corpus, [1, 2])
+    assert metrics["questions"] == 1
+    assert metrics["recall@1"] == 1.0
+    assert metrics["mrr"] == 1.0
+
+def test_dataset_has_retrieval_expectations():
+    """Chaque question du jeu de test déclare ses attentes de recherche"""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_dataset.json")
+    with open(path, "r", encoding="utf-8") as f:
+        dataset = json.load(f)
+    for test in dataset["test_cases"]:
+        assert "expected_uids" in test
+        assert "expected_retrieval_keywords" in test
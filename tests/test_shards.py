@@ -0,0 +1,132 @@
+"""
+Tests unitaires - Index partitionné par agenda (routage, chargement paresseux, fusion)
+"""
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.shards import ShardRouter, cities_in_text, route_query, save_manifest, shard_path
+
+MANIFEST = {
+    "ville-de-lille": {"uid": 1, "city": "Lille", "cities": ["Lille", "Lomme"], "documents": 4},
+    "roubaix": {"uid": 2, "city": "Roubaix", "cities": ["Roubaix"], "documents": 4},
+    "villeneuve-d-ascq": {"uid": 3, "city": "Villeneuve-d'Ascq", "cities": ["Villeneuve-d'Ascq"], "documents": 4},
+}
+
+# ========================================
+# FIXTURES
+# ========================================
+
+@pytest.fixture
+def shards(tmp_path):
+    """3 shards de 4 documents sur le disque ; retourne (dossier, vecteurs par shard)"""
+    from src.vector_store import create_faiss_index, save_vector_store
+
+    rng = np.random.default_rng(5)
+    vectors = {}
+    for slug, entry in MANIFEST.items():
+        embeddings = rng.normal(size=(4, 16)).astype(np.float32)
+        documents = [
+            {"text": f"Événement : {slug} {i}\nVille : {entry['city']}",
+             "metadata": {"uid": f"{slug}-{i}", "ville": entry["city"], "date_fin": ""}}
+            for i in range(4)
+        ]
+        save_vector_store(create_faiss_index(embeddings, "flat"), documents, embeddings,
+                          shard_path(slug, str(tmp_path)))
+        vectors[slug] = embeddings
+    save_manifest(MANIFEST, str(tmp_path))
+    return str(tmp_path), vectors
+
+# ========================================
+# TESTS - ROUTAGE
+# ========================================
+
+def test_cities_in_text_handles_accents_and_hyphens():
+    """Les villes sont reconnues sans accents ni tirets, la plus longue d'abord"""
+    cities = ["Lille", "Roubaix", "Villeneuve-d'Ascq"]
+    assert cities_in_text("Concerts à villeneuve d'ascq ce soir", cities) == ["Villeneuve-d'Ascq"]
+    assert sorted(cities_in_text("Expos à Lille ou Roubaix ?", cities)) == ["Lille", "Roubaix"]
+    assert cities_in_text("Que faire ce week-end ?", cities) == []
+
+def test_route_query_priorities():
+    """Ville citée > villes de la session > villes par défaut"""
+    assert route_query("Théâtre à Roubaix", MANIFEST, cities=["Lille"]) == ["roubaix"]
+    assert route_query("Théâtre ce soir", MANIFEST, cities=["Roubaix"]) == ["roubaix"]
+    assert route_query("Théâtre ce soir", MANIFEST, default_cities=["Lomme"]) == ["ville-de-lille"]
+    assert route_query("Théâtre ce soir", MANIFEST, default_cities=["Arras"]) == list(MANIFEST)
+
+# ========================================
+# TESTS - CHARGEMENT ET FUSION
+# ========================================
+
+def test_router_loads_lazily_and_evicts_lru(shards, fake_embeddings):
+    """Les shards sont chargés au premier accès et les moins récents déchargés"""
+    path, vectors = shards
+    router = ShardRouter(fake_embeddings(vectors["roubaix"][0]), MANIFEST, path, max_loaded=2)
+    assert router.loaded_shards() == []
+
+    router.get("ville-de-lille")
+    router.get("roubaix")
+    router.get("ville-de-lille")
+    router.get("villeneuve-d-ascq")
+
+    assert router.loaded_shards() == ["ville-de-lille", "villeneuve-d-ascq"]
+    assert router.evict("ville-de-lille") and not router.evict("roubaix")
+
+def test_shard_loads_outside_router_lock(shards, fake_embeddings, monkeypatch):
+    """Un chargement lent ne bloque pas les autres shards ; un même shard n'est chargé qu'une fois"""
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    path, vectors = shards
+    router = ShardRouter(fake_embeddings(vectors["roubaix"][0]), MANIFEST, path)
+    release, loads = threading.Event(), []
+    load = router._load
+
+    def slow_load(slug):
+        loads.append(slug)
+        if slug == "ville-de-lille":
+            assert release.wait(timeout=5)
+        return load(slug)
+
+    monkeypatch.setattr(router, "_load", slow_load)
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        lille = [executor.submit(router.get, "ville-de-lille") for _ in range(2)]
+        assert executor.submit(router.get, "roubaix").result(timeout=5) is not None
+        assert router.loaded_shards() == ["roubaix"]
+        release.set()
+        assert lille[0].result(timeout=5) is lille[1].result(timeout=5)
+
+    assert sorted(loads) == ["roubaix", "ville-de-lille"]
+
+def test_sharded_retriever_merges_top_k(shards, fake_embeddings):
+    """Les résultats des shards routés sont fusionnés par score"""
+    from src.retriever import ShardedRetriever
+
+    path, vectors = shards
+    router = ShardRouter(fake_embeddings(vectors["roubaix"][2]), MANIFEST, path)
+    retriever = ShardedRetriever(router=router, k=3, token_budget=None)
+
+    documents = retriever.invoke("Un concert ?", config={"metadata": {"cities": ["Lille", "Roubaix"]}})
+    assert documents[0].metadata["uid"] == "roubaix-2"
+    assert {doc.metadata["shard"] for doc in documents} <= {"ville-de-lille", "roubaix"}
+    assert [doc.metadata["score"] for doc in documents] == sorted(
+        (doc.metadata["score"] for doc in documents), reverse=True)
+    assert "villeneuve-d-ascq" not in router.loaded_shards()
+
+def test_session_cities_are_per_request(shards, fake_embeddings):
+    """Les villes d'une session routent ses requêtes, sans être gardées dans le retriever partagé"""
+    from src.retriever import ShardedRetriever
+
+    path, vectors = shards
+    router = ShardRouter(fake_embeddings(vectors["roubaix"][2]), MANIFEST, path)
+    retriever = ShardedRetriever(router=router, k=3, token_budget=None)
+
+    roubaix = retriever.invoke("Un concert ?", config={"metadata": {"cities": ["Roubaix"]}})
+    assert {doc.metadata["shard"] for doc in roubaix} == {"roubaix"}
+    assert not hasattr(retriever, "cities")
+    # Autre session sans villes : DEFAULT_CITIES
+    other = retriever.invoke("Un concert ?")
+    assert {doc.metadata["shard"] for doc in other} == set(route_query("", MANIFEST)) != {"roubaix"}
@@ -0,0 +1,27 @@
+"""
+Tests unitaires - Démarrage rapide (imports paresseux, pas d'effet de bord)
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tests.benchmark_startup import STARTUP_MODULES, loaded_heavy_modules, parse_importtime
+
+def test_startup_does_not_import_heavy_dependencies():
+    """Importer les modules src/ ne charge ni Faiss, ni LangChain, ni le client Mistral"""
+    heavy = loaded_heavy_modules(STARTUP_MODULES)
+    assert heavy == [], f"Dépendances lourdes importées au démarrage : {heavy}"
+
+def test_vector_store_has_no_client_at_import():
+    """Le client Mistral n'est créé qu'au premier appel"""
+    from src import vector_store
+    assert vector_store._client is None
+
+def test_parse_importtime():
+    """La sortie de -X importtime est correctement analysée"""
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   config\n"
+        "import time:       300 |        420 | src.chatbot\n"
+    )
+    assert parse_importtime(stderr) == [("config", 120, 120), ("src.chatbot", 300, 420)]
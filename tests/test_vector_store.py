@@ -0,0 +1,183 @@
+"""
+Tests unitaires - Index Faiss (types d'index, quantification, réduction ACP, re-classement)
+Aucun appel à l'API Mistral : les embeddings sont générés aléatoirement
+"""
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.vector_store import (
+    create_faiss_index,
+    index_memory_bytes,
+    is_quantized,
+    normalize_vectors,
+    search_by_vector
+)
+
+# ========================================
+# FIXTURES
+# ========================================
+
+@pytest.fixture
+def embeddings():
+    """Embeddings aléatoires (500 documents, dimension 64)"""
+    rng = np.random.default_rng(42)
+    return rng.normal(size=(500, 64)).astype(np.float32)
+
+# ========================================
+# TESTS - QUANTIFICATION
+# ========================================
+
+@pytest.mark.parametrize("index_type,ratio", [("flat", 1), ("fp16", 2), ("sq8", 4)])
+def test_index_memory_by_type(embeddings, index_type, ratio):
+    """fp16 divise la mémoire par 2, sq8 par 4"""
+    index = create_faiss_index(embeddings, index_type)
+    assert index.ntotal == len(embeddings)
+    assert index_memory_bytes(index) == embeddings.nbytes // ratio
+    assert is_quantized(index) == (index_type != "flat")
+
+def test_unknown_index_type(embeddings):
+    """Un type d'index inconnu est refusé"""
+    with pytest.raises(ValueError):
+        create_faiss_index(embeddings, "pq")
+
+def test_rerank_restores_exact_ranking(embeddings):
+    """Avec re-classement, l'index sq8 retrouve le classement exact"""
+    queries = embeddings[:20]
+    flat = create_faiss_index(embeddings, "flat")
+    sq8 = create_faiss_index(embeddings, "sq8")
+
+    exact_scores, exact_ids = search_by_vector(queries, flat, 5)
+    scores, ids = search_by_vector(queries, sq8, 5, full_vectors=normalize_vectors(embeddings))
+
+    np.testing.assert_array_equal(ids, exact_ids)
+    np.testing.assert_allclose(scores, exact_scores, rtol=1e-5)
+
+def test_l2_index_scores_are_cosine(embeddings):
+    """Un index L2 (format LangChain) renvoie aussi des similarités cosinus"""
+    import faiss
+
+    vectors = normalize_vectors(embeddings)
+    l2 = faiss.IndexFlatL2(vectors.shape[1])
+    l2.add(vectors)
+    flat = create_faiss_index(embeddings, "flat")
+
+    l2_scores, l2_ids = search_by_vector(embeddings[:5], l2, 3)
+    ip_scores, ip_ids = search_by_vector(embeddings[:5], flat, 3)
+
+    np.testing.assert_array_equal(l2_ids, ip_ids)
+    np.testing.assert_allclose(l2_scores, ip_scores, atol=1e-5)
+
+# ========================================
+# TESTS - RÉDUCTION DE DIMENSION (ACP)
+# ========================================
+
+@pytest.fixture
+def low_rank_embeddings():
+    """Embeddings proches d'un sous-espace de dimension 8 (cas favorable à l'ACP)"""
+    rng = np.random.default_rng(7)
+    basis = rng.normal(size=(8, 64))
+    return (rng.normal(size=(500, 8)) @ basis + 0.05 * rng.normal(size=(500, 64))).astype(np.float32)
+
+def test_pca_reduces_memory_and_keeps_variance(low_rank_embeddings):
+    """L'ACP à 16 dimensions divise la mémoire par 4 et conserve l'essentiel de la variance"""
+    from src.vector_store import fit_pca, is_transformed
+
+    index = create_faiss_index(low_rank_embeddings, "flat", transform="pca", transform_dim=16)
+    assert is_transformed(index) and not is_quantized(index)
+    assert index_memory_bytes(index) == low_rank_embeddings.nbytes // 4
+    assert fit_pca(normalize_vectors(low_rank_embeddings), 16)[1] > 0.95
+
+def test_pca_transform_saved_and_applied_to_queries(low_rank_embeddings, tmp_path):
+    """La projection est sauvegardée avec l'index ; les requêtes pleine dimension sont projetées"""
+    from src.vector_store import save_vector_store, load_vector_store
+
+    documents = [{"text": f"doc {i}", "metadata": {}} for i in range(len(low_rank_embeddings))]
+    index = create_faiss_index(low_rank_embeddings, "sq8", transform="pca", transform_dim=16)
+    save_vector_store(index, documents, low_rank_embeddings, str(tmp_path))
+    loaded, _ = load_vector_store(str(tmp_path))
+
+    queries = low_rank_embeddings[:20]
+    _, exact_ids = search_by_vector(queries, create_faiss_index(low_rank_embeddings, "flat", transform="none"), 5)
+    scores, ids = search_by_vector(queries, loaded, 5, full_vectors=normalize_vectors(low_rank_embeddings))
+
+    np.testing.assert_array_equal(ids[:, 0], np.arange(20))
+    assert (ids == exact_ids).mean() > 0.9
+    assert scores[:, 0] == pytest.approx(1.0, abs=1e-5)
+
+def test_pca_index_can_be_compacted(low_rank_embeddings):
+    """La compaction (suppression des expirés) fonctionne sur un index réduit"""
+    from src.expiry import compact_index
+
+    documents = [{"text": f"doc {i}", "metadata": {}} for i in range(len(low_rank_embeddings))]
+    index = create_faiss_index(low_rank_embeddings, "flat", transform="pca", transform_dim=16)
+    dead = np.zeros(len(documents), dtype=bool)
+    dead[:10] = True
+
+    compacted, kept, _ = compact_index(index, documents, dead)
+    assert compacted.ntotal == len(documents) - 10 and index.ntotal == len(documents)
+    assert kept[0]["text"] == "doc 10"
+
+def test_unknown_transform(embeddings):
+    """Une réduction inconnue est refusée"""
+    with pytest.raises(ValueError):
+        create_faiss_index(embeddings, "flat", transform="opq")
+
+# ========================================
+# TESTS - RECHERCHE EN BATCH
+# ========================================
+
+@pytest.mark.parametrize("threads", [None, 4])
+def test_numpy_engine_matches_faiss(embeddings, threads):
+    """Le moteur NumPy (blocs + argpartition) renvoie le même top-k que Faiss"""
+    from src.vector_store import numpy_search
+
+    queries = np.random.default_rng(0).normal(size=(300, 64)).astype(np.float32)
+    flat = create_faiss_index(embeddings, "flat")
+
+    faiss_scores, faiss_ids = search_by_vector(queries, flat, 10)
+    numpy_scores, numpy_ids = numpy_search(queries, normalize_vectors(embeddings), 10,
+                                           threads=threads, block_size=64)
+
+    np.testing.assert_array_equal(numpy_ids, faiss_ids)
+    np.testing.assert_allclose(numpy_scores, faiss_scores, rtol=1e-4, atol=1e-5)
+
+def test_numpy_engine_pads_when_corpus_smaller_than_k(embeddings):
+    """Avec moins de documents que k, les ids manquants valent -1 (comme Faiss)"""
+    from src.vector_store import numpy_search
+
+    scores, ids = numpy_search(embeddings[:2], normalize_vectors(embeddings[:3]), 5)
+    assert ids.shape == (2, 5)
+    assert (ids[:, 3:] == -1).all()
+
+def test_search_batch_returns_documents(embeddings):
+    """search_batch associe les documents aux résultats, quel que soit le moteur"""
+    from src.vector_store import search_batch
+
+    documents = [{"text": f"doc {i}", "metadata": {"uid": i}} for i in range(len(embeddings))]
+    flat = create_faiss_index(embeddings, "flat")
+    vectors = normalize_vectors(embeddings)
+
+    for engine in ("faiss", "numpy"):
+        results = search_batch(embeddings[:3], flat, documents, 2, engine=engine, full_vectors=vectors)
+        assert [row[0]["document"]["metadata"]["uid"] for row in results] == [0, 1, 2]
+        assert results[0][0]["score"] == pytest.approx(1.0, abs=1e-5)
+
+def test_search_batch_restores_faiss_threads(embeddings):
+    """Le nombre de threads Faiss d'un batch ne déborde pas sur le reste du processus"""
+    import faiss
+    from src.vector_store import search_batch
+
+    previous = faiss.omp_get_max_threads()
+    threads = 1 if previous > 1 else 2
+    search_batch(embeddings[:3], create_faiss_index(embeddings, "flat"), top_k=2, engine="faiss", threads=threads)
+    assert faiss.omp_get_max_threads() == previous
+
+def test_search_batch_numpy_requires_vectors(embeddings):
+    """Le moteur NumPy a besoin des vecteurs du corpus"""
+    from src.vector_store import search_batch
+
+    with pytest.raises(ValueError):
+        search_batch(embeddings[:3], engine="numpy")
@@ -0,0 +1,104 @@
+"""
+Tests unitaires - Préchauffage et sondes de disponibilité (sans index ni appel API)
+"""
+import json
+import os
+import sys
+import threading
+import urllib.error
+import urllib.request
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import warmup
+
+# ========================================
+# FIXTURES
+# ========================================
+
+@pytest.fixture
+def fresh_warmup(monkeypatch, tmp_path):
+    """État du module remis à zéro, fichier de disponibilité dans tmp_path"""
+    monkeypatch.setattr(warmup, "_state", {
+        "status": "idle", "error": None, "started_at": None, "ready_at": None,
+        "timings_ms": {}, "warnings": [],
+    })
+    monkeypatch.setattr(warmup, "_thread", None)
+    monkeypatch.setattr(warmup, "_ready", threading.Event())
+    monkeypatch.setattr(warmup, "_health_server", None)
+    monkeypatch.setattr(warmup, "HEALTH_PORT", None)
+    monkeypatch.setattr(warmup, "READINESS_FILE", str(tmp_path / "ready.json"))
+    monkeypatch.setattr("src.vector_store.touch_index_pages", lambda index: 0)
+    return tmp_path / "ready.json"
+
+def fake_chain():
+    return SimpleNamespace(retriever=SimpleNamespace(vector_store=SimpleNamespace(index=None)))
+
+def use_initializer(monkeypatch, initialize):
+    monkeypatch.setattr("src.chatbot.initialize_chatbot", initialize)
+
+# ========================================
+# TESTS
+# ========================================
+
+def test_ready_writes_readiness_file(fresh_warmup, monkeypatch):
+    """Préchauffage réussi : prêt, durées mesurées, fichier de disponibilité écrit"""
+    use_initializer(monkeypatch, lambda: (fake_chain(), None))
+
+    assert warmup.wait_until_ready(timeout=5)
+    status = warmup.get_status()
+    assert status["status"] == "ready" and "load" in status["timings_ms"]
+    assert json.loads(fresh_warmup.read_text(encoding="utf-8"))["status"] == "ready"
+
+def test_failed_warmup_can_be_retried(fresh_warmup, monkeypatch):
+    """Un échec n'est pas définitif : l'appel suivant relance le préchauffage"""
+    def broken():
+        raise OSError("index introuvable")
+
+    use_initializer(monkeypatch, broken)
+    assert not warmup.wait_until_ready(timeout=5)
+    assert warmup.get_status()["error"] == "index introuvable"
+    assert not fresh_warmup.exists()
+
+    use_initializer(monkeypatch, lambda: (fake_chain(), None))
+    assert warmup.wait_until_ready(timeout=5)
+    assert warmup.get_status()["error"] is None
+
+def test_api_warmup_error_keeps_chatbot_ready(fresh_warmup, monkeypatch):
+    """L'échec des appels API de préchauffage est signalé sans bloquer la disponibilité"""
+    def unreachable(rag_chain):
+        raise ConnectionError("API injoignable")
+
+    use_initializer(monkeypatch, lambda: (fake_chain(), None))
+    monkeypatch.setattr(warmup, "_warm_api_calls", unreachable)
+    warmup.start_warmup(warm_api_calls=True)
+
+    assert warmup.wait_until_ready(timeout=5)
+    assert warmup.get_status()["warnings"] == ["api_calls : API injoignable"]
+
+def test_health_and_ready_endpoints(fresh_warmup, monkeypatch):
+    """/health répond toujours 200, /ready 503 puis 200 une fois le chatbot prêt"""
+    server = warmup.start_health_server(0)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    def get(path):
+        try:
+            with urllib.request.urlopen(base_url + path, timeout=5) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, None
+
+    try:
+        assert get("/health")[0] == 200
+        assert get("/ready")[0] == 503
+        assert get("/inconnu")[0] == 404
+
+        use_initializer(monkeypatch, lambda: (fake_chain(), None))
+        assert warmup.wait_until_ready(timeout=5)
+        code, body = get("/ready")
+        assert code == 200 and body["status"] == "ready"
+    finally:
+        server.shutdown()
+        server.server_close()